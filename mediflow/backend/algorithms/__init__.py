@@ -4,8 +4,10 @@
 
 from .priority_queue    import get_queue, compute_score, MediflowPriorityQueue, QueueNode
 from .interval_tree     import get_tree, IntervalTree, Interval
-from .bipartite_matching import match_patients_to_slots, HopcroftKarp
+from .bipartite_matching import match_patients_to_slots, get_matcher, HopcroftKarp, HopcroftKarpCSR, IncrementalMatcher
+from .weighted_assignment import assign_patients_to_slots, MinCostAssignment
 from .load_balancer     import get_load_balancer, nearest_available_branch
-from .peak_prediction   import get_forecaster, train_forecaster
+from .peak_prediction   import get_forecaster, train_forecaster, train_forecasters, tune_parameters, HoltWintersBatch
 from .wait_time         import get_estimator, WaitTimeEstimator
-from .kdtree            import get_kdtree, rebuild_kdtree, BranchPoint
+from .kdtree            import get_kdtree, rebuild_kdtree, sync_availability, BranchPoint
+from .branch_graph      import get_branch_graph, rebuild_branch_graph, BranchGraph
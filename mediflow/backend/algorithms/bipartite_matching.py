@@ -2,10 +2,16 @@
 #  algorithms/bipartite_matching.py
 #  Doctor-Patient Matching — Hopcroft-Karp Bipartite
 #  O(E √V) — matches patients to doctor-slot pairs optimally
+#  HopcroftKarpCSR: iterative, flat array('i') CSR adjacency —
+#  no recursion limit, ~4 bytes per edge
+#  IncrementalMatcher: keeps a maximum matching under arrivals and
+#  cancellations — one augmenting search per change
 # ================================================================
 
+from array import array
 from collections import deque
-from typing import Optional
+from itertools import accumulate, chain
+from typing import Hashable, Iterable, Optional
 
 
 class HopcroftKarp:
@@ -77,6 +83,138 @@ class HopcroftKarp:
         return {p: s for p, s in enumerate(self.match_patient) if s != -1}
 
 
+class HopcroftKarpCSR:
+    """
+    Same algorithm and same matching as HopcroftKarp, on CSR adjacency:
+    the slots of patient p are targets[offsets[p]:offsets[p + 1]].
+    DFS runs on an explicit stack, so augmenting paths of any length work.
+    """
+
+    INF = 2 ** 31 - 1
+
+    def __init__(self, n_patients: int, n_slots: int, offsets: array, targets: array):
+        if len(offsets) != n_patients + 1:
+            raise ValueError("offsets must have n_patients + 1 entries")
+        self.n       = n_patients
+        self.m       = n_slots
+        self.offsets = offsets
+        self.targets = targets
+
+        self.match_patient = array("i", [-1]) * n_patients
+        self.match_slot    = array("i", [-1]) * n_slots
+        self.dist          = array("i", [0]) * n_patients
+        self.pos           = array("i", offsets)
+
+    @classmethod
+    def from_adjacency(cls, n_slots: int, adj: list[list[int]]) -> "HopcroftKarpCSR":
+        """Build once from per-patient slot lists (the HopcroftKarp.adj layout)."""
+        offsets = array("i", accumulate(map(len, adj), initial=0))
+        targets = array("i", chain.from_iterable(adj))
+        return cls(len(adj), n_slots, offsets, targets)
+
+    def _bfs(self) -> bool:
+        dist, match_patient, match_slot = self.dist, self.match_patient, self.match_slot
+        offsets, targets, INF = self.offsets, memoryview(self.targets), self.INF
+        queue = array("i")
+        for p in range(self.n):
+            if match_patient[p] == -1:
+                dist[p] = 0
+                queue.append(p)
+            else:
+                dist[p] = INF
+
+        found = False
+        head  = 0
+        while head < len(queue):
+            p = queue[head]; head += 1
+            for s in targets[offsets[p]:offsets[p + 1]]:
+                np = match_slot[s]
+                if np == -1:
+                    found = True
+                elif dist[np] == INF:
+                    dist[np] = dist[p] + 1
+                    queue.append(np)
+        return found
+
+    def _dfs(self, root: int) -> bool:
+        """
+        Iterative twin of HopcroftKarp._dfs — same edge order, same result.
+        pos[p] is p's current edge for the phase: edges before it can't lead
+        to a free slot again until the next BFS, so a revisit resumes there.
+        """
+        dist, match_patient, match_slot = self.dist, self.match_patient, self.match_slot
+        offsets, targets, pos, INF = self.offsets, self.targets, self.pos, self.INF
+        edges = memoryview(targets)
+        path  = [root]
+        while path:
+            p = path[-1]
+            e = pos[p]
+            next_dist = dist[p] + 1
+            for s in edges[e:offsets[p + 1]]:
+                np = match_slot[s]
+                if np == -1:
+                    pos[p] = e
+                    # Augment: every patient on the path takes its current slot
+                    for q in path:
+                        s = targets[pos[q]]
+                        match_patient[q] = s
+                        match_slot[s]    = q
+                    return True
+                if dist[np] == next_dist:
+                    pos[p] = e
+                    path.append(np)
+                    break
+                e += 1
+            else:
+                dist[p] = INF
+                path.pop()
+                if path:
+                    pos[path[-1]] += 1
+        return False
+
+    def max_matching(self) -> int:
+        """Run Hopcroft-Karp. Returns number of matched pairs."""
+        matching = 0
+        match_patient = self.match_patient
+        while self._bfs():
+            self.pos = array("i", self.offsets)   # every patient starts the phase at its first edge
+            for p in range(self.n):
+                if match_patient[p] == -1:
+                    if self._dfs(p):
+                        matching += 1
+        return matching
+
+    def get_matches(self) -> dict[int, int]:
+        """Return {patient_index: slot_index} for all matched pairs."""
+        return {p: s for p, s in enumerate(self.match_patient) if s != -1}
+
+
+def build_csr(
+    patient_ids: list[Hashable],
+    slot_ids: list[Hashable],
+    compatibility: dict[Hashable, list[Hashable]],
+) -> tuple[array, array]:
+    """
+    Flat CSR arrays from {patient_id: [slot_ids]}, one pass. Unknown ids are
+    dropped; edge order within a patient follows the input list.
+    """
+    p_index = {pid: i for i, pid in enumerate(patient_ids)}
+    s_index = {sid: i for i, sid in enumerate(slot_ids)}
+    per_patient: list[Optional[list[Hashable]]] = [None] * len(patient_ids)
+    for pid, compatible in compatibility.items():
+        i = p_index.get(pid)
+        if i is not None:
+            per_patient[i] = compatible
+
+    offsets = array("i", [0]) * (len(patient_ids) + 1)
+    targets = array("i")
+    for i, compatible in enumerate(per_patient):
+        if compatible:
+            targets.extend(s_index[sid] for sid in compatible if sid in s_index)
+        offsets[i + 1] = len(targets)
+    return offsets, targets
+
+
 def match_patients_to_slots(
     patient_ids:        list[int],
     slot_ids:           list[int],
@@ -89,22 +227,246 @@ def match_patients_to_slots(
     if not patient_ids or not slot_ids:
         return {}
 
-    p_index = {pid: i for i, pid in enumerate(patient_ids)}
-    s_index = {sid: i for i, sid in enumerate(slot_ids)}
+    offsets, targets = build_csr(patient_ids, slot_ids, compatibility)
+    hk = HopcroftKarpCSR(len(patient_ids), len(slot_ids), offsets, targets)
+    hk.max_matching()
 
-    hk = HopcroftKarp(len(patient_ids), len(slot_ids))
+    return {patient_ids[pi]: slot_ids[si] for pi, si in hk.get_matches().items()}
 
-    for pid, compatible_slots in compatibility.items():
-        if pid not in p_index:
-            continue
-        for sid in compatible_slots:
-            if sid in s_index:
-                hk.add_edge(p_index[pid], s_index[sid])
 
-    hk.max_matching()
-    raw = hk.get_matches()
+class IncrementalMatcher:
+    """
+    Maximum matching kept up to date under patient/slot arrivals and
+    departures. Each change runs one BFS for a shortest augmenting path from
+    the affected vertex only — the matching stays maximum and only the
+    patients on that path move. O(V + E) worst case per change, usually far less.
+
+    Compatibility comes from explicit edges and/or a shared `group`
+    (e.g. doctor + day): a patient and a slot in the same group are linked.
+    Every mutating call returns {patient: new slot or None} for the patients
+    whose assignment changed. A group is dropped with its last patient —
+    slots only it linked go too — and drop_group() retires a whole group.
+    """
+
+    def __init__(self):
+        self._adj_p: dict[Hashable, dict] = {}   # patient → ordered set of slots
+        self._adj_s: dict[Hashable, dict] = {}   # slot    → ordered set of patients
+        self._group_p: dict[Hashable, dict] = {}
+        self._group_s: dict[Hashable, dict] = {}
+        self._p_group: dict[Hashable, Hashable] = {}
+        self._s_group: dict[Hashable, Hashable] = {}
+        self.match_patient: dict[Hashable, Hashable] = {}
+        self.match_slot:    dict[Hashable, Hashable] = {}
+
+    # ---- bulk load ------------------------------------------------
+
+    def load(self, compatibility: dict[Hashable, list[Hashable]]) -> int:
+        """Add many patients at once and solve with Hopcroft-Karp. Returns matches added."""
+        new = [p for p in compatibility if p not in self._adj_p]
+        for p in new:
+            self._adj_p[p] = {}
+            for s in compatibility[p]:
+                self._link(p, s)
+        free_p = [p for p in self._adj_p if p not in self.match_patient]
+        free_s = [s for s in self._adj_s if s not in self.match_slot]
+        result = match_patients_to_slots(free_p, free_s, {p: list(self._adj_p[p]) for p in free_p})
+        for p, s in result.items():
+            self._match(p, s)
+        # Free-only matching is maximal for the new vertices; finish with augmenting searches
+        added = len(result)
+        for p in free_p:
+            if p not in self.match_patient and self._augment_from_patient(p):
+                added += 1
+        return added
+
+    # ---- mutations ------------------------------------------------
+
+    def add_patient(self, patient, slots: Iterable = (), group: Hashable = None) -> dict:
+        if patient in self._adj_p:
+            return {}
+        self._adj_p[patient] = {}
+        for s in slots:
+            self._link(patient, s)
+        if group is not None:
+            self._p_group[patient] = group
+            self._group_p.setdefault(group, {})[patient] = None
+            for s in self._group_s.get(group, ()):
+                self._link(patient, s)
+        return self._augment_from_patient(patient)
+
+    def add_slot(self, slot, patients: Iterable = (), group: Hashable = None) -> dict:
+        self._adj_s.setdefault(slot, {})
+        for p in patients:
+            if p in self._adj_p:
+                self._link(p, slot)
+        if group is not None:
+            self._s_group[slot] = group
+            self._group_s.setdefault(group, {})[slot] = None
+            for p in self._group_p.get(group, ()):
+                self._link(p, slot)
+        return self._augment_from_slot(slot)
+
+    def remove_patient(self, patient) -> dict:
+        if patient not in self._adj_p:
+            return {}
+        slot = self.match_patient.pop(patient, None)
+        if slot is not None:
+            del self.match_slot[slot]
+        for s in self._adj_p.pop(patient):
+            self._adj_s[s].pop(patient, None)
+        group = self._p_group.pop(patient, None)
+        if group is not None:
+            members = self._group_p[group]
+            members.pop(patient, None)
+            if not members:
+                del self._group_p[group]
+                for s in list(self._group_s.get(group, ())):
+                    if not self._adj_s[s]:      # no patient left to offer it to
+                        self.remove_slot(s)
+        return self._augment_from_slot(slot) if slot is not None else {}
+
+    def remove_slot(self, slot) -> dict:
+        if slot not in self._adj_s:
+            return {}
+        patient = self.match_slot.pop(slot, None)
+        if patient is not None:
+            del self.match_patient[patient]
+        for p in self._adj_s.pop(slot):
+            self._adj_p[p].pop(slot, None)
+        group = self._s_group.pop(slot, None)
+        if group is not None:
+            members = self._group_s[group]
+            members.pop(slot, None)
+            if not members:
+                del self._group_s[group]
+        if patient is None:
+            return {}
+        changes = self._augment_from_patient(patient)
+        changes.setdefault(patient, None)   # lost its slot and none found
+        return changes
+
+    def drop_group(self, group) -> dict:
+        """Remove every patient and slot of `group`; changes cover patients outside it only."""
+        changes = {}
+        for p in list(self._group_p.get(group, ())):
+            changes.update(self.remove_patient(p))
+        for s in list(self._group_s.get(group, ())):
+            changes.update(self.remove_slot(s))
+        return {p: s for p, s in changes.items() if p in self._adj_p}
+
+    # ---- queries --------------------------------------------------
+
+    def slot_for(self, patient):
+        return self.match_patient.get(patient)
+
+    def get_matches(self) -> dict:
+        return dict(self.match_patient)
+
+    def size(self) -> int:
+        return len(self.match_patient)
+
+    def has_patient(self, patient) -> bool:
+        return patient in self._adj_p
+
+    def has_slot(self, slot) -> bool:
+        return slot in self._adj_s
+
+    def has_group(self, group) -> bool:
+        return bool(self._group_p.get(group))
+
+    def groups(self) -> list:
+        return list(self._group_p.keys() | self._group_s.keys())
+
+    # ---- internals ------------------------------------------------
+
+    def _link(self, patient, slot) -> None:
+        self._adj_p[patient][slot] = None
+        self._adj_s.setdefault(slot, {})[patient] = None
+
+    def _match(self, patient, slot) -> None:
+        self.match_patient[patient] = slot
+        self.match_slot[slot]       = patient
+
+    def _augment_from_patient(self, root) -> dict:
+        """BFS over alternating paths root → slot → patient → … → free slot."""
+        if root in self.match_patient:
+            return {}
+        parent: dict = {}          # slot → patient that reached it
+        queue = deque([root])
+        seen  = {root}
+        while queue:
+            p = queue.popleft()
+            for s in self._adj_p[p]:
+                if s in parent:
+                    continue
+                parent[s] = p
+                owner = self.match_slot.get(s)
+                if owner is None:
+                    return self._flip_from_slot(s, parent)
+                if owner not in seen:
+                    seen.add(owner)
+                    queue.append(owner)
+        return {}
+
+    def _flip_from_slot(self, s, parent: dict) -> dict:
+        changes = {}
+        while True:
+            p    = parent[s]
+            prev = self.match_patient.get(p)
+            self._match(p, s)
+            changes[p] = s
+            if prev is None:
+                return changes
+            s = prev
+
+    def _augment_from_slot(self, root) -> dict:
+        """Mirror search: root slot → patient → its slot → … → free patient."""
+        if root in self.match_slot or root not in self._adj_s:
+            return {}
+        parent: dict = {}          # patient → slot that reached it
+        queue = deque([root])
+        seen  = {root}
+        while queue:
+            s = queue.popleft()
+            for p in self._adj_s[s]:
+                if p in parent:
+                    continue
+                parent[p] = s
+                held = self.match_patient.get(p)
+                if held is None:
+                    return self._flip_from_patient(p, parent)
+                if held not in seen:
+                    seen.add(held)
+                    queue.append(held)
+        return {}
+
+    def _flip_from_patient(self, p, parent: dict) -> dict:
+        changes = {}
+        while True:
+            s    = parent[p]
+            prev = self.match_slot.get(s)
+            self._match(p, s)
+            changes[p] = s
+            if prev is None:
+                return changes
+            p = prev
+
+
+def slot_group(doctor_id, day) -> tuple:
+    """Matcher group for a doctor's slots on one day — walk-ins match within it."""
+    return (str(doctor_id), day.isoformat())
+
+
+def evict_past_groups(matcher: IncrementalMatcher, today) -> int:
+    """Drop slot groups dated before `today` — nobody can be offered those slots any more."""
+    cutoff = today.isoformat()
+    stale  = [g for g in matcher.groups() if g[1] < cutoff]
+    for g in stale:
+        matcher.drop_group(g)
+    return len(stale)
 
-    p_rev = {i: pid for pid, i in p_index.items()}
-    s_rev = {i: sid for sid, i in s_index.items()}
 
-    return {p_rev[pi]: s_rev[si] for pi, si in raw.items()}
+# Registry per branch lives in the state backend
+def get_matcher(branch_id) -> IncrementalMatcher:
+    from .state_backend import get_backend
+    return get_backend().get_matcher(branch_id)
@@ -0,0 +1,226 @@
+# ================================================================
+#  algorithms/branch_graph.py
+#  Branch Road Graph — weighted edges between branches
+#  A* point-to-point routes (haversine heuristic), Dijkstra
+#  single-source, and a cached all-pairs table of branches sorted
+#  by road distance for O(1)-ish overflow redirects (scipy csgraph
+#  for the all-pairs fill)
+#
+#  Edges come from MEDIFLOW_BRANCH_GRAPH (CSV or JSON, see
+#  load_edges); branches with no configured edge are linked to
+#  their FALLBACK_NEIGHBOURS nearest branches at DETOUR_FACTOR ×
+#  great-circle distance.
+# ================================================================
+
+from __future__ import annotations
+import csv
+import heapq
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from .kdtree import KDTree, BranchPoint, haversine_km
+
+FALLBACK_NEIGHBOURS = 6
+DETOUR_FACTOR       = 1.3    # typical road / straight-line ratio for synthesised edges
+
+
+def load_edges(path: str) -> list[tuple[str, str, float, bool]]:
+    """
+    Read (from, to, km, one_way) edges.
+    .json: [{"from": id, "to": id, "km": 12.5, "one_way": false}, ...]
+    other: CSV with a header row from,to,km[,one_way]
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    edges = []
+    for r in rows:
+        one_way = str(r.get("one_way", "")).strip().lower() in ("1", "true", "yes")
+        edges.append((str(r["from"]), str(r["to"]), float(r["km"]), one_way))
+    return edges
+
+
+class BranchGraph:
+    """
+    Weighted branch graph.
+    shortest_path (A*): O(E log V) worst case, far less with the heuristic
+    distances_from (Dijkstra): O(E log V), cached per source
+    nearest_available: O(r) over the cached sorted row, r = branches skipped
+    Any branch or edge change drops the cache.
+    """
+
+    def __init__(self):
+        self._coords: dict[str, tuple[float, float]] = {}
+        self._adj:    dict[str, dict[str, float]] = {}
+        self._configured: list[tuple[str, str, float, bool]] = []
+        self._admissible = True   # every edge ≥ great-circle distance → A* heuristic is exact-safe
+        self._rows: dict[str, list[tuple[float, str]]] = {}   # source → [(km, branch)] ascending
+
+    # ── Construction ─────────────────────────────────────────────
+
+    def build(self, coords: dict[str, tuple[float, float]],
+              edges: Optional[list[tuple[str, str, float, bool]]] = None) -> None:
+        """Replace all branches and configured edges. O(n log n + E)."""
+        self._coords = dict(coords)
+        if edges is not None:
+            self._configured = list(edges)
+        self._relink()
+
+    def add_branch(self, branch_id: str, lat: float, lng: float) -> None:
+        self._coords[branch_id] = (lat, lng)
+        self._relink()
+
+    def remove_branch(self, branch_id: str) -> bool:
+        if self._coords.pop(branch_id, None) is None:
+            return False
+        self._relink()
+        return True
+
+    def _relink(self) -> None:
+        adj: dict[str, dict[str, float]] = {b: {} for b in self._coords}
+        admissible = True
+
+        def link(a: str, b: str, km: float) -> None:
+            nonlocal admissible
+            if km < adj[a].get(b, float("inf")):
+                adj[a][b] = km
+            if km < haversine_km(*self._coords[a], *self._coords[b]) - 1e-9:
+                admissible = False
+
+        for a, b, km, one_way in self._configured:
+            if a in adj and b in adj and a != b:
+                link(a, b, km)
+                if not one_way:
+                    link(b, a, km)
+
+        # Branches the file doesn't mention get straight-line neighbours
+        isolated = [b for b in adj if not adj[b]]
+        if isolated and len(adj) > 1:
+            tree = KDTree()
+            tree.build([BranchPoint(b, lat, lng) for b, (lat, lng) in self._coords.items()])
+            for b in isolated:
+                lat, lng = self._coords[b]
+                for km, nbr in tree.k_nearest_km(lat, lng, FALLBACK_NEIGHBOURS + 1, {b}, only_available=False):
+                    link(b, nbr.branch_id, km * DETOUR_FACTOR)
+                    link(nbr.branch_id, b, km * DETOUR_FACTOR)
+
+        self._adj, self._admissible = adj, admissible
+        self._rows = {}
+
+    # ── Queries ──────────────────────────────────────────────────
+
+    def size(self) -> int:
+        return len(self._coords)
+
+    def edge_count(self) -> int:
+        return sum(len(n) for n in self._adj.values())
+
+    def shortest_path(self, source: str, target: str) -> Optional[tuple[float, list[str]]]:
+        """(km, [source, …, target]) by A*, or None if unreachable."""
+        if source not in self._adj or target not in self._adj:
+            return None
+        if self._admissible:
+            t_lat, t_lng = self._coords[target]
+            h = lambda b: haversine_km(*self._coords[b], t_lat, t_lng)
+        else:
+            h = lambda b: 0.0   # plain Dijkstra — the heuristic could overestimate
+        dist = {source: 0.0}
+        prev: dict[str, str] = {}
+        heap = [(h(source), 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == target:
+                path = [u]
+                while path[-1] != source:
+                    path.append(prev[path[-1]])
+                return d, path[::-1]
+            if d > dist[u]:
+                continue   # stale entry
+            for v, w in self._adj[u].items():
+                nd = d + w
+                if nd < dist.get(v, float("inf")):
+                    dist[v], prev[v] = nd, u
+                    heapq.heappush(heap, (nd + h(v), nd, v))
+        return None
+
+    def distances_from(self, source: str) -> list[tuple[float, str]]:
+        """Every reachable branch as (km, branch_id), nearest first (source excluded). Cached."""
+        row = self._rows.get(source)
+        if row is not None:
+            return row
+        if source not in self._adj:
+            return []
+        dist = {source: 0.0}
+        settled: list[tuple[float, str]] = []
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u != source:
+                settled.append((d, u))   # pops come out in ascending order
+            for v, w in self._adj[u].items():
+                nd = d + w
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        self._rows[source] = settled
+        return settled
+
+    def precompute(self) -> int:
+        """
+        Fill the all-pairs table. O(V · E log V), run as one scipy csgraph
+        call with rows sorted by NumPy. Returns rows computed.
+        """
+        ids = list(self._adj)
+        if len(ids) < 2:
+            return 0
+        pos = {b: i for i, b in enumerate(ids)}
+        src = [pos[a] for a, nbrs in self._adj.items() for _ in nbrs]
+        dst = [pos[b] for nbrs in self._adj.values() for b in nbrs]
+        km  = [w for nbrs in self._adj.values() for w in nbrs.values()]
+        dist  = dijkstra(csr_matrix((km, (src, dst)), shape=(len(ids), len(ids))))
+        np.fill_diagonal(dist, np.inf)
+        order = np.argsort(dist, axis=1, kind="stable")
+        reach = np.isfinite(np.take_along_axis(dist, order, axis=1)).sum(axis=1)
+        for i, b in enumerate(ids):
+            cols = order[i, :reach[i]]
+            self._rows[b] = list(zip(dist[i, cols].tolist(), [ids[j] for j in cols.tolist()]))
+        return len(self._rows)
+
+    def nearest_available(self, origin: str, overloaded_ids: set) -> Optional[tuple[float, str]]:
+        """(km, branch_id) of the closest branch by road that is not overloaded."""
+        for km, b in self.distances_from(origin):
+            if b not in overloaded_ids:
+                return km, b
+        return None
+
+
+# Singleton — per process, derived from the branch table + edge file
+_graph = BranchGraph()
+
+
+def get_branch_graph() -> BranchGraph:
+    return _graph
+
+
+def rebuild_branch_graph(branches: list[dict], precompute: bool = True) -> BranchGraph:
+    """
+    Rebuild from DB branch records and the MEDIFLOW_BRANCH_GRAPH edge file.
+    branches = [{"branch_id": "…", "latitude": 12.9, "longitude": 80.1}, ...]
+    """
+    path  = os.getenv("MEDIFLOW_BRANCH_GRAPH")
+    edges = load_edges(path) if path and os.path.exists(path) else []
+    _graph.build({b["branch_id"]: (b["latitude"], b["longitude"]) for b in branches
+                  if b.get("latitude") and b.get("longitude")}, edges)
+    if precompute:
+        _graph.precompute()
+    return _graph
@@ -1,13 +1,14 @@
 # ================================================================
 #  algorithms/interval_tree.py
-#  Slot Conflict Detection — O(log n) per query
-#  Uses a sorted list of intervals; binary search for overlap check
+#  Slot Conflict Detection — O(log n + k) per query
+#  AVL tree keyed by (start, slot_id), augmented with max end per subtree;
+#  slot_id → node index for O(log n) removal
 # ================================================================
 
-import bisect
-from datetime import datetime
+import heapq
+from datetime import datetime, date, time, timedelta
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
 
 
 @dataclass
@@ -22,22 +23,184 @@ class Interval:
         return self.start < other_end and other_start < self.end
 
 
+class _Node:
+    __slots__ = ("key", "interval", "left", "right", "height", "max_end")
+
+    def __init__(self, interval: Interval):
+        self.key      = (interval.start, interval.slot_id)
+        self.interval = interval
+        self.left:  Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.height   = 1
+        self.max_end  = interval.end
+
+
+def _height(n: Optional[_Node]) -> int:
+    return n.height if n is not None else 0
+
+
+def _update(n: _Node) -> None:
+    left, right = n.left, n.right
+    n.height = 1 + max(_height(left), _height(right))
+    m = n.interval.end
+    if left is not None and left.max_end > m:
+        m = left.max_end
+    if right is not None and right.max_end > m:
+        m = right.max_end
+    n.max_end = m
+
+
+def _rotate_right(y: _Node) -> _Node:
+    x = y.left
+    y.left, x.right = x.right, y
+    _update(y)
+    _update(x)
+    return x
+
+
+def _rotate_left(x: _Node) -> _Node:
+    y = x.right
+    x.right, y.left = y.left, x
+    _update(x)
+    _update(y)
+    return y
+
+
+def _rebalance(n: _Node) -> _Node:
+    _update(n)
+    balance = _height(n.left) - _height(n.right)
+    if balance > 1:
+        if _height(n.left.left) < _height(n.left.right):
+            n.left = _rotate_left(n.left)
+        return _rotate_right(n)
+    if balance < -1:
+        if _height(n.right.right) < _height(n.right.left):
+            n.right = _rotate_right(n.right)
+        return _rotate_left(n)
+    return n
+
+
+def _insert(n: Optional[_Node], node: _Node) -> _Node:
+    if n is None:
+        return node
+    if node.key < n.key:
+        n.left = _insert(n.left, node)
+    else:
+        n.right = _insert(n.right, node)
+    return _rebalance(n)
+
+
+def _delete_min(n: _Node) -> Optional[_Node]:
+    if n.left is None:
+        return n.right
+    n.left = _delete_min(n.left)
+    return _rebalance(n)
+
+
+def _delete(n: Optional[_Node], key: tuple) -> Optional[_Node]:
+    if n is None:
+        return None
+    if key < n.key:
+        n.left = _delete(n.left, key)
+    elif n.key < key:
+        n.right = _delete(n.right, key)
+    else:
+        if n.left is None:
+            return n.right
+        if n.right is None:
+            return n.left
+        # Move the successor node itself up so the slot index stays valid
+        succ = n.right
+        while succ.left is not None:
+            succ = succ.left
+        succ.right = _delete_min(n.right)
+        succ.left  = n.left
+        n = succ
+    return _rebalance(n)
+
+
+def _build(nodes: list[_Node], lo: int, hi: int) -> Optional[_Node]:
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    n = nodes[mid]
+    n.left  = _build(nodes, lo, mid)
+    n.right = _build(nodes, mid + 1, hi)
+    _update(n)
+    return n
+
+
 class IntervalTree:
     """
-    Lightweight interval tree per doctor.
-    Stores sorted intervals and uses bisect for O(log n) conflict detection.
+    Augmented balanced interval tree per doctor.
+    insert / remove: O(log n)    overlap query: O(log n + k)
     """
 
     def __init__(self):
-        # Sorted by start time
-        self._intervals: list[Interval] = []
-        self._starts:    list[datetime] = []   # parallel list for bisect
+        self._root: Optional[_Node] = None
+        self._by_slot: dict = {}   # slot_id → node
+
+    def size(self) -> int:
+        return len(self._by_slot)
+
+    def contains(self, slot_id) -> bool:
+        return slot_id in self._by_slot
+
+    __len__      = size
+    __contains__ = contains
 
     def insert(self, interval: Interval) -> None:
-        """Insert a booked slot. O(log n) bisect + O(n) list insert (acceptable for scheduling)."""
-        idx = bisect.bisect_left(self._starts, interval.start)
-        self._starts.insert(idx, interval.start)
-        self._intervals.insert(idx, interval)
+        """Insert a booked slot in O(log n). Re-inserting a slot_id replaces it."""
+        if interval.slot_id in self._by_slot:
+            self.remove(interval.slot_id)
+        node = _Node(interval)
+        self._root = _insert(self._root, node)
+        self._by_slot[interval.slot_id] = node
+
+    def insert_many(self, intervals: Iterable[Interval]) -> None:
+        """
+        Bulk insert. When the batch is at least as large as the tree, rebuilds
+        a perfectly balanced tree from both in O((n + m) log(n + m)); otherwise
+        inserts one by one.
+        """
+        intervals = list(intervals)
+        if self._root is not None and len(intervals) < len(self._by_slot):
+            for iv in intervals:
+                self.insert(iv)
+            return
+        latest = {n.interval.slot_id: n.interval for n in self._by_slot.values()}
+        latest.update((iv.slot_id, iv) for iv in intervals)
+        nodes  = sorted((_Node(iv) for iv in latest.values()), key=lambda n: n.key)
+        self._root    = _build(nodes, 0, len(nodes))
+        self._by_slot = {n.interval.slot_id: n for n in nodes}
+
+    def remove(self, slot_id) -> None:
+        """Remove a slot when cancelled. O(log n)."""
+        node = self._by_slot.pop(slot_id, None)
+        if node is not None:
+            self._root = _delete(self._root, node.key)
+
+    def iter_overlapping(self, start: datetime, end: datetime) -> Iterator[Interval]:
+        """Yield intervals overlapping [start, end) in start order. O(log n + k)."""
+        stack: list[_Node] = []
+        node = self._root
+        while True:
+            # Descend left, skipping subtrees that all end at or before `start`
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.interval.start >= end:
+                return
+            if node.interval.end > start:
+                yield node.interval
+            node = node.right
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval]:
+        """iter_overlapping as a list — the form a state-backend proxy can return."""
+        return list(self.iter_overlapping(start, end))
 
     def has_conflict(
         self,
@@ -49,28 +212,37 @@ class IntervalTree:
         """
         Check if a proposed (start, end) conflicts with any booked interval
         for the given doctor. Returns conflicting Interval or None.
-        O(log n) to find start position, O(k) to scan nearby — k usually very small.
         """
-        idx = bisect.bisect_left(self._starts, start)
-
-        # Check backward (slots that start before but may end after)
-        for i in range(max(0, idx - 5), min(len(self._intervals), idx + 10)):
-            iv = self._intervals[i]
+        for iv in self.iter_overlapping(start, end):
             if iv.doctor_id != doctor_id:
                 continue
             if exclude_slot_id and iv.slot_id == exclude_slot_id:
                 continue
-            if iv.overlaps(start, end):
-                return iv
+            return iv
         return None
 
-    def remove(self, slot_id: int) -> None:
-        """Remove a slot when cancelled."""
-        for i, iv in enumerate(self._intervals):
-            if iv.slot_id == slot_id:
-                self._intervals.pop(i)
-                self._starts.pop(i)
-                return
+    def find_conflicts(self, intervals: Iterable[Interval]) -> list[Interval]:
+        """
+        Candidates that overlap a stored interval or an earlier candidate.
+        One merged sweep over the span they cover — O(log n + k + m log m)
+        instead of m separate has_conflict calls.
+        """
+        candidates = sorted(intervals, key=lambda iv: (iv.start, iv.slot_id))
+        if not candidates:
+            return []
+        stored  = self.iter_overlapping(candidates[0].start, max(iv.end for iv in candidates))
+        nxt     = next(stored, None)
+        max_end = None           # latest end among everything starting before the current candidate ends
+        conflicts = []
+        for iv in candidates:
+            while nxt is not None and nxt.start < iv.end:
+                max_end = nxt.end if max_end is None else max(max_end, nxt.end)
+                nxt = next(stored, None)
+            if max_end is not None and max_end > iv.start:
+                conflicts.append(iv)
+            else:
+                max_end = iv.end if max_end is None else max(max_end, iv.end)
+        return conflicts
 
     def get_free_slots(
         self,
@@ -81,18 +253,15 @@ class IntervalTree:
     ) -> list[tuple[datetime, datetime]]:
         """
         Return list of free (start, end) windows for a doctor on a given day.
+        Walks only the intervals overlapping the day, already in start order.
         """
-        booked = sorted(
-            [iv for iv in self._intervals if iv.doctor_id == doctor_id
-             and iv.start >= day_start and iv.end <= day_end],
-            key=lambda x: x.start,
-        )
         free = []
         cursor = day_start
-        from datetime import timedelta
         delta = timedelta(minutes=slot_duration_mins)
 
-        for iv in booked:
+        for iv in self.iter_overlapping(day_start, day_end):
+            if iv.doctor_id != doctor_id:
+                continue
             while cursor + delta <= iv.start:
                 free.append((cursor, cursor + delta))
                 cursor += delta
@@ -104,12 +273,103 @@ class IntervalTree:
 
         return free
 
+    def free_windows(
+        self,
+        doctor_id: int,
+        range_start: datetime,
+        range_end: datetime,
+        day_start: time,
+        day_end: time,
+        slot_duration_mins: int = 15,
+        blocked: Optional[list[tuple[datetime, datetime]]] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[datetime, datetime]]:
+        """
+        Free (start, end) windows inside working hours across a whole date range,
+        avoiding booked intervals and `blocked` blackouts. One in-order pass over
+        the intervals overlapping the range — no per-day rescans.
+        """
+        delta  = timedelta(minutes=slot_duration_mins)
+        booked = ((iv.start, iv.end) for iv in self.iter_overlapping(range_start, range_end)
+                  if iv.doctor_id == doctor_id)
+        busy   = heapq.merge(booked, sorted(blocked or ()))
+        pending = next(busy, None)
+
+        free: list[tuple[datetime, datetime]] = []
+        day = range_start.date()
+        while day <= range_end.date():
+            cursor = max(datetime.combine(day, day_start), range_start)
+            close  = min(datetime.combine(day, day_end), range_end)
+            while pending is not None and pending[0] < close:
+                b_start, b_end = pending
+                while cursor + delta <= b_start:
+                    free.append((cursor, cursor + delta))
+                    if limit and len(free) >= limit:
+                        return free
+                    cursor += delta
+                cursor = max(cursor, b_end)
+                if b_end > close:
+                    break            # still busy into the next day — keep it pending
+                pending = next(busy, None)
+            while cursor + delta <= close:
+                free.append((cursor, cursor + delta))
+                if limit and len(free) >= limit:
+                    return free
+                cursor += delta
+            day += timedelta(days=1)
+        return free
+
+
+def merge_free_windows(
+    per_doctor: dict[int, list[tuple[datetime, datetime]]],
+    limit: Optional[int] = None,
+) -> list[tuple[int, datetime, datetime]]:
+    """Merge per-doctor free windows into one earliest-first list of (doctor_id, start, end)."""
+    def tagged(doctor_id, windows):
+        return ((start, end, doctor_id) for start, end in windows)
+
+    merged = heapq.merge(*(tagged(d, w) for d, w in per_doctor.items()))
+    out = []
+    for start, end, doctor_id in merged:
+        out.append((doctor_id, start, end))
+        if limit and len(out) >= limit:
+            break
+    return out
+
 
-# Global registry per doctor
-_trees: dict[int, IntervalTree] = {}
+def expand_recurring(
+    doctor_id,
+    branch_id,
+    start_date: date,
+    weeks: int,
+    days_of_week: Iterable[int],
+    day_start: time,
+    day_end: time,
+    slot_duration_mins: int = 15,
+    every_n_weeks: int = 1,
+    *,
+    slot_id: Callable[[], object],
+) -> list[Interval]:
+    """
+    Expand a weekly recurrence ("Mon–Fri 09:00–13:00, 15 min, 12 weeks") into
+    back-to-back slot intervals, in start order. days_of_week: 0 = Monday.
+    slot_id() is called once per interval and must return a fresh id.
+    """
+    delta = timedelta(minutes=slot_duration_mins)
+    days  = set(days_of_week)
+    out: list[Interval] = []
+    for offset in range(weeks * 7):
+        day = start_date + timedelta(days=offset)
+        if day.weekday() not in days or (offset // 7) % every_n_weeks:
+            continue
+        cursor, close = datetime.combine(day, day_start), datetime.combine(day, day_end)
+        while cursor + delta <= close:
+            out.append(Interval(cursor, cursor + delta, slot_id(), doctor_id, branch_id))
+            cursor += delta
+    return out
 
 
+# Registry per doctor lives in the state backend
 def get_tree(doctor_id: int) -> IntervalTree:
-    if doctor_id not in _trees:
-        _trees[doctor_id] = IntervalTree()
-    return _trees[doctor_id]
+    from .state_backend import get_backend
+    return get_backend().get_tree(doctor_id)
@@ -2,12 +2,52 @@
 #  algorithms/kdtree.py
 #  K-d Tree Branch Search — O(log n) nearest neighbor
 #  Finds closest available branch by GPS coordinates
+#  Great-circle (haversine) distance in km; k-NN keeps a bounded
+#  max-heap and prunes subtrees by a spherical lower bound,
+#  antimeridian included
+#  Updates without a full rebuild: scapegoat inserts, soft deletes,
+#  availability flips — per-subtree live/available counts let the
+#  search skip whole subtrees with nothing to offer
+#  Batch k-NN: unit-vector dot products over query chunks × branches
+#  (one matrix product), argpartition, exact haversine for the k kept
 # ================================================================
 
 from __future__ import annotations
+import heapq
 import math
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+HALF_PI         = math.pi / 2
+BATCH_CELLS     = 4_000_000   # query × branch scores held at once (~32 MB of float64)
+BATCH_DENSE_MAX = 5_000       # above this many branches the tree beats scoring every pair
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two lat/lng points, in kilometres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _unit_vectors(phi: np.ndarray, lam: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere, shape (n, 3)."""
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def _lng_gap(query_lng: float, split: float, far_is_east: bool) -> float:
+    """
+    Smallest angular longitude separation (degrees) between the query and any
+    longitude on the far side of `split` — the side wraps at ±180°.
+    """
+    if far_is_east:   # far side is [split, 180]
+        return max(0.0, min(split - query_lng, 180.0 + query_lng))
+    return max(0.0, min(query_lng - split, 180.0 - query_lng))   # far side is [-180, split)
 
 
 @dataclass
@@ -19,61 +59,201 @@ class BranchPoint:
 
 
 class KDNode:
-    __slots__ = ("point", "left", "right")
+    __slots__ = ("point", "left", "right", "parent", "depth", "phi", "cos_phi", "lam",
+                 "deleted", "size", "live", "avail")
 
-    def __init__(self, point: BranchPoint):
+    def __init__(self, point: BranchPoint, depth: int = 0, parent: Optional["KDNode"] = None):
         self.point: BranchPoint             = point
         self.left:  Optional["KDNode"]      = None
         self.right: Optional["KDNode"]      = None
+        self.parent: Optional["KDNode"]     = parent
+        self.depth   = depth
+        # Radians, precomputed for haversine
+        self.phi     = math.radians(point.lat)
+        self.cos_phi = math.cos(self.phi)
+        self.lam     = math.radians(point.lng)
+        # Subtree counters: all nodes (balance), live points, live + available points (pruning)
+        self.deleted = False
+        self.size    = 1
+        self.live    = 1
+        self.avail   = 1 if point.is_available else 0
+
+
+def _pull(node: KDNode) -> None:
+    """Recompute a node's subtree counters from its children."""
+    size, live = 1, 0 if node.deleted else 1
+    avail = 1 if not node.deleted and node.point.is_available else 0
+    for child in (node.left, node.right):
+        if child is not None:
+            size += child.size; live += child.live; avail += child.avail
+    node.size, node.live, node.avail = size, live, avail
 
 
 class KDTree:
     """
     2D K-d Tree for branch nearest-neighbor search.
+    Splits on lat/lng degrees; distances are haversine km.
     Build: O(n log n)
-    Query: O(log n) average
+    Insert: O(log n) amortised — scapegoat partial rebuilds keep depth ≤ log_{1/α} n
+    Remove / set_available: O(log n) — soft delete, counters updated up the path
+    Query: O(log n + k log k) average; subtrees with nothing available are skipped
     """
 
+    ALPHA = 0.7   # a child may hold at most 70% of its parent's subtree
+
     def __init__(self):
         self._root: Optional[KDNode] = None
-        self._points: list[BranchPoint] = []
+        self._points: list[BranchPoint] = []      # live points, batch-query order
+        self._index: dict[int, int] = {}          # branch_id → position in _points
+        self._by_id: dict[int, KDNode] = {}
+        self._deleted = 0
+        self._arrays: Optional[tuple] = None      # batch-query columns, rebuilt lazily
+        self.availability_version = -1            # load-balancer overload state last applied
 
     def build(self, points: list[BranchPoint]) -> None:
         """Build tree from list of branch points."""
-        self._points = points
-        self._root = self._build(list(points), depth=0)
+        self._points = list(points)
+        self._index  = {p.branch_id: i for i, p in enumerate(self._points)}
+        self._by_id  = {}
+        self._deleted = 0
+        self._arrays = None
+        self.availability_version = -1            # fresh points: overload state not applied yet
+        self._root = self._build(list(points), depth=0, parent=None)
 
-    def _build(self, pts: list[BranchPoint], depth: int) -> Optional[KDNode]:
+    def _build(self, pts: list[BranchPoint], depth: int, parent: Optional[KDNode]) -> Optional[KDNode]:
         if not pts:
             return None
         axis = depth % 2   # 0=lat, 1=lng
         pts.sort(key=lambda p: p.lat if axis == 0 else p.lng)
         mid = len(pts) // 2
-        node = KDNode(pts[mid])
-        node.left  = self._build(pts[:mid],   depth + 1)
-        node.right = self._build(pts[mid+1:], depth + 1)
+        node = KDNode(pts[mid], depth, parent)
+        self._by_id[pts[mid].branch_id] = node
+        node.left  = self._build(pts[:mid],   depth + 1, node)
+        node.right = self._build(pts[mid+1:], depth + 1, node)
+        _pull(node)
         return node
 
+    def size(self) -> int:
+        return len(self._by_id)
+
+    def contains(self, branch_id) -> bool:
+        return branch_id in self._by_id
+
     def insert(self, point: BranchPoint) -> None:
-        """Insert a new branch into existing tree."""
+        """Insert a branch (replacing one with the same id). O(log n) amortised."""
+        if point.branch_id in self._by_id:
+            self.remove(point.branch_id)
+        self._index[point.branch_id] = len(self._points)
         self._points.append(point)
-        self._root = self._insert(self._root, point, depth=0)
+        self._arrays = None
 
-    def _insert(self, node: Optional[KDNode], point: BranchPoint, depth: int) -> KDNode:
+        if self._root is None:
+            self._root = self._by_id[point.branch_id] = KDNode(point)
+            return
+        node, depth = self._root, 0
+        while True:
+            axis = depth % 2
+            val_new  = point.lat if axis == 0 else point.lng
+            val_node = node.point.lat if axis == 0 else node.point.lng
+            side  = "left" if val_new < val_node else "right"
+            child = getattr(node, side)
+            if child is None:
+                leaf = KDNode(point, depth + 1, node)
+                setattr(node, side, leaf)
+                break
+            node, depth = child, depth + 1
+        self._by_id[point.branch_id] = leaf
+
+        # Counters up the path, then rebuild the highest α-unbalanced ancestor if too deep
+        scapegoat = None
+        n = node
+        while n is not None:
+            _pull(n)
+            n = n.parent
+        if leaf.depth > math.log(max(self._root.size, 2)) / math.log(1 / self.ALPHA):
+            n = leaf
+            while n.parent is not None:
+                if n.size > self.ALPHA * n.parent.size:
+                    scapegoat = n.parent
+                n = n.parent
+        if scapegoat is not None:
+            self._rebuild_subtree(scapegoat)
+
+    def remove(self, branch_id) -> bool:
+        """Soft delete: the node stays as a splitter until its subtree is rebuilt. O(log n)."""
+        node = self._by_id.pop(branch_id, None)
         if node is None:
-            return KDNode(point)
-        axis = depth % 2
-        val_new  = point.lat if axis == 0 else point.lng
-        val_node = node.point.lat if axis == 0 else node.point.lng
-        if val_new < val_node:
-            node.left  = self._insert(node.left,  point, depth + 1)
+            return False
+        node.deleted = True
+        n = node
+        while n is not None:
+            _pull(n)
+            n = n.parent
+        self._deleted += 1
+        # Swap-remove from the batch list
+        i, last = self._index.pop(branch_id), self._points.pop()
+        if last.branch_id != branch_id:
+            self._points[i] = last
+            self._index[last.branch_id] = i
+        self._arrays = None
+        if self._deleted > len(self._by_id):   # mostly tombstones: compact everything
+            self._rebuild_subtree(self._root)
+        return True
+
+    def set_available(self, branch_id, available: bool) -> bool:
+        """Flip a branch's availability in place. O(log n). Returns True if it changed."""
+        node = self._by_id.get(branch_id)
+        if node is None or node.point.is_available == available:
+            return False
+        node.point.is_available = available
+        n = node
+        while n is not None:
+            _pull(n)
+            n = n.parent
+        if self._arrays is not None:
+            self._arrays[3][self._index[branch_id]] = available
+        return True
+
+    def apply_overloaded(self, overloaded_ids: set, version: int) -> int:
+        """Sync availability with the load balancer's overloaded set. Returns flips made."""
+        flips = sum(self.set_available(bid, bid not in overloaded_ids) for bid in list(self._by_id))
+        self.availability_version = version
+        return flips
+
+    def _rebuild_subtree(self, node: KDNode) -> None:
+        """Balanced rebuild of `node`'s subtree from its live points, dropping tombstones."""
+        pts, stack = [], [node]
+        while stack:
+            n = stack.pop()
+            if not n.deleted:
+                pts.append(n.point)
+            stack.extend(c for c in (n.left, n.right) if c is not None)
+        parent = node.parent
+        fresh  = self._build(pts, node.depth, parent)
+        if parent is None:
+            self._root = fresh
+        elif parent.left is node:
+            parent.left = fresh
         else:
-            node.right = self._insert(node.right, point, depth + 1)
-        return node
+            parent.right = fresh
+        n = parent
+        while n is not None:
+            _pull(n)
+            n = n.parent
+        self._deleted = (self._root.size - self._root.live) if self._root else 0
+
+    def height(self) -> int:
+        """Deepest node's depth + 1 (0 for an empty tree). O(n)."""
+        best, stack = 0, [(self._root, 1)] if self._root else []
+        while stack:
+            n, h = stack.pop()
+            best = max(best, h)
+            stack.extend((c, h + 1) for c in (n.left, n.right) if c is not None)
+        return best
 
     @staticmethod
     def _dist(a: BranchPoint, b: BranchPoint) -> float:
-        return math.sqrt((a.lat - b.lat) ** 2 + (a.lng - b.lng) ** 2)
+        return haversine_km(a.lat, a.lng, b.lat, b.lng)
 
     def nearest(
         self,
@@ -84,33 +264,10 @@ class KDTree:
     ) -> Optional[BranchPoint]:
         """
         Find nearest available branch to (query_lat, query_lng).
-        O(log n) average.
+        O(log n) average — the k = 1 case of k_nearest.
         """
-        query = BranchPoint(branch_id=-1, lat=query_lat, lng=query_lng)
-        exclude = exclude_branch_ids or set()
-        best = [None, float("inf")]
-
-        def search(node: Optional[KDNode], depth: int) -> None:
-            if node is None:
-                return
-            pt = node.point
-            if pt.branch_id not in exclude:
-                if not only_available or pt.is_available:
-                    d = self._dist(query, pt)
-                    if d < best[1]:
-                        best[0] = pt
-                        best[1] = d
-
-            axis = depth % 2
-            diff = (query.lat - pt.lat) if axis == 0 else (query.lng - pt.lng)
-            close, away = (node.left, node.right) if diff < 0 else (node.right, node.left)
-
-            search(close, depth + 1)
-            if diff ** 2 < best[1]:
-                search(away, depth + 1)
-
-        search(self._root, 0)
-        return best[0]
+        found = self.k_nearest_km(query_lat, query_lng, 1, exclude_branch_ids, only_available)
+        return found[0][1] if found else None
 
     def k_nearest(
         self,
@@ -121,19 +278,129 @@ class KDTree:
         only_available:     bool = True,
     ) -> list[BranchPoint]:
         """Return k nearest available branches sorted by distance."""
+        return [pt for _, pt in self.k_nearest_km(query_lat, query_lng, k, exclude_branch_ids, only_available)]
+
+    def k_nearest_km(
+        self,
+        query_lat:          float,
+        query_lng:          float,
+        k:                  int = 3,
+        exclude_branch_ids: Optional[set[int]] = None,
+        only_available:     bool = True,
+    ) -> list[tuple[float, BranchPoint]]:
+        """
+        [(distance_km, branch)] for the k nearest, closest first.
+        Bounded max-heap of size k; a subtree is skipped when the great-circle
+        lower bound to its side of the split is no better than the k-th best.
+        """
+        if k <= 0 or self._root is None:
+            return []
         exclude = exclude_branch_ids or set()
-        query = BranchPoint(branch_id=-1, lat=query_lat, lng=query_lng)
-        results = []
+        q_phi   = math.radians(query_lat)
+        q_cos   = math.cos(q_phi)
+        q_lam   = math.radians(query_lng)
+        sin_, asin_, sqrt_ = math.sin, math.asin, math.sqrt
 
-        for pt in self._points:
-            if pt.branch_id in exclude:
+        heap: list[tuple[float, int, BranchPoint]] = []   # (-dist, tiebreak, point)
+        worst = math.inf
+        seq   = 0
+        stack: list[tuple[KDNode, int, float]] = [(self._root, 0, 0.0)]
+        while stack:
+            node, depth, bound = stack.pop()
+            if bound >= worst or (node.avail if only_available else node.live) == 0:
                 continue
-            if only_available and not pt.is_available:
-                continue
-            results.append((self._dist(query, pt), pt))
+            pt = node.point
+            if (not node.deleted and pt.branch_id not in exclude
+                    and (not only_available or pt.is_available)):
+                a = (sin_((node.phi - q_phi) / 2) ** 2
+                     + q_cos * node.cos_phi * sin_((node.lam - q_lam) / 2) ** 2)
+                d = 2 * EARTH_RADIUS_KM * asin_(min(1.0, sqrt_(a)))
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, seq, pt))
+                elif d < worst:
+                    heapq.heapreplace(heap, (-d, seq, pt))
+                seq += 1
+                if len(heap) == k:
+                    worst = -heap[0][0]
+
+            if depth % 2 == 0:   # split on latitude: meridian arc is the shortest way across
+                diff = query_lat - pt.lat
+                far_bound = EARTH_RADIUS_KM * math.radians(abs(diff))
+            else:                # split on longitude: distance to the nearest meridian beyond it
+                diff = query_lng - pt.lng
+                gap  = math.radians(_lng_gap(query_lng, pt.lng, far_is_east=diff < 0))
+                far_bound = EARTH_RADIUS_KM * asin_(min(1.0, q_cos * sin_(min(gap, HALF_PI))))
+            close, away = (node.left, node.right) if diff < 0 else (node.right, node.left)
+
+            # Far side pushed first so the near side is explored first
+            if away is not None and far_bound < worst:
+                stack.append((away, depth + 1, max(bound, far_bound)))
+            if close is not None:
+                stack.append((close, depth + 1, bound))
 
-        results.sort(key=lambda x: x[0])
-        return [pt for _, pt in results[:k]]
+        return [(-neg, pt) for neg, _, pt in sorted(heap, key=lambda e: (-e[0], e[1]))]
+
+    def _columns(self) -> tuple:
+        if self._arrays is None:
+            pts = self._points
+            phi = np.radians(np.array([p.lat for p in pts], dtype=np.float64))
+            lam = np.radians(np.array([p.lng for p in pts], dtype=np.float64))
+            self._arrays = (
+                phi, lam, _unit_vectors(phi, lam),
+                np.array([p.is_available for p in pts], dtype=bool),
+            )
+        return self._arrays
+
+    def k_nearest_batch(
+        self,
+        lats:               Sequence[float],
+        lngs:               Sequence[float],
+        k:                  int = 3,
+        exclude_branch_ids: Optional[set[int]] = None,
+        only_available:     bool = True,
+    ) -> Iterator[list[tuple[float, BranchPoint]]]:
+        """
+        k_nearest_km for many query points, yielded in input order chunk by chunk.
+        Branches are ranked per chunk with one matrix product of unit vectors
+        (larger dot product = shorter great-circle distance), argpartition
+        picks the k best, and only those get an exact haversine distance.
+        """
+        q_phi_all = np.radians(np.asarray(lats, dtype=np.float64))
+        q_lam_all = np.radians(np.asarray(lngs, dtype=np.float64))
+        phi, lam, xyz, available = self._columns()
+
+        keep = available.copy() if only_available else np.ones(len(self._points), dtype=bool)
+        if exclude_branch_ids:
+            keep &= np.array([p.branch_id not in exclude_branch_ids for p in self._points], dtype=bool)
+        idx = np.flatnonzero(keep)
+        k   = min(k, len(idx))
+        if k <= 0:
+            for _ in range(len(q_phi_all)):
+                yield []
+            return
+        if len(idx) > BATCH_DENSE_MAX:
+            for q_lat, q_lng in zip(lats, lngs):
+                yield self.k_nearest_km(q_lat, q_lng, k, exclude_branch_ids, only_available)
+            return
+        phi, lam, xyz = phi[idx], lam[idx], xyz[idx]
+
+        chunk = max(1, BATCH_CELLS // len(idx))
+        for lo in range(0, len(q_phi_all), chunk):
+            q_phi, q_lam = q_phi_all[lo:lo + chunk], q_lam_all[lo:lo + chunk]
+            dots = _unit_vectors(q_phi, q_lam) @ xyz.T
+            if k < dots.shape[1]:
+                top = np.argpartition(-dots, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(dots.shape[1]), dots.shape)
+            # Exact haversine for the k survivors only, same formula as the tree
+            a = (np.sin((phi[top] - q_phi[:, None]) / 2) ** 2
+                 + np.cos(q_phi)[:, None] * np.cos(phi[top]) * np.sin((lam[top] - q_lam[:, None]) / 2) ** 2)
+            top_d = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+            order = np.argsort(top_d, axis=1, kind="stable")
+            top   = np.take_along_axis(top, order, axis=1)
+            top_d = np.take_along_axis(top_d, order, axis=1)
+            for row_i, row_d in zip(idx[top].tolist(), top_d.tolist()):
+                yield [(d, self._points[i]) for i, d in zip(row_i, row_d)]
 
 
 # Singleton
@@ -147,7 +414,7 @@ def get_kdtree() -> KDTree:
 def rebuild_kdtree(branches: list[dict]) -> None:
     """
     Rebuild tree from DB branch records.
-    Call on startup and when branches change.
+    Called on startup and when the branch set changes (branch_index.py).
     branches = [{"branch_id": 1, "latitude": 12.9, "longitude": 80.1, "is_active": True}, ...]
     """
     points = [
@@ -161,3 +428,18 @@ def rebuild_kdtree(branches: list[dict]) -> None:
         if b.get("latitude") and b.get("longitude")
     ]
     _kdtree.build(points)
+
+
+def sync_availability() -> int:
+    """
+    Mirror the load balancer's overloaded set onto this worker's tree.
+    The balancer may be shared across workers; its overload version only
+    moves when a branch crosses the threshold, so this is one cheap call
+    when nothing changed. Returns the number of branches flipped.
+    """
+    from .load_balancer import get_load_balancer
+    lb = get_load_balancer()
+    if lb.overload_version() == _kdtree.availability_version:
+        return 0
+    version, overloaded = lb.overload_state()
+    return _kdtree.apply_overloaded(set(overloaded), version)
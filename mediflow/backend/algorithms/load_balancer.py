@@ -1,13 +1,16 @@
 # ================================================================
 #  algorithms/load_balancer.py
-#  Weighted Round Robin Load Balancer — O(1) per assignment
-#  + Dijkstra overflow redirect on branch graph
+#  Weighted Round Robin Load Balancer — O(log n) per assignment
+#  + straight-line overflow redirect (road graph: branch_graph.py)
 # ================================================================
 
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Optional
 import heapq
 
+MEMBERSHIP_LOG = 1024   # register/remove entries kept for workers catching up
+
 
 @dataclass
 class BranchNode:
@@ -31,53 +34,143 @@ class WeightedRoundRobin:
     """
     Weighted Round Robin across branches.
     Weight = (1 - load_factor) × specialty_demand_weight
-    O(1) assignment using current-weight algorithm (Nginx-style smooth WRR).
+    Virtual-time (stride) scheduling: each branch has a pass value that
+    advances by 1/weight when it is picked; the smallest pass wins.
+    Non-overloaded branches live in one min-heap, overloaded ones in a
+    fallback heap; stale heap entries are skipped lazily by version.
+    Registrations and removals are also logged with their coordinates,
+    so per-worker geometry can apply them instead of rebuilding.
+    next_branch: O((e + 1) log n) for e excluded branches
+    update_load / register / remove: O(log n)
     """
 
     def __init__(self):
         self._branches: dict[int, BranchNode] = {}
-        self._current_weights: dict[int, float] = {}
-
-    def register(self, branch_id: int, total_capacity: int) -> None:
-        self._branches[branch_id] = BranchNode(branch_id, total_capacity)
-        self._current_weights[branch_id] = 0.0
-
-    def update_load(self, branch_id: int, current_load: int) -> None:
-        if branch_id in self._branches:
-            node = self._branches[branch_id]
-            node.current_load = current_load
-            node.weight = max(0.01, 1.0 - node.load_factor)
+        self._pass:    dict[int, float] = {}   # virtual finish time of each branch's next pick
+        self._version: dict[int, int]   = {}   # heap entries with an older version are stale
+        self._order:   dict[int, int]   = {}   # registration order — deterministic tie-break
+        self._ready:   list[tuple] = []        # (pass, order, version, branch_id), not overloaded
+        self._overflow: list[tuple] = []       # same, overloaded
+        self._vtime = 0.0                      # pass of the last pick
+        self._overload_version = 0   # bumped whenever a branch crosses the overload threshold
+        self._membership_version = 0 # bumped whenever a branch is registered or removed
+        self._membership_log: deque = deque(maxlen=MEMBERSHIP_LOG)   # (version, op, branch_id, lat, lng)
+
+    def _push(self, branch_id: int) -> None:
+        """(Re)queue a branch with a fresh version; its older entries become stale."""
+        node = self._branches[branch_id]
+        ver  = self._version.get(branch_id, 0) + 1
+        self._version[branch_id] = ver
+        heap = self._overflow if node.is_overloaded else self._ready
+        heapq.heappush(heap, (self._pass[branch_id], self._order[branch_id], ver, branch_id))
+        if len(self._ready) + len(self._overflow) > 2 * len(self._branches) + 64:
+            self._compact()
+
+    def _compact(self) -> None:
+        for heap in (self._ready, self._overflow):
+            heap[:] = [e for e in heap if self._version.get(e[3]) == e[2]]
+            heapq.heapify(heap)
+
+    def register(self, branch_id: int, total_capacity: int,
+                 lat: Optional[float] = None, lng: Optional[float] = None) -> None:
+        node = self._branches[branch_id] = BranchNode(branch_id, total_capacity)
+        self._order.setdefault(branch_id, len(self._order))
+        self._pass[branch_id] = self._vtime + 1.0 / node.weight   # one own stride from now, no backlog
+        self._push(branch_id)
+        self._overload_version += 1
+        self._log_membership("add", branch_id, lat, lng)
+
+    def remove(self, branch_id: int) -> bool:
+        """Stop routing to a branch. Its heap entries go stale. False if unknown."""
+        if self._branches.pop(branch_id, None) is None:
+            return False
+        del self._pass[branch_id]
+        self._version[branch_id] += 1   # kept, so a re-registered branch never revives old entries
+        self._overload_version += 1
+        self._log_membership("remove", branch_id, None, None)
+        return True
+
+    def _log_membership(self, op: str, branch_id, lat, lng) -> None:
+        self._membership_version += 1
+        self._membership_log.append((self._membership_version, op, branch_id, lat, lng))
+
+    def update_load(self, branch_id: int, current_load: int) -> Optional[bool]:
+        """Set a branch's load. Returns its overload state (None if unknown)."""
+        if branch_id not in self._branches:
+            return None
+        node = self._branches[branch_id]
+        was, old_weight = node.is_overloaded, node.weight
+        node.current_load = current_load
+        node.weight = max(0.01, 1.0 - node.load_factor)
+        if node.is_overloaded == was and node.weight == old_weight:
+            return was
+        # Rescale the pending stride to the new weight; never schedule in the past
+        ahead = max(0.0, self._pass[branch_id] - self._vtime)
+        self._pass[branch_id] = self._vtime + ahead * old_weight / node.weight
+        self._push(branch_id)
+        if node.is_overloaded != was:
+            self._overload_version += 1
+        return node.is_overloaded
+
+    def overload_version(self) -> int:
+        """Changes only when some branch's overload state flips — cheap to poll."""
+        return self._overload_version
+
+    def membership_version(self) -> int:
+        """Changes only when a branch is registered or removed — cheap to poll."""
+        return self._membership_version
+
+    def membership_changes(self, since: int) -> tuple[int, Optional[list]]:
+        """
+        (version, [(version, op, branch_id, lat, lng)] after `since`) read
+        together. The list is None when the log no longer reaches back to
+        `since` — the caller has to rebuild from the branch table.
+        """
+        version = self._membership_version
+        if since >= version:
+            return version, []
+        if since < version - len(self._membership_log):
+            return version, None
+        return version, list(self._membership_log)[len(self._membership_log) - (version - since):]
+
+    def overload_state(self) -> tuple[int, list]:
+        """(version, overloaded branch ids) read together."""
+        return self._overload_version, [bid for bid, n in self._branches.items() if n.is_overloaded]
+
+    def _pop_valid(self, heap: list, exclude, skipped: list) -> Optional[tuple]:
+        while heap:
+            entry = heapq.heappop(heap)
+            if self._version.get(entry[3]) != entry[2]:
+                continue                        # stale
+            if entry[3] in exclude:
+                skipped.append(entry)
+                continue
+            return entry
+        return None
 
     def next_branch(self, exclude: Optional[list[int]] = None) -> Optional[int]:
         """
-        Smooth Weighted Round Robin — O(1).
-        Returns branch_id with highest effective weight.
+        Branch with the smallest virtual pass — O(log n).
+        Overloaded branches are only used when nothing else is eligible.
         """
-        exclude = exclude or []
-        eligible = {
-            bid: node for bid, node in self._branches.items()
-            if bid not in exclude and not node.is_overloaded
-        }
-        if not eligible:
-            # Fallback: least loaded even if over threshold
-            eligible = {
-                bid: node for bid, node in self._branches.items()
-                if bid not in exclude
-            }
-        if not eligible:
+        exclude = set(exclude) if exclude else ()
+        skipped: list[tuple] = []
+        entry = self._pop_valid(self._ready, exclude, skipped)
+        ready_skipped, skipped = skipped, []
+        if entry is None:
+            # Fallback: overloaded branches, same virtual-time order
+            entry = self._pop_valid(self._overflow, exclude, skipped)
+        for e in ready_skipped:
+            heapq.heappush(self._ready, e)
+        for e in skipped:
+            heapq.heappush(self._overflow, e)
+        if entry is None:
             return None
 
-        total_weight = sum(n.weight for n in eligible.values())
-
-        # Increase current weights
-        for bid in eligible:
-            self._current_weights[bid] = self._current_weights.get(bid, 0.0) + eligible[bid].weight
-
-        # Pick highest current weight
-        best = max(eligible.keys(), key=lambda b: self._current_weights[b])
-
-        # Decrease winner by total weight
-        self._current_weights[best] -= total_weight
+        best = entry[3]
+        self._vtime = max(self._vtime, entry[0])
+        self._pass[best] = entry[0] + 1.0 / self._branches[best].weight
+        self._push(best)
         return best
 
     def get_load_summary(self) -> list[dict]:
@@ -93,7 +186,7 @@ class WeightedRoundRobin:
 
 
 # ----------------------------------------------------------------
-#  Dijkstra for overflow redirect — nearest branch with free slots
+#  Straight-line overflow redirect — see branch_graph for road routing
 # ----------------------------------------------------------------
 
 def nearest_available_branch(
@@ -102,41 +195,23 @@ def nearest_available_branch(
     overloaded_ids:   set[int],
 ) -> Optional[int]:
     """
-    Find nearest non-overloaded branch using Euclidean distance as edge weight.
-    O(n log n) — Dijkstra on fully-connected branch graph.
+    Nearest non-overloaded branch by great-circle distance.
+    On a complete graph the shortest path to any branch is its direct edge,
+    so one O(n) scan replaces Dijkstra.
     """
     if origin_branch_id not in branch_coords:
         return None
-
-    import math
-    origin = branch_coords[origin_branch_id]
-
-    def dist(a: tuple, b: tuple) -> float:
-        return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
-
-    # Min-heap: (distance, branch_id)
-    heap = [(0.0, origin_branch_id)]
-    visited: set[int] = set()
-
-    while heap:
-        d, bid = heapq.heappop(heap)
-        if bid in visited:
-            continue
-        visited.add(bid)
-
-        if bid != origin_branch_id and bid not in overloaded_ids:
-            return bid
-
-        for nbr_id, coords in branch_coords.items():
-            if nbr_id not in visited:
-                heapq.heappush(heap, (dist(origin, coords), nbr_id))
-
-    return None
-
-
-# Singleton
-_wrr = WeightedRoundRobin()
+    from .kdtree import haversine_km
+    lat, lng = branch_coords[origin_branch_id]
+    candidates = [
+        (haversine_km(lat, lng, b_lat, b_lng), bid)
+        for bid, (b_lat, b_lng) in branch_coords.items()
+        if bid != origin_branch_id and bid not in overloaded_ids
+    ]
+    return min(candidates, key=lambda c: c[0])[1] if candidates else None
 
 
+# Singleton lives in the state backend
 def get_load_balancer() -> WeightedRoundRobin:
-    return _wrr
+    from .state_backend import get_backend
+    return get_backend().get_load_balancer()
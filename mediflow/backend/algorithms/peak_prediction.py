@@ -2,10 +2,18 @@
 #  algorithms/peak_prediction.py
 #  Holt-Winters Triple Exponential Smoothing — O(n) per forecast
 #  Captures level + trend + seasonality for appointment demand
+#  HoltWintersBatch: the same recurrences over a (series × time)
+#  array — one NumPy step per time index for every series at once
+#  tune_parameters: per-series grid search on one-step-ahead MSE,
+#  each grid fitted as one batch, series spread over a process pool
 # ================================================================
 
+import itertools
 import math
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Hashable, Optional, Sequence
+
+import numpy as np
 
 
 class HoltWinters:
@@ -34,6 +42,16 @@ class HoltWinters:
         self._seasonal: list[float] = [0.0] * period
         self._fitted:   list[float] = []
         self._is_trained: bool      = False
+        self._n:        int         = 0      # observations consumed — series position
+
+    def params(self) -> tuple[float, float, float]:
+        return self.alpha, self.beta, self.gamma
+
+    def configure(self, alpha: float, beta: float, gamma: float) -> None:
+        """Change smoothing parameters; a fit made with other values is discarded."""
+        if (alpha, beta, gamma) != self.params():
+            self.alpha, self.beta, self.gamma = alpha, beta, gamma
+            self._is_trained = False
 
     def _init_components(self, series: list[float]) -> None:
         n = len(series)
@@ -50,10 +68,10 @@ class HoltWinters:
             sum(series[:self.period])
         ) / (self.period ** 2)
 
-        # Initial seasonal indices
+        # Initial seasonal indices (over the padded series, so n < period works)
         period_avgs = [
             sum(series[i * self.period: (i + 1) * self.period]) / self.period
-            for i in range(n // self.period)
+            for i in range(len(series) // self.period)
         ]
         self._seasonal = [
             series[i] / period_avgs[0] if period_avgs[0] != 0 else 1.0
@@ -67,7 +85,19 @@ class HoltWinters:
         self._init_components(series)
         self._fitted = []
 
-        for i, y in enumerate(series):
+        self._n = 0
+        self._step(series)
+        self._is_trained = True
+        return self
+
+    def update(self, observations: list[float]) -> "HoltWinters":
+        """Fold new observations into a trained model — same result as refitting. O(len)."""
+        if self._is_trained:
+            self._step(observations)
+        return self
+
+    def _step(self, series: list[float]) -> None:
+        for i, y in enumerate(series, start=self._n):
             s = i % self.period
             prev_level = self._level
             prev_trend = self._trend
@@ -76,12 +106,25 @@ class HoltWinters:
             self._trend    = self.beta  * (self._level - prev_level)           + (1 - self.beta)  * prev_trend
             self._seasonal[s] = self.gamma * (y / max(self._level, 0.001))    + (1 - self.gamma) * self._seasonal[s]
             self._fitted.append((self._level + self._trend) * self._seasonal[s])
+        self._n += len(series)
+
+    def is_trained(self) -> bool:
+        return self._is_trained
 
+    def load_state(self, level: float, trend: float, seasonal: list[float], observations: int = 0) -> None:
+        """Install components fitted elsewhere (HoltWintersBatch, ForecastState)."""
+        self._level, self._trend = float(level), float(trend)
+        self._seasonal   = [float(x) for x in seasonal]
+        self._n          = int(observations)
+        self._fitted     = []
         self._is_trained = True
-        return self
+
+    def get_state(self) -> dict:
+        return {"level": self._level, "trend": self._trend,
+                "seasonal": list(self._seasonal), "observations": self._n}
 
     def forecast(self, steps: int = 24) -> list[float]:
-        """Forecast next `steps` values. O(steps)."""
+        """Forecast the `steps` values after the last observation. O(steps)."""
         if not self._is_trained:
             return [0.0] * steps
         forecasts = []
@@ -89,7 +132,7 @@ class HoltWinters:
         seasonal = self._seasonal.copy()
 
         for h in range(1, steps + 1):
-            s = (h - 1) % self.period
+            s = (self._n + h - 1) % self.period   # seasonal phase continues from the series position
             f = (level + h * trend) * seasonal[s]
             forecasts.append(max(0.0, round(f, 2)))
 
@@ -102,18 +145,187 @@ class HoltWinters:
         return [i for i, _ in indexed[:top_n]]
 
 
+class HoltWintersBatch:
+    """
+    HoltWinters.fit for S series in one pass: state is a length-S vector per
+    component and each time step is a handful of NumPy ops, so a Python-level
+    loop runs T times instead of S × T. Ragged series are right-padded and
+    masked — a series stops updating after its last observation.
+    Results match HoltWinters series by series. alpha / beta / gamma may be
+    scalars or length-S arrays (one parameter set per row — grid search).
+    fit: O(S · T) work, O(T) interpreter steps
+    """
+
+    def __init__(self, alpha=0.3, beta=0.1, gamma=0.2, period: int = 24):
+        self.alpha  = alpha
+        self.beta   = beta
+        self.gamma  = gamma
+        self.period = period
+        self.level:    np.ndarray = np.zeros(0)
+        self.trend:    np.ndarray = np.zeros(0)
+        self.seasonal: np.ndarray = np.zeros((0, period))
+        self.trained:  np.ndarray = np.zeros(0, dtype=bool)
+        self.lengths:  np.ndarray = np.zeros(0, dtype=np.int64)
+        self.sse:      np.ndarray = np.zeros(0)
+        self.errors:   np.ndarray = np.zeros(0, dtype=np.int64)
+
+    @property
+    def mse(self) -> np.ndarray:
+        """One-step-ahead mean squared error per series (after the first period); NaN if none."""
+        return np.divide(self.sse, self.errors, out=np.full(len(self.sse), np.nan), where=self.errors > 0)
+
+    def fit(self, series: Sequence[Sequence[float]], keep_fitted: bool = False) -> "HoltWintersBatch":
+        """Train on S series of any lengths. Series shorter than 2 stay untrained."""
+        p, S = self.period, len(series)
+        lengths = np.array([len(x) for x in series], dtype=np.int64)
+        T = int(lengths.max()) if S else 0
+        Y = np.zeros((S, max(T, 2 * p)))
+        for i, x in enumerate(series):
+            Y[i, :len(x)] = x
+        observed = np.arange(Y.shape[1])[None, :] < lengths[:, None]
+        means = np.divide(Y.sum(axis=1), lengths, out=np.zeros(S), where=lengths > 0)
+
+        # Initial components from the first two periods, mean-padded like the scalar class
+        head  = np.where(observed[:, :2 * p], Y[:, :2 * p], means[:, None])
+        level = head[:, :p].sum(axis=1) / p
+        trend = (head[:, p:2 * p].sum(axis=1) - head[:, :p].sum(axis=1)) / p ** 2
+        safe  = np.where(level != 0, level, 1.0)
+        seasonal = np.where((level != 0)[:, None], head[:, :p] / safe[:, None], 1.0)
+
+        a, b, g = (np.asarray(x, dtype=np.float64) for x in (self.alpha, self.beta, self.gamma))
+        fitted = np.zeros((S, T)) if keep_fitted else None
+        sse    = np.zeros(S)
+        for t in range(T):
+            s, y, on = t % p, Y[:, t], observed[:, t]
+            season   = seasonal[:, s]
+            if t >= p:   # the first period seeded the seasonals — not a forecast
+                sse += np.where(on, (y - (level + trend) * season) ** 2, 0.0)
+            new_level = a * (y / np.maximum(season, 0.001)) + (1 - a) * (level + trend)
+            new_trend = b * (new_level - level) + (1 - b) * trend
+            new_season = g * (y / np.maximum(new_level, 0.001)) + (1 - g) * season
+            level = np.where(on, new_level, level)
+            trend = np.where(on, new_trend, trend)
+            seasonal[:, s] = np.where(on, new_season, season)
+            if keep_fitted:
+                fitted[:, t] = np.where(on, (level + trend) * seasonal[:, s], np.nan)
+
+        self.level, self.trend, self.seasonal = level, trend, seasonal
+        self.lengths = lengths
+        self.trained = lengths >= 2
+        self.fitted  = fitted
+        self.sse     = sse
+        self.errors  = np.maximum(lengths - p, 0)
+        return self
+
+    def forecast(self, steps: int = 24) -> np.ndarray:
+        """(S, steps) forecasts, clipped at 0 and rounded like HoltWinters.forecast."""
+        h  = np.arange(1, steps + 1)
+        phase  = (self.lengths[:, None] + h[None, :] - 1) % self.period   # each row continues from its own length
+        season = np.take_along_axis(self.seasonal, phase, axis=1)
+        fc = (self.level[:, None] + h[None, :] * self.trend[:, None]) * season
+        fc = np.maximum(0.0, np.round(fc, 2))
+        fc[~self.trained] = 0.0
+        return fc
+
+    def peak_hours(self, steps: int = 24, top_n: int = 3, fc: Optional[np.ndarray] = None) -> np.ndarray:
+        """(S, top_n) indices of the highest forecast steps, earliest first on ties."""
+        fc = self.forecast(steps) if fc is None else fc
+        return np.argsort(-fc, axis=1, kind="stable")[:, :top_n]
+
+
+# ----------------------------------------------------------------
+#  Parameter tuning — grid search on one-step-ahead error
+# ----------------------------------------------------------------
+
+DEFAULT_PARAMS = (0.3, 0.1, 0.2)   # (alpha, beta, gamma)
+PARAM_GRID = {
+    "alpha": (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.65, 0.8),
+    "beta":  (0.01, 0.05, 0.1, 0.2, 0.3),
+    "gamma": (0.05, 0.1, 0.2, 0.3, 0.5),
+}
+TUNE_CHUNK = 8   # series per task — each task fits chunk × grid rows as one batch
+
+
+def _tune_chunk(task: tuple) -> list[dict]:
+    """Best grid point per series, all series × grid points fitted as one HoltWintersBatch."""
+    series, grid, period = task
+    G = len(grid)
+    rows = [x for x in series for _ in range(G)]
+    params = np.tile(grid, (len(series), 1))
+    batch = HoltWintersBatch(params[:, 0], params[:, 1], params[:, 2], period).fit(rows)
+    mse = batch.mse.reshape(len(series), G)
+    out = []
+    for i in range(len(series)):
+        if np.all(np.isnan(mse[i])):   # under one period: nothing to score
+            out.append({"alpha": DEFAULT_PARAMS[0], "beta": DEFAULT_PARAMS[1], "gamma": DEFAULT_PARAMS[2],
+                        "mse": None})
+            continue
+        j = int(np.nanargmin(mse[i]))
+        out.append({"alpha": float(grid[j, 0]), "beta": float(grid[j, 1]), "gamma": float(grid[j, 2]),
+                    "mse": float(mse[i, j])})
+    return out
+
+
+def tune_parameters(
+    histories: dict[Hashable, Sequence[float]],
+    grid:      Optional[dict] = None,
+    period:    int = 24,
+    workers:   Optional[int] = None,
+    progress:  Optional[Callable[[int, int], None]] = None,
+) -> dict[Hashable, dict]:
+    """
+    Per-series (alpha, beta, gamma) minimising one-step-ahead MSE over `grid`.
+    Chunks of series run in a process pool (workers=1 runs inline).
+    Returns {key: {"alpha", "beta", "gamma", "mse"}}.
+    """
+    grid = grid or PARAM_GRID
+    grid_arr = np.array(list(itertools.product(grid["alpha"], grid["beta"], grid["gamma"])), dtype=np.float64)
+    keys = list(histories)
+    tasks = [([list(histories[k]) for k in keys[i:i + TUNE_CHUNK]], grid_arr, period)
+             for i in range(0, len(keys), TUNE_CHUNK)]
+    results: list[dict] = []
+
+    def collect(chunks) -> None:
+        for chunk in chunks:
+            results.extend(chunk)
+            if progress:
+                progress(len(results), len(keys))
+
+    if workers == 1 or len(tasks) <= 1:
+        collect(map(_tune_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(_tune_chunk, tasks))
+    return dict(zip(keys, results))
+
+
 # ----------------------------------------------------------------
 #  Per-branch, per-department forecaster registry
+#  The parameter table (ForecastParams rows) decides each
+#  forecaster's smoothing; untuned series use DEFAULT_PARAMS.
 # ----------------------------------------------------------------
 
-_forecasters: dict[tuple[int, int], HoltWinters] = {}
+_param_table: dict[tuple[str, str], tuple[float, float, float]] = {}
+_applied:     dict[tuple[str, str], tuple[float, float, float]] = {}   # what this process configured
+
+
+def set_parameter_table(table: dict[tuple[str, str], tuple[float, float, float]]) -> None:
+    _param_table.clear()
+    _param_table.update({(str(b), str(d)): tuple(p) for (b, d), p in table.items()})
+
+
+def parameters_for(branch_id, department_id) -> tuple[float, float, float]:
+    return _param_table.get((str(branch_id), str(department_id)), DEFAULT_PARAMS)
 
 
 def get_forecaster(branch_id: int, department_id: int) -> HoltWinters:
-    key = (branch_id, department_id)
-    if key not in _forecasters:
-        _forecasters[key] = HoltWinters()
-    return _forecasters[key]
+    from .state_backend import get_backend
+    hw = get_backend().get_forecaster(branch_id, department_id)
+    key, params = (str(branch_id), str(department_id)), parameters_for(branch_id, department_id)
+    if _applied.get(key) != params:   # one extra call per process and table change
+        hw.configure(*params)
+        _applied[key] = params
+    return hw
 
 
 def train_forecaster(
@@ -125,3 +337,33 @@ def train_forecaster(
     hw = get_forecaster(branch_id, department_id)
     hw.fit(history)
     return hw.forecast(24)
+
+
+def train_forecasters(
+    histories: dict[tuple[Hashable, Hashable], list[float]],
+    steps:     int = 24,
+    top_n:     int = 3,
+) -> dict[tuple, dict]:
+    """
+    Fit every (branch_id, department_id) series in one HoltWintersBatch pass
+    with its tuned parameters, install each fitted state into its registry
+    forecaster, and return
+    {key: {"forecast": [...], "peak_hours": [...], "state": {...} or None}}.
+    """
+    keys = list(histories)
+    if not keys:
+        return {}
+    params = np.array([parameters_for(*k) for k in keys], dtype=np.float64)
+    batch = HoltWintersBatch(params[:, 0], params[:, 1], params[:, 2]).fit([histories[k] for k in keys])
+    fc    = batch.forecast(steps)
+    peaks = batch.peak_hours(steps, top_n, fc)
+    out = {}
+    for i, (branch_id, department_id) in enumerate(keys):
+        state = None
+        if batch.trained[i]:
+            state = {"level": float(batch.level[i]), "trend": float(batch.trend[i]),
+                     "seasonal": batch.seasonal[i].tolist(), "observations": int(batch.lengths[i])}
+            get_forecaster(branch_id, department_id).load_state(**state)
+        out[(branch_id, department_id)] = {"forecast": fc[i].tolist(), "peak_hours": peaks[i].tolist(),
+                                           "state": state}
+    return out
@@ -1,11 +1,12 @@
 # ================================================================
 #  algorithms/priority_queue.py
-#  Max-Heap Priority Queue — O(log n) insert/extract
+#  Indexed Max-Heap Priority Queue — O(log n) insert/extract/update/remove
 #  Score = (urgency×0.5) + (wait_time×0.3) + (age×0.1) + (type×0.1)
 #  Anti-starvation: wait score grows every minute
+#  Aging mode: ordered by a time-invariant key — no periodic rebuilds
 # ================================================================
 
-import heapq
+import os
 from datetime import datetime
 from dataclasses import dataclass, field
 from typing import Optional
@@ -32,6 +33,15 @@ WEIGHTS = {
     "type":    0.10,
 }
 
+WAIT_POINTS_PER_HOUR = 10     # raw wait score gained per hour in queue
+WAIT_CAP_POINTS      = 40     # anti-starvation cap on the raw wait score
+
+# Final-score points gained per minute of waiting, and minutes until the cap
+WAIT_SLOPE_PER_MIN = WAIT_POINTS_PER_HOUR / 60 * WEIGHTS["wait"]
+WAIT_CAP_MINS      = WAIT_CAP_POINTS / WAIT_POINTS_PER_HOUR * 60
+
+_EPOCH = datetime(1970, 1, 1)
+
 
 @dataclass(order=True)
 class QueueNode:
@@ -50,12 +60,23 @@ class QueueNode:
     is_emergency:   bool      = field(compare=False, default=False)
 
 
+def static_score(urgency: str, appointment_type: str, age: int = 30) -> float:
+    """The part of the final score that does not change while the patient waits."""
+    raw_age = 10 if (age >= 65 or age <= 12) else 5
+    return (
+        URGENCY_SCORES.get(urgency, 50)           * WEIGHTS["urgency"] +
+        raw_age                                   * WEIGHTS["age"]     +
+        TYPE_SCORES.get(appointment_type, 50)     * WEIGHTS["type"]
+    )
+
+
 def compute_score(
     urgency: str,
     appointment_type: str,
     entered_at: datetime,
     age: int = 30,
     emergency_override: bool = False,
+    now: Optional[datetime] = None,
 ) -> dict:
     """
     Compute the composite priority score.
@@ -70,9 +91,9 @@ def compute_score(
             "final_score":       999.0,   # always top of heap
         }
 
-    wait_minutes   = (datetime.utcnow() - entered_at).total_seconds() / 60
+    wait_minutes   = ((now or datetime.utcnow()) - entered_at).total_seconds() / 60
     raw_urgency    = URGENCY_SCORES.get(urgency, 50)
-    raw_wait       = min((wait_minutes / 60) * 10, 40)   # max 40 pts — anti-starvation cap
+    raw_wait       = min((wait_minutes / 60) * WAIT_POINTS_PER_HOUR, WAIT_CAP_POINTS)   # anti-starvation cap
     raw_age        = 10 if (age >= 65 or age <= 12) else 5
     raw_type       = TYPE_SCORES.get(appointment_type, 50)
 
@@ -92,72 +113,373 @@ def compute_score(
     }
 
 
+class _IndexedHeap:
+    """
+    Binary min-heap of (key, node) pairs with an appointment_id → position index.
+    Gives O(log n) update/remove of any node and O(1) membership / size.
+    """
+
+    COMPACT_AFTER = 1024   # deletions before the position index is re-packed
+
+    def __init__(self):
+        self._keys:  list[float]     = []
+        self._nodes: list[QueueNode] = []
+        self._pos:   dict            = {}   # appointment_id → index into _keys/_nodes
+        self._deletions = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, appointment_id) -> bool:
+        return appointment_id in self._pos
+
+    def get(self, appointment_id) -> Optional[QueueNode]:
+        i = self._pos.get(appointment_id)
+        return None if i is None else self._nodes[i]
+
+    def nodes(self) -> list[QueueNode]:
+        return list(self._nodes)
+
+    def peek(self) -> Optional[QueueNode]:
+        return self._nodes[0] if self._nodes else None
+
+    def peek_key(self) -> Optional[float]:
+        return self._keys[0] if self._keys else None
+
+    def push(self, key: float, node: QueueNode) -> None:
+        """Insert, or replace + re-key if the appointment is already present. O(log n)."""
+        i = self._pos.get(node.appointment_id)
+        if i is not None:
+            self._nodes[i] = node
+            self._rekey(i, key)
+            return
+        self._keys.append(key)
+        self._nodes.append(node)
+        i = len(self._keys) - 1
+        self._pos[node.appointment_id] = i
+        self._sift_up(i)
+
+    def update(self, appointment_id, key: float) -> bool:
+        """Change the key of a present node in place. O(log n)."""
+        i = self._pos.get(appointment_id)
+        if i is None:
+            return False
+        self._rekey(i, key)
+        return True
+
+    def pop(self) -> Optional[QueueNode]:
+        if not self._keys:
+            return None
+        return self._delete_at(0)
+
+    def remove(self, appointment_id) -> Optional[QueueNode]:
+        i = self._pos.get(appointment_id)
+        if i is None:
+            return None
+        return self._delete_at(i)
+
+    def rebuild(self, keyed: list[tuple[float, QueueNode]]) -> None:
+        """Replace the contents with `keyed` in O(n) (bottom-up heapify)."""
+        self._keys  = [k for k, _ in keyed]
+        self._nodes = [n for _, n in keyed]
+        for i in range(len(self._keys) // 2 - 1, -1, -1):
+            self._sift_down(i, reindex=False)
+        self._pos = {n.appointment_id: i for i, n in enumerate(self._nodes)}
+        self._deletions = 0
+
+    def compact(self) -> None:
+        """
+        Re-pack the position index. Python dicts keep their table size after
+        deletions, so a queue that churned through a full day would otherwise
+        hold on to every slot it ever used.
+        """
+        self._pos = {n.appointment_id: i for i, n in enumerate(self._nodes)}
+        self._deletions = 0
+
+    # ── internals ─────────────────────────────────────────────
+
+    def _delete_at(self, i: int) -> QueueNode:
+        node = self._nodes[i]
+        del self._pos[node.appointment_id]
+        last_key  = self._keys.pop()
+        last_node = self._nodes.pop()
+        if i < len(self._keys):
+            self._keys[i]  = last_key
+            self._nodes[i] = last_node
+            self._pos[last_node.appointment_id] = i
+            self._sift_up(i)
+            self._sift_down(self._pos[last_node.appointment_id])
+        self._deletions += 1
+        if self._deletions >= self.COMPACT_AFTER and self._deletions > len(self._keys):
+            self.compact()
+        return node
+
+    def _rekey(self, i: int, key: float) -> None:
+        old = self._keys[i]
+        self._keys[i] = key
+        if key < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def _sift_up(self, i: int) -> None:
+        keys, nodes, pos = self._keys, self._nodes, self._pos
+        key, node = keys[i], nodes[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if keys[parent] <= key:
+                break
+            keys[i]  = keys[parent]
+            nodes[i] = nodes[parent]
+            pos[nodes[i].appointment_id] = i
+            i = parent
+        keys[i], nodes[i] = key, node
+        pos[node.appointment_id] = i
+
+    def _sift_down(self, i: int, reindex: bool = True) -> None:
+        keys, nodes, pos = self._keys, self._nodes, self._pos
+        n = len(keys)
+        key, node = keys[i], nodes[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            right = child + 1
+            if right < n and keys[right] < keys[child]:
+                child = right
+            if keys[child] >= key:
+                break
+            keys[i]  = keys[child]
+            nodes[i] = nodes[child]
+            if reindex:
+                pos[nodes[i].appointment_id] = i
+            i = child
+        keys[i], nodes[i] = key, node
+        if reindex:
+            pos[node.appointment_id] = i
+
+
 class MediflowPriorityQueue:
     """
-    Thread-safe max-heap priority queue per (doctor_id, branch_id).
-    Uses Python's heapq (min-heap) with negated scores.
+    Max-heap priority queue per (doctor_id, branch_id).
+    Indexed by appointment_id, so cancellations, completions and emergency
+    overrides update the heap in place — no tombstones, O(1) size().
     """
 
     def __init__(self):
-        self._heap: list[QueueNode] = []
-        self._removed: set[int] = set()   # appointment_ids marked removed (lazy deletion)
+        self._heap = _IndexedHeap()
 
     def push(self, node: QueueNode) -> None:
-        """Insert in O(log n)."""
-        heapq.heappush(self._heap, node)
+        """Insert in O(log n). Re-pushing a queued appointment replaces it."""
+        self._heap.push(node.neg_score, node)
 
     def pop(self) -> Optional[QueueNode]:
         """Extract highest-priority patient in O(log n)."""
-        while self._heap:
-            node = heapq.heappop(self._heap)
-            if node.appointment_id not in self._removed:
-                return node
-        return None
+        return self._heap.pop()
 
     def emergency_insert(self, node: QueueNode) -> QueueNode:
         """
         Preemptive override — assign score=999, push to front effectively.
-        O(log n) heappush; 999 guarantees extraction before all others.
+        If the appointment is already queued it is promoted in place. O(log n).
         """
+        existing = self._heap.get(node.appointment_id)
+        if existing is not None:
+            node = existing
         node.neg_score    = -999.0
         node.is_emergency = True
-        self.push(node)
+        self._heap.push(node.neg_score, node)
+        return node
+
+    def reprioritize(self, appointment_id, final_score: float) -> Optional[QueueNode]:
+        """Move a queued appointment to a new score in O(log n). None if not queued."""
+        node = self._heap.get(appointment_id)
+        if node is None:
+            return None
+        node.neg_score = -final_score
+        self._heap.update(appointment_id, node.neg_score)
         return node
 
-    def remove(self, appointment_id: int) -> None:
-        """Lazy deletion — O(1) mark, skipped on next pop."""
-        self._removed.add(appointment_id)
+    def remove(self, appointment_id) -> Optional[QueueNode]:
+        """True deletion in O(log n). Returns the removed node, if it was queued."""
+        return self._heap.remove(appointment_id)
 
     def peek(self) -> Optional[QueueNode]:
         """View top without extracting."""
-        while self._heap:
-            if self._heap[0].appointment_id not in self._removed:
-                return self._heap[0]
-            heapq.heappop(self._heap)
-        return None
+        return self._heap.peek()
+
+    def get(self, appointment_id) -> Optional[QueueNode]:
+        return self._heap.get(appointment_id)
+
+    def __contains__(self, appointment_id) -> bool:
+        return appointment_id in self._heap
+
+    def __len__(self) -> int:
+        return len(self._heap)
 
     def size(self) -> int:
-        return len([n for n in self._heap if n.appointment_id not in self._removed])
+        """Live entries only — O(1)."""
+        return len(self._heap)
+
+    def compact(self) -> None:
+        """Release index space left behind by removals (also runs automatically)."""
+        self._heap.compact()
+
+    def ordered(self, now: Optional[datetime] = None) -> list:
+        """
+        Queued appointment_ids, highest priority first (scores as of the last
+        rescore). O(n log n). `now` is unused — accepted so callers can treat
+        this and AgingPriorityQueue.ordered alike.
+        """
+        nodes = sorted(self._heap.nodes())
+        return [n.appointment_id for n in nodes]
 
-    def recalculate_all(self) -> None:
+    def recalculate_all(self, now: Optional[datetime] = None) -> None:
         """
         Rebuild heap with updated wait scores — call periodically (e.g. every 5 min).
-        O(n log n) full rebuild.
+        O(n) rescoring + O(n) heapify.
         """
-        valid = [n for n in self._heap if n.appointment_id not in self._removed]
-        for node in valid:
-            scores = compute_score(node.urgency, node.appointment_type, node.entered_at, node.age)
-            node.neg_score = -scores["final_score"]
-        heapq.heapify(valid)
-        self._heap = valid
+        keyed = []
+        for node in self._heap.nodes():
+            if not node.is_emergency:
+                scores = compute_score(node.urgency, node.appointment_type, node.entered_at, node.age, now=now)
+                node.neg_score = -scores["final_score"]
+            keyed.append((node.neg_score, node))
+        self._heap.rebuild(keyed)
+
+
+class AgingPriorityQueue:
+    """
+    Same interface as MediflowPriorityQueue, but never needs rescoring.
+
+    While uncapped, score(t) = static + slope × (t − entered_at), so ordering by
+    the time-invariant key  static − slope × entered_at  is the ordering at any t.
+    Nodes whose wait bonus has hit the cap have the fixed score static + cap;
+    they are moved lazily into a second heap the first time they reach the top
+    of the aging heap (an overestimated node below the top can never win).
+    Emergencies and explicit reprioritizations also live in the fixed heap.
+    Every node migrates at most once, so all operations stay O(log n).
+    """
+
+    def __init__(self):
+        self._aging = _IndexedHeap()   # key = slope × entered_min − static
+        self._fixed = _IndexedHeap()   # key = −score
+
+    @staticmethod
+    def _minutes(dt: datetime) -> float:
+        return (dt - _EPOCH).total_seconds() / 60
+
+    def _settle(self, now: datetime) -> None:
+        """Move capped nodes off the top of the aging heap."""
+        cutoff = self._minutes(now) - WAIT_CAP_MINS
+        while self._aging:
+            node = self._aging.peek()
+            if self._minutes(node.entered_at) > cutoff:
+                return
+            self._aging.pop()
+            capped = static_score(node.urgency, node.appointment_type, node.age) + WAIT_CAP_MINS * WAIT_SLOPE_PER_MIN
+            self._fixed.push(-capped, node)
+
+    def _top(self, now: Optional[datetime]) -> Optional[_IndexedHeap]:
+        """Settle and return the heap holding the current best node (scores refreshed)."""
+        now = now or datetime.utcnow()
+        self._settle(now)
+        best = None
+        if self._aging:
+            node = self._aging.peek()
+            node.neg_score = self._aging.peek_key() - WAIT_SLOPE_PER_MIN * self._minutes(now)
+            best = self._aging
+        if self._fixed and (best is None or self._fixed.peek_key() <= best.peek().neg_score):
+            node = self._fixed.peek()
+            node.neg_score = self._fixed.peek_key()
+            best = self._fixed
+        return best
+
+    def push(self, node: QueueNode) -> None:
+        """Insert in O(log n). Re-pushing a queued appointment replaces it."""
+        if node.is_emergency:
+            self._aging.remove(node.appointment_id)
+            self._fixed.push(node.neg_score, node)
+            return
+        self._fixed.remove(node.appointment_id)
+        key = (WAIT_SLOPE_PER_MIN * self._minutes(node.entered_at)
+               - static_score(node.urgency, node.appointment_type, node.age))
+        self._aging.push(key, node)
+
+    def pop(self, now: Optional[datetime] = None) -> Optional[QueueNode]:
+        """Extract highest-priority patient at `now` in O(log n) amortised."""
+        heap = self._top(now)
+        return heap.pop() if heap is not None else None
+
+    def peek(self, now: Optional[datetime] = None) -> Optional[QueueNode]:
+        heap = self._top(now)
+        return heap.peek() if heap is not None else None
+
+    def emergency_insert(self, node: QueueNode) -> QueueNode:
+        """Preemptive override — score 999, promoted in place if already queued."""
+        existing = self.get(node.appointment_id)
+        if existing is not None:
+            node = existing
+        node.neg_score    = -999.0
+        node.is_emergency = True
+        self.push(node)
+        return node
+
+    def reprioritize(self, appointment_id, final_score: float) -> Optional[QueueNode]:
+        """Pin a queued appointment to a fixed score in O(log n). None if not queued."""
+        node = self._aging.remove(appointment_id) or self._fixed.get(appointment_id)
+        if node is None:
+            return None
+        node.neg_score = -final_score
+        self._fixed.push(node.neg_score, node)
+        return node
+
+    def remove(self, appointment_id) -> Optional[QueueNode]:
+        return self._aging.remove(appointment_id) or self._fixed.remove(appointment_id)
+
+    def get(self, appointment_id) -> Optional[QueueNode]:
+        return self._aging.get(appointment_id) or self._fixed.get(appointment_id)
+
+    def __contains__(self, appointment_id) -> bool:
+        return appointment_id in self._aging or appointment_id in self._fixed
+
+    def __len__(self) -> int:
+        return len(self._aging) + len(self._fixed)
+
+    def size(self) -> int:
+        return len(self)
+
+    def compact(self) -> None:
+        self._aging.compact()
+        self._fixed.compact()
+
+    def ordered(self, now: Optional[datetime] = None) -> list:
+        """
+        Queued appointment_ids in the order pop() would return them at `now`.
+        Scores every node once (aging bonus capped) and sorts — O(n log n),
+        no heap is modified.
+        """
+        t = self._minutes(now or datetime.utcnow())
+        cap = WAIT_CAP_MINS * WAIT_SLOPE_PER_MIN
+        keyed = [(k, n.appointment_id) for k, n in zip(self._fixed._keys, self._fixed._nodes)]
+        for k, n in zip(self._aging._keys, self._aging._nodes):
+            capped = -(static_score(n.urgency, n.appointment_type, n.age) + cap)
+            keyed.append((max(k - WAIT_SLOPE_PER_MIN * t, capped), n.appointment_id))
+        keyed.sort(key=lambda kv: kv[0])
+        return [a for _, a in keyed]
+
+    def recalculate_all(self, now: Optional[datetime] = None) -> None:
+        """Nothing to rescore — only migrates nodes that crossed the wait cap."""
+        self._settle(now or datetime.utcnow())
+
 
+# "aging" (default) or "rescore" — the latter needs periodic recalculate_all()
+QUEUE_MODE = os.getenv("MEDIFLOW_QUEUE_MODE", "aging")
 
-# Global queue registry: key = (doctor_id, branch_id)
-_queues: dict[tuple[int, int], MediflowPriorityQueue] = {}
+def new_queue() -> MediflowPriorityQueue | AgingPriorityQueue:
+    return AgingPriorityQueue() if QUEUE_MODE == "aging" else MediflowPriorityQueue()
 
 
-def get_queue(doctor_id: int, branch_id: int) -> MediflowPriorityQueue:
-    key = (doctor_id, branch_id)
-    if key not in _queues:
-        _queues[key] = MediflowPriorityQueue()
-    return _queues[key]
+# Registry lives in the state backend: key = (doctor_id, branch_id)
+def get_queue(doctor_id: int, branch_id: int) -> MediflowPriorityQueue | AgingPriorityQueue:
+    from .state_backend import get_backend
+    return get_backend().get_queue(doctor_id, branch_id)
@@ -0,0 +1,519 @@
+# ================================================================
+#  algorithms/state_backend.py
+#  Where the algorithm singletons live — queues, interval trees,
+#  load balancer, forecasters, wait-time estimators, slot matchers
+#
+#  inprocess (default): plain dicts in this process (one uvicorn worker)
+#  socket:              one state server per host, shared by every worker
+#                       over a Unix socket (or localhost TCP) via
+#                       multiprocessing.managers proxies
+#
+#  MEDIFLOW_STATE_BACKEND  = inprocess | socket
+#  MEDIFLOW_STATE_ADDRESS  = /path/to.sock  or  host:port
+#  MEDIFLOW_STATE_AUTHKEY  = shared secret for the state server —
+#                            required for host:port; for a socket it
+#                            defaults to a random key generated on first
+#                            start into <socket>.key (mode 0600)
+#  MEDIFLOW_DEPLOY_ID      = release id (default: hash of the backend sources)
+#
+#  The server unpickles whatever an authenticated client sends, so the
+#  key is the only thing between a local user and code execution in it.
+#  The default socket lives in a per-user 0700 directory under the temp
+#  dir and is itself chmod 0600.
+#
+#  Run the server by hand with:  python -m algorithms.state_backend
+#  (workers also start it on demand if nothing is listening)
+#
+#  The server outlives the workers, so it is tied to a deploy id: a
+#  worker that finds a server from another release stops it and starts
+#  one running its own code, which the first worker then warm-starts
+#  from the DB. Restart all workers of a host together. To force a
+#  fresh server (e.g. after editing the DB by hand), stop it and then
+#  restart the workers — the first to connect starts and seeds a new one:
+#      python -m algorithms.state_backend --stop
+# ================================================================
+
+import glob
+import hashlib
+import os
+import secrets
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from multiprocessing.managers import BaseManager
+from typing import Optional, Union
+
+from .priority_queue import new_queue, MediflowPriorityQueue, AgingPriorityQueue
+from .interval_tree import IntervalTree
+from .bipartite_matching import IncrementalMatcher
+from .load_balancer import WeightedRoundRobin
+from .peak_prediction import HoltWinters
+from .wait_time import WaitTimeEstimator
+
+Address = Union[str, tuple[str, int]]
+
+
+class StateBackend:
+    """Interface every backend implements. Keys are the same strings the routers use."""
+
+    name = "base"
+
+    def get_queue(self, doctor_id, branch_id):
+        raise NotImplementedError
+
+    def get_tree(self, doctor_id):
+        raise NotImplementedError
+
+    def get_load_balancer(self):
+        raise NotImplementedError
+
+    def get_forecaster(self, branch_id, department_id):
+        raise NotImplementedError
+
+    def get_estimator(self, doctor_id, branch_id):
+        raise NotImplementedError
+
+    def get_matcher(self, branch_id):
+        raise NotImplementedError
+
+    def claim_warm_start(self) -> bool:
+        """True for exactly one caller per backend lifetime — that caller seeds the state."""
+        raise NotImplementedError
+
+
+class InProcessBackend(StateBackend):
+    """Per-process dicts — the original behaviour, correct with a single worker."""
+
+    name = "inprocess"
+
+    def __init__(self):
+        self._queues:      dict[tuple, object] = {}
+        self._trees:       dict[object, IntervalTree] = {}
+        self._forecasters: dict[tuple, HoltWinters] = {}
+        self._estimators:  dict[tuple, WaitTimeEstimator] = {}
+        self._matchers:    dict[object, IncrementalMatcher] = {}
+        self._wrr = WeightedRoundRobin()
+        self._warm_claimed = False
+        self._claim_lock = threading.Lock()
+
+    def get_queue(self, doctor_id, branch_id):
+        key = (doctor_id, branch_id)
+        if key not in self._queues:
+            self._queues[key] = new_queue()
+        return self._queues[key]
+
+    def get_tree(self, doctor_id):
+        if doctor_id not in self._trees:
+            self._trees[doctor_id] = IntervalTree()
+        return self._trees[doctor_id]
+
+    def get_load_balancer(self):
+        return self._wrr
+
+    def get_forecaster(self, branch_id, department_id):
+        key = (branch_id, department_id)
+        if key not in self._forecasters:
+            self._forecasters[key] = HoltWinters()
+        return self._forecasters[key]
+
+    def get_estimator(self, doctor_id, branch_id):
+        key = (doctor_id, branch_id)
+        if key not in self._estimators:
+            self._estimators[key] = WaitTimeEstimator()
+        return self._estimators[key]
+
+    def get_matcher(self, branch_id):
+        if branch_id not in self._matchers:
+            self._matchers[branch_id] = IncrementalMatcher()
+        return self._matchers[branch_id]
+
+    def claim_warm_start(self) -> bool:
+        with self._claim_lock:
+            claimed, self._warm_claimed = self._warm_claimed, True
+            return not claimed
+
+
+# ----------------------------------------------------------------
+#  Shared state server (multiprocessing.managers over a local socket)
+# ----------------------------------------------------------------
+
+# Protocol methods proxied too, so len(queue) / x in tree work on both backends
+_PROTOCOL = ("__len__", "__contains__")
+
+
+def _public_methods(*classes) -> tuple[str, ...]:
+    names = set()
+    for cls in classes:
+        names.update(n for n in dir(cls)
+                     if (not n.startswith("_") or n in _PROTOCOL) and callable(getattr(cls, n)))
+    return tuple(sorted(names))
+
+
+# What each proxy may call on the server-side object
+_EXPOSED = {
+    "get_queue":         _public_methods(MediflowPriorityQueue, AgingPriorityQueue),
+    "get_tree":          _public_methods(IntervalTree),
+    "get_load_balancer": _public_methods(WeightedRoundRobin),
+    "get_forecaster":    _public_methods(HoltWinters),
+    "get_estimator":     _public_methods(WaitTimeEstimator),
+    "get_matcher":       _public_methods(IncrementalMatcher),
+}
+
+
+class _Locked:
+    """
+    Server-side wrapper: every proxied method call runs under one lock, so
+    concurrent workers see each operation as atomic and in a single order.
+    Generators are drained under the lock — they cannot be pickled back.
+    """
+
+    def __init__(self, obj, lock: threading.RLock):
+        self._obj  = obj
+        self._lock = lock
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                result = attr(*args, **kwargs)
+                return list(result) if isinstance(result, types.GeneratorType) else result
+        return call
+
+
+class _StateManager(BaseManager):
+    pass
+
+
+class _StateClient(BaseManager):
+    pass
+
+
+for _typeid, _exposed in _EXPOSED.items():
+    _StateClient.register(_typeid, exposed=_exposed)
+_StateClient.register("claim_warm_start")
+_StateClient.register("deploy_id")
+_StateClient.register("stop_server")
+
+
+def _private_dir() -> str:
+    """Per-user 0700 directory for the default socket; refuses one someone else set up."""
+    path = os.path.join(tempfile.gettempdir(), f"mediflow-state-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be a directory owned by this user with mode 0700")
+    return path
+
+
+def default_address() -> Address:
+    raw = os.getenv("MEDIFLOW_STATE_ADDRESS")
+    if raw:
+        host, sep, port = raw.rpartition(":")
+        if sep and port.isdigit() and os.sep not in raw:
+            return (host or "127.0.0.1", int(port))
+        return raw
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(_private_dir(), "state.sock")
+    return ("127.0.0.1", 50555)
+
+
+def default_authkey(address: Optional[Address] = None) -> bytes:
+    """
+    MEDIFLOW_STATE_AUTHKEY, else — for a Unix socket only — the key in
+    <socket>.key, generated on first use. A TCP listener needs the env key.
+    """
+    raw = os.getenv("MEDIFLOW_STATE_AUTHKEY")
+    if raw:
+        return raw.encode()
+    address = address or default_address()
+    if not isinstance(address, str):
+        raise RuntimeError("MEDIFLOW_STATE_AUTHKEY must be set for a TCP state server")
+    path = address + ".key"
+    if not os.path.exists(path):
+        # Write under a temp name and link into place: racing workers agree on one key
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".key-")   # mode 0600
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            try:
+                os.link(tmp, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(tmp)
+    st = os.lstat(path)
+    if not stat.S_ISREG(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be a file owned by this user with mode 0600")
+    with open(path) as f:
+        return f.read().strip().encode()
+
+
+def default_deploy_id() -> str:
+    """MEDIFLOW_DEPLOY_ID, else a hash of the backend's .py files — any code change is a new release."""
+    raw = os.getenv("MEDIFLOW_DEPLOY_ID")
+    if raw:
+        return raw
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(backend_dir, "*.py")) + glob.glob(os.path.join(backend_dir, "*", "*.py"))):
+        digest.update(os.path.relpath(path, backend_dir).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _is_listening(address: Address, authkey: bytes) -> bool:
+    try:
+        _StateClient(address=address, authkey=authkey).connect()
+        return True
+    except (OSError, EOFError):
+        return False
+
+
+def _hold_socket_lock(address: str):
+    """
+    Exclusive lock next to a Unix socket, held for the server's lifetime, so
+    workers racing to start a server cannot unlink each other's socket.
+    None if another server holds it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return open(address + ".lock", "a")
+    f = open(address + ".lock", "a")
+    deadline = time.monotonic() + 5.0   # a stopped server may still be exiting
+    while True:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except OSError:
+            if time.monotonic() > deadline:
+                f.close()
+                return None
+            time.sleep(0.05)
+
+
+def serve(address: Optional[Address] = None, authkey: Optional[bytes] = None,
+          deploy_id: Optional[str] = None) -> None:
+    """Run the state server in the foreground. Exits quietly if one is already up."""
+    address   = address or default_address()
+    authkey   = authkey or default_authkey(address)
+    deploy_id = deploy_id or default_deploy_id()
+
+    if _is_listening(address, authkey):
+        print(f"  ✔ State server already running on {address}")
+        return
+    if isinstance(address, str):
+        lock_file = _hold_socket_lock(address)   # held until this process exits
+        if lock_file is None or _is_listening(address, authkey):
+            print(f"  ✔ State server already running on {address}")
+            return
+        if os.path.exists(address):
+            os.unlink(address)   # stale socket left by a dead server
+
+    state = InProcessBackend()
+    lock  = threading.RLock()
+
+    def shared(getter):
+        def create(*key):
+            with lock:   # registry lookups/creation are serialised too
+                return _Locked(getter(*key), lock)
+        return create
+
+    _StateManager.register("get_queue",         callable=shared(state.get_queue),         exposed=_EXPOSED["get_queue"])
+    _StateManager.register("get_tree",          callable=shared(state.get_tree),          exposed=_EXPOSED["get_tree"])
+    _StateManager.register("get_load_balancer", callable=shared(state.get_load_balancer), exposed=_EXPOSED["get_load_balancer"])
+    _StateManager.register("get_forecaster",    callable=shared(state.get_forecaster),    exposed=_EXPOSED["get_forecaster"])
+    _StateManager.register("get_estimator",     callable=shared(state.get_estimator),     exposed=_EXPOSED["get_estimator"])
+    _StateManager.register("get_matcher",       callable=shared(state.get_matcher),       exposed=_EXPOSED["get_matcher"])
+    _StateManager.register("claim_warm_start", callable=state.claim_warm_start)
+    _StateManager.register("deploy_id",        callable=lambda: deploy_id)
+
+    def stop():
+        # Reply first, then exit hard — workers' open connections would keep serve_forever alive
+        def exit_now():
+            if isinstance(address, str) and os.path.exists(address):
+                os.unlink(address)
+            os._exit(0)
+        threading.Timer(0.1, exit_now).start()
+    _StateManager.register("stop_server",      callable=stop)
+
+    server = _StateManager(address=address, authkey=authkey).get_server()
+    if isinstance(address, str):
+        os.chmod(address, 0o600)
+    print(f"🧠  MediFlow state server listening on {address} (deploy {deploy_id})")
+    server.serve_forever()
+
+
+def stop_server(address: Optional[Address] = None, authkey: Optional[bytes] = None,
+                timeout: float = 10.0) -> bool:
+    """Ask the host's state server to exit; True once nothing is listening."""
+    address = address or default_address()
+    authkey = authkey or default_authkey(address)
+    try:
+        client = _StateClient(address=address, authkey=authkey)
+        client.connect()
+        client.stop_server()
+    except (OSError, EOFError):
+        pass   # already gone, or went down while answering
+    deadline = time.monotonic() + timeout
+    while _is_listening(address, authkey):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+class SocketBackend(StateBackend):
+    """
+    Proxies to the host's state server. Every worker on the host sees the same
+    objects; each call is one local round trip. Proxies are cached per key.
+    """
+
+    name = "socket"
+
+    def __init__(self, address: Optional[Address] = None, authkey: Optional[bytes] = None,
+                 autostart: bool = True, connect_timeout: float = 10.0, deploy_id: Optional[str] = None):
+        self._address   = address or default_address()
+        self._authkey   = authkey or default_authkey(self._address)
+        self._deploy_id = deploy_id or default_deploy_id()
+        self._manager: Optional[_StateClient] = None
+        self._proxies: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        self._connect(autostart, connect_timeout)
+
+    def _connect(self, autostart: bool, timeout: float) -> None:
+        """
+        Connect, starting the server first if allowed; retries until `timeout`.
+        A server from another deploy is stopped and replaced (autostart only).
+        """
+        deadline = time.monotonic() + timeout
+        spawned  = False
+        while True:
+            try:
+                theirs = self._remote_deploy_id()
+            except (OSError, EOFError):
+                if autostart and not spawned:
+                    self._spawn_server()
+                    spawned = True
+                elif time.monotonic() > deadline:
+                    raise RuntimeError(f"State server not reachable on {self._address}")
+                time.sleep(0.05)
+                continue
+            if theirs == self._deploy_id:
+                self._manager = _StateClient(address=self._address, authkey=self._authkey)
+                self._manager.connect()
+                self._proxies.clear()
+                return
+            if not autostart:
+                raise RuntimeError(f"State server on {self._address} runs deploy {theirs}, "
+                                   f"this worker {self._deploy_id} — restart it")
+            stop_server(self._address, self._authkey, max(0.0, deadline - time.monotonic()))
+            spawned = False
+
+    def _remote_deploy_id(self) -> str:
+        """
+        The server's deploy id, asked from a short-lived thread with its own
+        manager. Proxy connections are kept per thread, so none survives
+        pointing at a server this worker may be about to replace.
+        """
+        out: dict = {}
+
+        def ask():
+            try:
+                client = _StateClient(address=self._address, authkey=self._authkey)
+                client.connect()
+                out["id"] = client.deploy_id()._getvalue()
+            except Exception as e:   # re-raised below; the caller retries OSError / EOFError
+                out["error"] = e
+        t = threading.Thread(target=ask, daemon=True)
+        t.start()
+        t.join()
+        if "error" in out:
+            raise out["error"]
+        return out["id"]
+
+    def _spawn_server(self) -> None:
+        # Detached so it outlives the worker that happened to start it
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, "MEDIFLOW_STATE_ADDRESS": self._format_address(),
+               "MEDIFLOW_STATE_AUTHKEY": self._authkey.decode(), "MEDIFLOW_DEPLOY_ID": self._deploy_id}
+        subprocess.Popen([sys.executable, "-m", "algorithms.state_backend"], cwd=backend_dir,
+                         env=env, start_new_session=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _format_address(self) -> str:
+        if isinstance(self._address, tuple):
+            return f"{self._address[0]}:{self._address[1]}"
+        return self._address
+
+    def _proxy(self, typeid: str, *key):
+        cache_key = (typeid, *key)
+        proxy = self._proxies.get(cache_key)
+        if proxy is None:
+            with self._lock:
+                proxy = self._proxies.get(cache_key)
+                if proxy is None:
+                    proxy = getattr(self._manager, typeid)(*key)
+                    self._proxies[cache_key] = proxy
+        return proxy
+
+    def get_queue(self, doctor_id, branch_id):
+        return self._proxy("get_queue", doctor_id, branch_id)
+
+    def get_tree(self, doctor_id):
+        return self._proxy("get_tree", doctor_id)
+
+    def get_load_balancer(self):
+        return self._proxy("get_load_balancer")
+
+    def get_forecaster(self, branch_id, department_id):
+        return self._proxy("get_forecaster", branch_id, department_id)
+
+    def get_estimator(self, doctor_id, branch_id):
+        return self._proxy("get_estimator", doctor_id, branch_id)
+
+    def get_matcher(self, branch_id):
+        return self._proxy("get_matcher", branch_id)
+
+    def claim_warm_start(self) -> bool:
+        return self._manager.claim_warm_start()._getvalue()
+
+
+# ----------------------------------------------------------------
+#  Process-wide selection
+# ----------------------------------------------------------------
+
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StateBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.getenv("MEDIFLOW_STATE_BACKEND", "inprocess")
+                _backend = SocketBackend() if kind == "socket" else InProcessBackend()
+    return _backend
+
+
+def set_backend(backend: StateBackend) -> None:
+    """Swap the backend (startup code and benchmarks)."""
+    global _backend
+    _backend = backend
+
+
+if __name__ == "__main__":
+    if "--stop" in sys.argv[1:]:
+        print("  ✔ State server stopped" if stop_server() else "  ❌ State server still running")
+    else:
+        serve()
@@ -1,83 +1,238 @@
 # ================================================================
 #  algorithms/wait_time.py
-#  Little's Law + Rolling Average — O(1) per update
+#  Little's Law + Rolling Statistics — O(1) / O(log B) per update
 #  W = L / λ
 #  W = average wait time
 #  L = average queue length
 #  λ = average service rate (completions/min)
+#  Window keeps a running sum, sliding Welford variance and a
+#  Fenwick-tree histogram for P50 / P90; a time-decayed EWMA of
+#  consult durations drives the point estimate.
 # ================================================================
 
+import math
 from collections import deque
 from datetime import datetime
 from typing import Optional
 
+DEFAULT_CONSULT_MINS = 15.0   # before any completion is seen
+DEFAULT_CV           = 0.5    # spread assumed with fewer than 3 samples
+BAND_Z               = 1.2816 # z for the 10th / 90th percentile → 80% band
+EWMA_TAU_MINS        = 60.0   # time constant: older completions fade over ~an hour
+EWMA_MIN_ALPHA       = 0.1    # back-to-back completions still move the average
+
 
 class RollingAverage:
-    """Fixed-window rolling average — O(1) update."""
+    """Fixed-window rolling average — O(1) update and read (running sum)."""
 
     def __init__(self, window: int = 20):
         self._window = window
         self._values: deque[float] = deque(maxlen=window)
+        self._sum = 0.0
 
     def update(self, value: float) -> None:
+        if len(self._values) == self._window:
+            self._evict(self._values[0])
         self._values.append(value)
+        self._sum += value
+
+    def _evict(self, value: float) -> None:
+        self._sum -= value
 
     def get(self) -> float:
         if not self._values:
-            return 15.0   # default 15 min if no data yet
-        return sum(self._values) / len(self._values)
+            return DEFAULT_CONSULT_MINS
+        return self._sum / len(self._values)
 
     def count(self) -> int:
         return len(self._values)
 
 
+class RollingStats(RollingAverage):
+    """
+    Rolling window with mean, variance and quantiles.
+    Variance: sliding Welford — O(1) add / evict.
+    Quantiles: Fenwick tree over `resolution`-wide buckets on [0, max_value],
+    rank search by binary lifting — O(log B); error ≤ resolution / 2.
+    Float drift is cleared by an exact recompute every `refresh` updates.
+    """
+
+    def __init__(self, window: int = 20, resolution: float = 0.25, max_value: float = 480.0,
+                 refresh: int = 1000):
+        super().__init__(window)
+        self._res     = resolution
+        self._buckets = int(math.ceil(max_value / resolution)) + 1
+        self._tree    = [0] * (self._buckets + 1)   # 1-based Fenwick
+        self._top     = 1 << (self._buckets.bit_length() - 1)
+        self._mean    = 0.0
+        self._m2      = 0.0
+        self._refresh = refresh
+        self._updates = 0
+
+    def _bucket(self, value: float) -> int:
+        return min(max(int(value / self._res), 0), self._buckets - 1)
+
+    def _fenwick_add(self, bucket: int, delta: int) -> None:
+        i = bucket + 1
+        while i <= self._buckets:
+            self._tree[i] += delta
+            i += i & -i
+
+    def update(self, value: float) -> None:
+        super().update(value)
+        n = len(self._values)
+        d = value - self._mean
+        self._mean += d / n
+        self._m2   += d * (value - self._mean)
+        self._fenwick_add(self._bucket(value), 1)
+        self._updates += 1
+        if self._updates % self._refresh == 0:
+            self._recompute()
+
+    def _evict(self, value: float) -> None:
+        super()._evict(value)
+        n = len(self._values) - 1   # count once `value` is gone
+        if n == 0:
+            self._mean = self._m2 = 0.0
+        else:
+            d = value - self._mean
+            self._mean -= d / n
+            self._m2   -= d * (value - self._mean)
+        self._fenwick_add(self._bucket(value), -1)
+
+    def _recompute(self) -> None:
+        vals = self._values
+        self._sum  = math.fsum(vals)
+        self._mean = self._sum / len(vals)
+        self._m2   = math.fsum((v - self._mean) ** 2 for v in vals)
+
+    def variance(self) -> float:
+        """Sample variance of the window (0 with fewer than 2 values)."""
+        n = len(self._values)
+        return max(self._m2, 0.0) / (n - 1) if n > 1 else 0.0
+
+    def stddev(self) -> float:
+        return math.sqrt(self.variance())
+
+    def quantile(self, q: float) -> float:
+        """Nearest-rank q-quantile (bucket midpoint). O(log B)."""
+        n = len(self._values)
+        if n == 0:
+            return DEFAULT_CONSULT_MINS
+        rank = max(1, math.ceil(q * n))   # smallest bucket with cumulative count ≥ rank
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= self._buckets and self._tree[nxt] < rank:
+                pos = nxt
+                rank -= self._tree[nxt]
+            step >>= 1
+        return (pos + 0.5) * self._res   # pos is the 0-based bucket index
+
+
+class EWMA:
+    """
+    Time-decayed average for irregular samples: a sample after a gap of Δt
+    gets weight 1 - exp(-Δt / τ) (at least `min_alpha`). Also tracks Σw²
+    of the normalised sample weights — the variance of the average is
+    σ² · Σw² (1 / effective sample count). O(1).
+    """
+
+    def __init__(self, tau_mins: float = EWMA_TAU_MINS, min_alpha: float = EWMA_MIN_ALPHA):
+        self._tau       = tau_mins
+        self._min_alpha = min_alpha
+        self._value: Optional[float] = None
+        self._at:    Optional[datetime] = None
+        self._w2 = 1.0
+
+    def update(self, value: float, at: datetime) -> None:
+        if self._value is None:
+            self._value = value
+        else:
+            gap   = max((at - self._at).total_seconds() / 60, 0.0)
+            alpha = max(1.0 - math.exp(-gap / self._tau), self._min_alpha)
+            self._value += alpha * (value - self._value)
+            self._w2 = (1 - alpha) ** 2 * self._w2 + alpha ** 2
+        self._at = at if self._at is None else max(self._at, at)
+
+    def get(self) -> Optional[float]:
+        return self._value
+
+    def weight_sq(self) -> float:
+        return self._w2
+
+
 class WaitTimeEstimator:
     """
     Real-time wait time estimation per (doctor_id, branch_id).
     Uses Little's Law: W = L / λ
-    λ is maintained as a rolling average of consultation durations.
+    λ comes from a time-decayed average of consultation durations, so a
+    doctor slowing down shows within a few completions; the rolling window
+    supplies the spread for an 80% band and P50 / P90 consult times.
     """
 
     def __init__(self):
-        # Rolling avg consultation duration in minutes
-        self._service_rate = RollingAverage(window=20)
+        # Rolling consultation durations in minutes
+        self._service_rate = RollingStats(window=20)
+        self._ewma         = EWMA()
         self._last_updated: Optional[datetime] = None
 
-    def record_completion(self, duration_mins: float) -> None:
-        """Call when a consultation ends. Updates λ."""
+    def record_completion(self, duration_mins: float, at: Optional[datetime] = None) -> None:
+        """Call when a consultation ends (`at` defaults to now). Updates λ."""
+        at = at or datetime.utcnow()
         if duration_mins > 0:
             self._service_rate.update(duration_mins)
-        self._last_updated = datetime.utcnow()
+            self._ewma.update(duration_mins, at)
+        self._last_updated = at
 
     def estimate(self, queue_position: int, queue_length: int) -> dict:
         """
         Estimate wait time for a patient at given queue_position.
-        Returns full breakdown dict.
-        O(1).
+        Returns full breakdown dict, including an 80% band. The wait is a sum
+        of k = queue_position consults, each with spread σ, and the average
+        itself is uncertain: var = k·σ² + k²·σ²·Σw².
+        O(log B).
         """
-        avg_consult_mins = self._service_rate.get()          # avg duration per patient
+        stats = self._service_rate
+        avg_consult_mins = self._ewma.get() or stats.get()  # avg duration per patient
         service_rate_per_min = 1.0 / avg_consult_mins        # λ = completions per minute
+        sd = stats.stddev() if stats.count() >= 3 else avg_consult_mins * DEFAULT_CV
 
         # Little's Law: W = L / λ  →  W = L × avg_duration
         # For a specific position: W_position = position × avg_duration
         estimated_wait = queue_position * avg_consult_mins
+        k              = max(queue_position, 0)
+        spread         = BAND_Z * sd * math.sqrt(k + k * k * self._ewma.weight_sq())
 
         return {
             "estimated_wait_mins":  round(estimated_wait, 1),
+            "wait_low_mins":        round(max(0.0, estimated_wait - spread), 1),
+            "wait_high_mins":       round(estimated_wait + spread, 1),
             "queue_length":         queue_length,
             "queue_position":       queue_position,
             "service_rate":         round(service_rate_per_min, 4),
             "avg_consult_mins":     round(avg_consult_mins, 1),
-            "samples_used":         self._service_rate.count(),
+            "window_avg_consult_mins": round(stats.get(), 1),
+            "consult_sd_mins":      round(sd, 2),
+            "consult_p50_mins":     round(stats.quantile(0.5), 1),
+            "consult_p90_mins":     round(stats.quantile(0.9), 1),
+            "samples_used":         stats.count(),
         }
 
-
-# Registry
-_estimators: dict[tuple[int, int], WaitTimeEstimator] = {}
+    def estimate_queue(self, queue_length: int) -> dict:
+        """
+        Waits for positions 1..queue_length in one call — the per-patient
+        average is read once, so a whole queue costs O(n), not n estimates.
+        """
+        avg_consult_mins = self._ewma.get() or self._service_rate.get()
+        return {
+            "waits_mins":       [round(p * avg_consult_mins, 1) for p in range(1, queue_length + 1)],
+            "service_rate":     round(1.0 / avg_consult_mins, 4),
+            "avg_consult_mins": round(avg_consult_mins, 1),
+        }
 
 
+# Registry lives in the state backend
 def get_estimator(doctor_id: int, branch_id: int) -> WaitTimeEstimator:
-    key = (doctor_id, branch_id)
-    if key not in _estimators:
-        _estimators[key] = WaitTimeEstimator()
-    return _estimators[key]
+    from .state_backend import get_backend
+    return get_backend().get_estimator(doctor_id, branch_id)
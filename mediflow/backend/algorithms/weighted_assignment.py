@@ -0,0 +1,192 @@
+# ================================================================
+#  algorithms/weighted_assignment.py
+#  Min-Cost Patient → Slot Assignment — shortest augmenting paths
+#  (Jonker-Volgenant / Crouse rectangular LAP), rows computed on the fly
+#
+#  cost(p, s) = weight_p × lateness_mins(p, s)   if s is compatible and
+#                                                 starts at/after p is ready
+#             = ∞                                 otherwise
+#  Every patient also has a private "unassigned" column costing
+#  weight_p × unmatched_mins, so urgent patients are placed first and
+#  lateness is minimised among those placed.
+#
+#  One Dijkstra per patient over all columns, each step one NumPy pass
+#  over a cost row — never materialises the n × m matrix.
+#  O(n · k · m) with k = average augmenting path length (small in practice).
+# ================================================================
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Hashable, Optional, Sequence
+
+import numpy as np
+
+from .priority_queue import URGENCY_SCORES
+
+
+@dataclass
+class AssignmentPatient:
+    patient_key: Hashable                 # appointment id, patient id …
+    ready_at:    datetime                 # earliest acceptable slot start
+    urgency:     str = "medium"
+    doctors:     Sequence[Hashable] = ()  # compatible doctor ids
+
+
+@dataclass
+class AssignmentSlot:
+    slot_key:  Hashable
+    doctor_id: Hashable
+    start:     datetime
+    capacity:  int = 1                    # remaining bookings on this slot
+
+
+class MinCostAssignment:
+    """
+    Rectangular min-cost assignment over n patients × m slot columns
+    (a slot with capacity c contributes c columns) plus n private
+    "unassigned" columns. Rows are solved in descending urgency so most
+    augmenting paths are a single step.
+    """
+
+    def __init__(
+        self,
+        patients: list[AssignmentPatient],
+        slots: list[AssignmentSlot],
+        unmatched_mins: Optional[float] = None,
+    ):
+        self.patients = patients
+        self.slots    = slots
+        n = len(patients)
+
+        # Columns: one per unit of slot capacity
+        caps            = np.array([max(0, s.capacity) for s in slots], dtype=np.int64)
+        self._col_slot  = np.repeat(np.arange(len(slots)), caps)
+        starts          = np.array([s.start.timestamp() / 60 for s in slots], dtype=np.float64)
+        self._col_start = starts[self._col_slot]
+
+        doctor_index: dict[Hashable, int] = {}
+        slot_doc = np.array([doctor_index.setdefault(s.doctor_id, len(doctor_index)) for s in slots],
+                            dtype=np.int64)
+        self._col_doc = slot_doc[self._col_slot]
+
+        self._ready  = np.array([p.ready_at.timestamp() / 60 for p in patients], dtype=np.float64)
+        self._weight = np.array([URGENCY_SCORES.get(p.urgency, 50) for p in patients], dtype=np.float64)
+        # Patients sharing the same doctor set share one compatibility mask
+        self._group: list[tuple] = []
+        self._masks: dict[tuple, np.ndarray] = {}
+        n_docs = len(doctor_index)
+        for p in patients:
+            key = tuple(sorted({doctor_index[d] for d in p.doctors if d in doctor_index}))
+            if key not in self._masks:
+                allowed = np.zeros(n_docs + 1, dtype=bool)
+                allowed[list(key)] = True
+                self._masks[key] = allowed[self._col_doc] if len(self._col_doc) else np.zeros(0, bool)
+            self._group.append(key)
+
+        if unmatched_mins is None:
+            span = (self._col_start.max() - self._ready.min()) if len(self._col_start) and n else 0.0
+            unmatched_mins = max(span, 0.0) + 1.0   # worse than any lateness a patient could incur
+        self._unmatched = self._weight * unmatched_mins
+
+        self.n, self.m = n, len(self._col_slot)
+        self.col4row = np.full(n, -1, dtype=np.int64)   # column index (≥ m → unassigned)
+        self.total_cost = 0.0
+
+    def _cost_row(self, i: int) -> np.ndarray:
+        late = self._col_start - self._ready[i]
+        row  = np.where(self._masks[self._group[i]] & (late >= 0), self._weight[i] * late, np.inf)
+        dummy = np.full(self.n, np.inf)
+        dummy[i] = self._unmatched[i]
+        return np.concatenate((row, dummy))
+
+    def _cost(self, i: int, c: int) -> float:
+        if c >= self.m:
+            return float(self._unmatched[i])
+        return float(self._weight[i] * (self._col_start[c] - self._ready[i]))
+
+    def solve(self) -> dict[int, Optional[int]]:
+        """Run the assignment. Returns {patient_index: slot_index or None}."""
+        n, nc = self.n, self.m + self.n
+        u = np.zeros(n)
+        v = np.zeros(nc)
+        row4col = np.full(nc, -1, dtype=np.int64)
+        col4row = self.col4row
+        cost_row = self._cost_row   # recomputed per scan: cheap, and n × m never fits in memory
+
+        order = np.argsort(-self._weight, kind="stable")
+        for cur in order:
+            shortest  = np.full(nc, np.inf)
+            path      = np.full(nc, -1, dtype=np.int64)
+            remaining = np.ones(nc, dtype=bool)
+            scanned_rows: list[int] = []
+            scanned_cols: list[int] = []
+            min_val, i, sink = 0.0, int(cur), -1
+
+            while sink == -1:
+                scanned_rows.append(i)
+                reduced = min_val + cost_row(i) - u[i] - v
+                better  = remaining & (reduced < shortest)
+                shortest[better] = reduced[better]
+                path[better]     = i
+
+                masked = np.where(remaining, shortest, np.inf)
+                j      = int(np.argmin(masked))
+                low    = masked[j]
+                if row4col[j] != -1:
+                    # Prefer a free column among equally short ones — ends the search now
+                    ties = np.flatnonzero((masked == low) & (row4col == -1))
+                    if len(ties):
+                        j = int(ties[0])
+                min_val = low
+                remaining[j] = False
+                scanned_cols.append(j)
+                if row4col[j] == -1:
+                    sink = j
+                else:
+                    i = int(row4col[j])
+
+            # Dual update keeps reduced costs non-negative for the next row
+            u[cur] += min_val
+            for r in scanned_rows[1:]:
+                u[r] += min_val - shortest[col4row[r]]
+            cols = np.array(scanned_cols, dtype=np.int64)
+            v[cols] -= min_val - shortest[cols]
+
+            # Augment along the path back to `cur`
+            j = sink
+            while True:
+                r = int(path[j])
+                row4col[j] = r
+                col4row[r], j = j, col4row[r]
+                if r == cur:
+                    break
+
+        self.total_cost = float(sum(self._cost(i, c) for i, c in enumerate(col4row)))
+        return {i: (int(self._col_slot[c]) if c < self.m else None) for i, c in enumerate(col4row)}
+
+    def lateness_mins(self, i: int) -> Optional[float]:
+        c = self.col4row[i]
+        if c < 0 or c >= self.m:
+            return None
+        return float(self._col_start[c] - self._ready[i])
+
+
+def assign_patients_to_slots(
+    patients: list[AssignmentPatient],
+    slots: list[AssignmentSlot],
+    unmatched_mins: Optional[float] = None,
+) -> list[dict]:
+    """
+    High-level wrapper.
+    Returns one proposal per patient: {patient_key, slot_key or None, lateness_mins}.
+    """
+    if not patients:
+        return []
+    solver = MinCostAssignment(patients, slots, unmatched_mins)
+    result = solver.solve()
+    return [
+        {"patient_key": p.patient_key,
+         "slot_key":    slots[result[i]].slot_key if result[i] is not None else None,
+         "lateness_mins": solver.lateness_mins(i)}
+        for i, p in enumerate(patients)
+    ]
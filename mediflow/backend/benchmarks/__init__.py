@@ -0,0 +1,4 @@
+# ================================================================
+#  benchmarks/ — standalone timing scripts for the algorithms package
+#  Run from backend/:  python -m benchmarks.<script> --help
+# ================================================================
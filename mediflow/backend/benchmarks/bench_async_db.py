@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+bench_async_db.py — sync vs async DB handlers under concurrent load
+
+Serves one DB-latency probe two ways, in-process through httpx:
+  /sync   plain `def` + get_db            → Starlette thread pool, psycopg2
+  /async  `async def` + get_async_db      → awaits asyncpg on the event loop,
+          as routers/async_*_router.py do
+Both get the same number of pooled connections. C concurrent clients fire
+R requests each; every request spends --latency-ms inside the database
+(pg_sleep on Postgres, a registered sleep() function on SQLite) plus
+--backend-ms in a blocking call outside it, standing in for a socket
+state-backend round trip — on a worker thread for /sync, on the event
+loop itself for /async, as in the routers. Reports throughput, p50 / p95,
+the peak number of statements executing at once — the sync path tops out
+at the thread-pool size (40 by default), the async path at the pool
+size — and the event loop's worst lag behind a 5 ms ticker.
+
+Usage (from backend/, DB_URL set as for the app; needs asyncpg, or
+aiosqlite for a sqlite:// URL):
+    python -m benchmarks.bench_async_db
+    python -m benchmarks.bench_async_db --clients 500 --latency-ms 20 --backend-ms 1 --pool 45
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+
+class InFlight:
+    """Statements currently executing — thread-safe, keeps the peak."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.now = self.peak = 0
+
+    def enter(self, *_):
+        with self._lock:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+
+    def leave(self, *_):
+        with self._lock:
+            self.now -= 1
+
+
+def build_app(pool: int):
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session, sessionmaker
+    from mediflow_db import config
+
+    sync_engine = create_engine(config.db_url, pool_size=pool, max_overflow=0, pool_timeout=60)
+    async_engine = config.get_async_engine()
+    if sync_engine.dialect.name == "sqlite":
+        probe_sql = text("SELECT sleep(:ms)")
+
+        def add_sleep(dbapi_conn, _):
+            dbapi_conn.create_function("sleep", 1, lambda ms: time.sleep(ms / 1000) or 0)
+        event.listen(sync_engine, "connect", add_sleep)
+        event.listen(async_engine.sync_engine, "connect", add_sleep)
+    else:
+        probe_sql = text("SELECT pg_sleep(:ms / 1000.0)")
+
+    inside = InFlight()
+    for eng in (sync_engine, async_engine.sync_engine):
+        event.listen(eng, "before_cursor_execute", inside.enter)
+        event.listen(eng, "after_cursor_execute", inside.leave)
+    Probe = sessionmaker(bind=sync_engine, autoflush=False)
+
+    def get_probe_db():
+        db = Probe()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app, latency = FastAPI(), {"ms": 0, "backend_ms": 0}
+
+    @app.get("/sync")
+    def sync_probe(db: Session = Depends(config.get_db)):
+        db.execute(probe_sql, {"ms": latency["ms"]})
+        time.sleep(latency["backend_ms"] / 1000)
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_probe(db: AsyncSession = Depends(config.get_async_db)):
+        await db.execute(probe_sql, {"ms": latency["ms"]})
+        time.sleep(latency["backend_ms"] / 1000)
+        return {"ok": True}
+
+    app.dependency_overrides[config.get_db] = get_probe_db
+    return app, inside, latency
+
+
+async def load(app, path: str, clients: int, per_client: int) -> tuple[float, list[float]]:
+    import httpx
+    times: list[float] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 limits=limits, timeout=120) as client:
+        async def one_client():
+            for _ in range(per_client):
+                t0 = time.perf_counter()
+                r = await client.get(path)
+                r.raise_for_status()
+                times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one_client() for _ in range(clients)))
+        return time.perf_counter() - t0, times
+
+
+async def loop_lag(stop: asyncio.Event, worst: list) -> None:
+    """Oversleep of a 5 ms ticker — how long ready callbacks wait for the loop."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst[0] = max(worst[0], time.perf_counter() - t0 - 0.005)
+
+
+async def run(args) -> None:
+    app, inside, latency = build_app(args.pool)
+    latency["ms"] = latency["backend_ms"] = 0
+    await load(app, "/sync", 4, 2)           # open connections / warm the pools
+    await load(app, "/async", 4, 2)
+    latency["ms"], latency["backend_ms"] = args.latency_ms, args.backend_ms
+    for path in ("/sync", "/async"):
+        inside.peak, worst, stop = 0, [0.0], asyncio.Event()
+        ticker = asyncio.create_task(loop_lag(stop, worst))
+        secs, times = await load(app, path, args.clients, args.requests)
+        stop.set()
+        await ticker
+        times.sort()
+        print(f"  {path:<7} {len(times) / secs:8.0f} req/s   p50 {statistics.median(times) * 1e3:7.1f} ms   "
+              f"p95 {times[int(len(times) * 0.95) - 1] * 1e3:7.1f} ms   peak in database {inside.peak:4d}   "
+              f"loop lag ≤ {worst[0] * 1e3:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async DB handlers under load")
+    parser.add_argument("--clients",    type=int, default=200)
+    parser.add_argument("--requests",   type=int, default=10,  help="per client")
+    parser.add_argument("--latency-ms", type=int, default=50,  help="time each request spends in the DB")
+    parser.add_argument("--backend-ms", type=float, default=0, help="blocking non-DB call in each handler")
+    parser.add_argument("--pool",       type=int, default=40,  help="connections for each path (both pools must fit max_connections)")
+    args = parser.parse_args()
+    os.environ["MEDIFLOW_ASYNC_POOL_SIZE"]     = str(args.pool)
+    os.environ["MEDIFLOW_ASYNC_POOL_OVERFLOW"] = "0"
+
+    print(f"\n⏱   {args.clients} clients × {args.requests} requests, {args.latency_ms} ms in the database, "
+          f"{args.backend_ms} ms in a blocking call, {args.pool} connections per path\n")
+    asyncio.run(run(args))
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+bench_booking.py — booking latency and double-booking safety (booking.py)
+
+Needs a Postgres DB_URL (the booking CTE is Postgres-only). Seeds a throw-away
+hospital / branch / doctors / patients / slots, then:
+1. Race: B concurrent bookings over B/4 capacity-1 slots — exactly one booking
+   per slot may succeed, booked_count never exceeds capacity. The previous
+   ORM path (no row lock) is run the same way for comparison.
+2. Latency: N bookings of distinct slots, one worker and then C concurrent
+   workers, book_appointment vs the previous ORM path — statements per
+   booking, p50 / p99 of the handler (connection held) and of the request
+   including the wait for a pooled connection. Client threads, app and
+   Postgres share the machine, so on few cores the loaded numbers are
+   dominated by CPU queueing rather than the database.
+
+Usage (from backend/, DB_URL set as for the app):
+    python -m benchmarks.bench_booking
+    python -m benchmarks.bench_booking --bookings 5000 --concurrency 200
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dtime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import event, func
+
+from mediflow_db.config import Base, SessionLocal, engine
+from mediflow_db.models import (
+    Appointment, AppointmentData, AppointmentLog, Branch, Doctor, Hospital, Patient,
+    PriorityScore, QueueEntry, TimeSlot, WaitTimeEstimate,
+)
+from algorithms.interval_tree import Interval, get_tree
+from algorithms.priority_queue import compute_score
+from routers.appointment_router import book_appointment
+
+_local = threading.local()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(*_):
+    _local.statements = getattr(_local, "statements", 0) + 1
+
+
+def legacy_book(data: AppointmentData, db) -> None:
+    """The previous book_appointment's statements: no lock, two flushes, refresh."""
+    s_id = uuid.UUID(data.slot_id)
+    slot = db.query(TimeSlot).filter(TimeSlot.slot_id == s_id).first()
+    if not slot.is_available:
+        raise HTTPException(status_code=409, detail="Slot not available")
+    slot.booked_count += 1
+    if slot.booked_count >= slot.capacity:
+        slot.is_available = False
+    appt = Appointment(patient_id=uuid.UUID(data.patient_id), doctor_id=uuid.UUID(data.doctor_id),
+                       branch_id=uuid.UUID(data.branch_id), slot_id=s_id, urgency_level=data.urgency_level,
+                       appointment_type=data.appointment_type, scheduled_time=data.scheduled_time,
+                       booked_at=datetime.utcnow())
+    db.add(appt); db.flush()
+    db.query(Patient).filter(Patient.patient_id == appt.patient_id).first()
+    scores = compute_score(data.urgency_level.value, data.appointment_type.value, datetime.utcnow())
+    entry = QueueEntry(appointment_id=appt.appointment_id, branch_id=appt.branch_id, doctor_id=appt.doctor_id,
+                       position=1, entered_queue_at=datetime.utcnow(), is_emergency=False)
+    db.add(entry); db.flush()
+    db.add(PriorityScore(queue_id=entry.queue_id, final_score=scores["final_score"], computed_at=datetime.utcnow()))
+    db.add(WaitTimeEstimate(queue_id=entry.queue_id, estimated_wait_mins=15.0, queue_length=1,
+                            service_rate=0.0667, calculated_at=datetime.utcnow()))
+    db.add(AppointmentLog(appointment_id=appt.appointment_id, patient_id=appt.patient_id, doctor_id=appt.doctor_id,
+                          branch_id=appt.branch_id, urgency_level=data.urgency_level,
+                          appointment_type=data.appointment_type, status=appt.status,
+                          scheduled_time=data.scheduled_time, logged_at=datetime.utcnow()))
+    db.commit(); db.refresh(appt)
+
+
+def new_book(data: AppointmentData, db) -> None:
+    book_appointment(data=data, db=db, current_user={})
+
+
+def seed(n_slots: int, n_patients: int, doctors: int = 20) -> tuple:
+    """Branch, doctors, patients and n_slots capacity-1 slots (in the interval trees)."""
+    db = SessionLocal()
+    try:
+        h = Hospital(name=f"bench-{uuid.uuid4().hex[:8]}"); db.add(h); db.flush()
+        b = Branch(hospital_id=h.hospital_id, branch_name="Bench", latitude=0.0, longitude=0.0, total_capacity=1000)
+        docs = [Doctor(full_name=f"Dr {i}") for i in range(doctors)]
+        pats = [Patient(full_name=f"P{i}", date_of_birth=date(1940 + i % 70, 1, 1)) for i in range(n_patients)]
+        db.add(b); db.add_all(docs); db.add_all(pats); db.flush()
+        slots, day0 = [], date.today() + timedelta(days=1)
+        for i in range(n_slots):
+            d = docs[i % doctors]
+            k = i // doctors
+            start = datetime.combine(day0 + timedelta(days=k // 32), dtime(9)) + timedelta(minutes=15 * (k % 32))
+            slots.append(TimeSlot(doctor_id=d.doctor_id, branch_id=b.branch_id, date=start.date(),
+                                  start_time=start.time(), end_time=(start + timedelta(minutes=15)).time(),
+                                  capacity=1, booked_count=0, is_available=True))
+        db.add_all(slots); db.commit()
+        for s in slots:
+            get_tree(str(s.doctor_id)).insert(Interval(
+                start=datetime.combine(s.date, s.start_time), end=datetime.combine(s.date, s.end_time),
+                slot_id=str(s.slot_id), doctor_id=str(s.doctor_id), branch_id=str(b.branch_id)))
+        return (str(b.branch_id), [(str(s.slot_id), str(s.doctor_id)) for s in slots],
+                [str(p.patient_id) for p in pats])
+    finally:
+        db.close()
+
+
+def requests_for(branch: str, slots: list, patients: list, per_slot: int) -> list[AppointmentData]:
+    out = []
+    for i in range(len(slots) * per_slot):
+        s_id, d_id = slots[i // per_slot]       # a slot's bookings arrive together
+        out.append(AppointmentData(patient_id=patients[i % len(patients)], doctor_id=d_id, branch_id=branch,
+                                   slot_id=s_id, urgency_level=("low", "medium", "high", "critical")[i % 4],
+                                   appointment_type="consultation", scheduled_time=datetime.utcnow() + timedelta(days=1)))
+    return out
+
+
+def fire(book, reqs: list[AppointmentData], concurrency: int) -> tuple[list, list, list, int]:
+    """Run every request on `concurrency` threads; (total s, in-handler s, statements, conflicts)."""
+    total, held, stmts, conflicts = [], [], [], [0]
+    lock = threading.Lock()
+
+    def one(data):
+        t0 = time.perf_counter()
+        db = SessionLocal()
+        try:
+            db.connection()            # waits for a pooled connection
+            t1 = time.perf_counter()
+            _local.statements = 0
+            try:
+                book(data, db)
+            except HTTPException as e:
+                db.rollback()
+                if e.status_code != 409:
+                    raise
+                with lock:
+                    conflicts[0] += 1
+                return
+            t2 = time.perf_counter()
+            with lock:
+                total.append(t2 - t0); held.append(t2 - t1); stmts.append(_local.statements)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, reqs))
+    return total, held, stmts, conflicts[0]
+
+
+def oversold(slots: list) -> tuple[int, int]:
+    """(slots with booked_count > capacity, slots with more than one appointment)."""
+    ids = [uuid.UUID(s) for s, _ in slots]
+    db = SessionLocal()
+    try:
+        over = db.query(TimeSlot).filter(TimeSlot.slot_id.in_(ids), TimeSlot.booked_count > TimeSlot.capacity).count()
+        multi = (db.query(Appointment.slot_id).filter(Appointment.slot_id.in_(ids))
+                 .group_by(Appointment.slot_id).having(func.count() > 1).count())
+        return over, multi
+    finally:
+        db.close()
+
+
+def pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking latency + double-booking check (Postgres)")
+    parser.add_argument("--bookings",    type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ DB_URL must point at Postgres")
+    Base.metadata.create_all(bind=engine)
+
+    print(f"\n🔒  Race: {args.concurrency} concurrent bookings, 4 per capacity-1 slot\n")
+    for name, book in (("previous", legacy_book), ("pipeline", new_book)):
+        branch, slots, patients = seed(args.concurrency // 4, args.concurrency)
+        ok, _, _, conflicts = fire(book, requests_for(branch, slots, patients, 4), args.concurrency)
+        over, multi = oversold(slots)
+        print(f"  {name:<9} {len(ok):4d} booked  {conflicts:4d} refused   "
+              f"slots over capacity {over:3d}   slots with >1 appointment {multi:3d}")
+
+    for workers in (1, args.concurrency):
+        print(f"\n⏱   {args.bookings:,} bookings of distinct slots, {workers} concurrent worker(s)\n")
+        for name, book in (("previous", legacy_book), ("pipeline", new_book)):
+            branch, slots, patients = seed(args.bookings + 50, args.bookings)
+            fire(book, requests_for(branch, slots[:50], patients, 1), 10)          # warm-up
+            t0 = time.perf_counter()
+            total, held, stmts, _ = fire(book, requests_for(branch, slots[50:], patients, 1), workers)
+            wall = time.perf_counter() - t0
+            print(f"  {name:<9} {statistics.mean(stmts):4.1f} statements   "
+                  f"handler p50 {pct(held, 0.5):6.2f} ms  p99 {pct(held, 0.99):7.2f} ms   "
+                  f"with pool wait p50 {pct(total, 0.5):7.2f} ms  p99 {pct(total, 0.99):8.2f} ms   "
+                  f"{len(total) / wall:6.0f} bookings/s")
+    print()
+
+
+if __name__ == "__main__":
+    main()
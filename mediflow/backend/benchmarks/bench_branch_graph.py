@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+bench_branch_graph.py — road-graph routing and cached overflow redirects
+
+1. Correctness: random branch sets with configured road edges (some one-way)
+   plus synthesised fallback links — A* paths and Dijkstra rows against
+   scipy.sparse.csgraph.dijkstra (skipped if scipy is not installed).
+2. Edge file round trip: the same edges written as CSV and JSON load equal.
+3. Benchmark: redirect lookups from the cached all-pairs rows vs the
+   previous per-request complete-graph "Dijkstra", plus the one-off
+   precompute cost.
+
+Usage (from backend/):
+    python -m benchmarks.bench_branch_graph
+    python -m benchmarks.bench_branch_graph --branches 2000
+"""
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import random
+import tempfile
+import time
+
+from algorithms.branch_graph import BranchGraph, load_edges
+from algorithms.kdtree import haversine_km
+
+
+def random_branches(rng: random.Random, n: int) -> dict[str, tuple[float, float]]:
+    # A regional network: ~800 km across
+    return {f"b{i}": (rng.uniform(10, 17), rng.uniform(74, 81)) for i in range(n)}
+
+
+def random_edges(rng: random.Random, coords: dict, share: float) -> list:
+    """Road edges for `share` of the branches, 1.1–1.8× the straight line."""
+    ids = list(coords)
+    edges = []
+    for a in rng.sample(ids, int(len(ids) * share)):
+        for b in rng.sample(ids, min(3, len(ids))):
+            if a != b:
+                km = haversine_km(*coords[a], *coords[b]) * rng.uniform(1.1, 1.8)
+                edges.append((a, b, km, rng.random() < 0.2))
+    return edges
+
+
+def previous_redirect(origin, coords, overloaded):
+    """The old load_balancer.nearest_available_branch: complete graph, all n pushed per pop."""
+    o = coords[origin]
+    dist = lambda a, b: math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
+    heap, visited = [(0.0, origin)], set()
+    while heap:
+        d, bid = heapq.heappop(heap)
+        if bid in visited:
+            continue
+        visited.add(bid)
+        if bid != origin and bid not in overloaded:
+            return bid
+        for nbr, c in coords.items():
+            if nbr not in visited:
+                heapq.heappush(heap, (dist(o, c), nbr))
+    return None
+
+
+def correctness(trials: int, seed: int = 1) -> None:
+    try:
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+    except ImportError:
+        print("  – scipy not installed, skipping correctness check")
+        return
+    rng = random.Random(seed)
+    for t in range(trials):
+        coords = random_branches(rng, rng.randint(2, 80))
+        edges = random_edges(rng, coords, rng.uniform(0.0, 1.0))
+        g, bulk = BranchGraph(), BranchGraph()
+        g.build(coords, edges); bulk.build(coords, edges); bulk.precompute()
+        ids = list(coords)
+        pos = {b: i for i, b in enumerate(ids)}
+        rows, cols, w = [], [], []
+        for a, nbrs in g._adj.items():
+            for b, km in nbrs.items():
+                rows.append(pos[a]); cols.append(pos[b]); w.append(km)
+        ref = dijkstra(csr_matrix((w, (rows, cols)), shape=(len(ids), len(ids))))
+        for a in rng.sample(ids, min(5, len(ids))):
+            row = dict((b, km) for km, b in g.distances_from(a))
+            bulk_row = bulk.distances_from(a)
+            assert [b for _, b in bulk_row] == [b for _, b in g.distances_from(a)] or \
+                all(abs(row[b] - km) < 1e-6 for km, b in bulk_row), f"precomputed row differs in trial {t}"
+            assert len(bulk_row) == len(row)
+            for b in ids:
+                want = ref[pos[a], pos[b]]
+                if b == a:
+                    continue
+                if np.isinf(want):
+                    assert b not in row and g.shortest_path(a, b) is None, f"reachability differs in trial {t}"
+                    continue
+                km, path = g.shortest_path(a, b)
+                assert abs(row[b] - want) < 1e-6 and abs(km - want) < 1e-6, f"distance differs in trial {t}"
+                assert path[0] == a and path[-1] == b
+                assert abs(sum(g._adj[x][y] for x, y in zip(path, path[1:])) - km) < 1e-6, "path length mismatch"
+    print(f"  ✔ {trials} random graphs: A*, Dijkstra rows and the precomputed table match scipy")
+
+
+def file_round_trip(seed: int = 2) -> None:
+    rng = random.Random(seed)
+    edges = random_edges(rng, random_branches(rng, 30), 1.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, json_path = os.path.join(tmp, "g.csv"), os.path.join(tmp, "g.json")
+        with open(csv_path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(("from", "to", "km", "one_way"))
+            w.writerows((a, b, repr(km), "true" if ow else "") for a, b, km, ow in edges)
+        with open(json_path, "w") as f:
+            json.dump([{"from": a, "to": b, "km": km, "one_way": ow} for a, b, km, ow in edges], f)
+        assert load_edges(csv_path) == load_edges(json_path) == edges, "edge files disagree"
+    print(f"  ✔ {len(edges)} edges load identically from CSV and JSON")
+
+
+def benchmark(n: int, lookups: int, seed: int = 3) -> None:
+    rng    = random.Random(seed)
+    coords = random_branches(rng, n)
+    g = BranchGraph()
+    t0 = time.perf_counter()
+    g.build(coords, random_edges(rng, coords, 0.5))
+    build_ms = (time.perf_counter() - t0) * 1e3
+    t0 = time.perf_counter()
+    g.precompute()
+    pre_s = time.perf_counter() - t0
+
+    ids = list(coords)
+    overloaded = set(rng.sample(ids, n // 5))
+    origins = [rng.choice(ids) for _ in range(lookups)]
+    t0 = time.perf_counter()
+    for o in origins:
+        g.nearest_available(o, overloaded)
+    cached_us = (time.perf_counter() - t0) / lookups * 1e6
+
+    old_q = origins[:max(1, min(lookups, 200_000 // n))]
+    t0 = time.perf_counter()
+    for o in old_q:
+        previous_redirect(o, coords, overloaded)
+    old_us = (time.perf_counter() - t0) / len(old_q) * 1e6
+    print(f"  {n:>6,} branches, {g.edge_count():>6,} edges   build {build_ms:6.1f} ms   precompute {pre_s:6.2f} s   "
+          f"redirect {cached_us:5.1f} µs vs {old_us:10.1f} µs   ×{old_us / cached_us:,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Branch graph routing check + benchmark")
+    parser.add_argument("--trials",   type=int, default=200)
+    parser.add_argument("--lookups",  type=int, default=20_000)
+    parser.add_argument("--branches", type=int, default=1_000, help="largest benchmark size")
+    args = parser.parse_args()
+
+    print("\n🔎  Correctness\n")
+    correctness(args.trials)
+    file_round_trip()
+    print("\n⏱   Redirect lookups\n")
+    for n in sorted({100, 300, args.branches}):
+        benchmark(n, args.lookups)
+    print()
+
+
+if __name__ == "__main__":
+    main()
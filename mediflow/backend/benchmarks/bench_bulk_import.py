@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+bench_bulk_import.py — bulk appointment import throughput (bulk_import.py)
+
+Needs a Postgres DB_URL (COPY). Seeds a throw-away branch, doctors,
+patients and capacity-4 slots over the coming weeks, writes N synthetic
+rows to a temporary CSV and imports them the way import_appointments.py
+does. The mix: mostly completed history, a quarter scheduled (some with
+an explicit slot_id, some landing inside a slot the tree resolves, the
+rest walk-ins), a few cancelled, and ~1% broken rows (bad enum, unknown
+patient, malformed UUID). Prints progress, rows/s, and checks that every
+valid row landed and no slot went over capacity.
+
+Usage (from backend/, DB_URL set as for the app):
+    python -m benchmarks.bench_bulk_import
+    python -m benchmarks.bench_bulk_import --rows 1000000 --doctors 200
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta
+
+from sqlalchemy import func
+
+from mediflow_db.config import Base, SessionLocal, engine
+from mediflow_db.models import Appointment, AppointmentLog, Branch, Doctor, Hospital, Patient, QueueEntry, TimeSlot
+from bulk_import import import_appointments, read_rows
+from warm_start import load_trees
+
+FIELDS = ("patient_id", "doctor_id", "branch_id", "slot_id", "urgency_level", "appointment_type",
+          "status", "scheduled_time", "actual_start_time", "actual_end_time", "notes")
+
+
+def seed(doctors: int, patients: int, days: int) -> tuple:
+    """Branch, doctors, patients, 32 capacity-4 slots per doctor-day (in the interval trees)."""
+    db = SessionLocal()
+    try:
+        h = Hospital(name=f"bench-{uuid.uuid4().hex[:8]}"); db.add(h); db.flush()
+        b = Branch(hospital_id=h.hospital_id, branch_name="Bench", latitude=0.0, longitude=0.0, total_capacity=1000)
+        docs = [Doctor(full_name=f"Dr {i}") for i in range(doctors)]
+        db.add(b); db.add_all(docs); db.flush()
+        pats = [{"patient_id": uuid.uuid4(), "full_name": f"P{i}", "date_of_birth": date(1940 + i % 70, 1, 1)}
+                for i in range(patients)]
+        db.execute(Patient.__table__.insert(), pats)
+        day0, slots = date.today() + timedelta(days=1), []
+        for d in docs:
+            for k in range(days * 32):
+                start = datetime.combine(day0 + timedelta(days=k // 32), dtime(9)) + timedelta(minutes=15 * (k % 32))
+                slots.append({"slot_id": uuid.uuid4(), "doctor_id": d.doctor_id, "branch_id": b.branch_id,
+                              "date": start.date(), "start_time": start.time(),
+                              "end_time": (start + timedelta(minutes=15)).time(),
+                              "capacity": 4, "booked_count": 0, "is_available": True})
+        db.execute(TimeSlot.__table__.insert(), slots)
+        db.commit()
+        load_trees((s["slot_id"], s["doctor_id"], s["branch_id"], s["date"], s["start_time"], s["end_time"])
+                   for s in slots)
+        return b.branch_id, [d.doctor_id for d in docs], [p["patient_id"] for p in pats], slots
+    finally:
+        db.close()
+
+
+def write_rows(path: str, n: int, branch, doctors: list, patients: list, slots: list) -> int:
+    """n synthetic rows; returns how many are deliberately broken."""
+    rnd, broken, now = random.Random(7), 0, datetime.utcnow()
+    with open(path, "w", newline="") as f:
+        out = csv.DictWriter(f, fieldnames=FIELDS)
+        out.writeheader()
+        for i in range(n):
+            row = {"patient_id": rnd.choice(patients), "doctor_id": rnd.choice(doctors), "branch_id": branch,
+                   "urgency_level": rnd.choice(("low", "medium", "high", "critical")),
+                   "appointment_type": rnd.choice(("consultation", "follow_up", "surgery"))}
+            kind = rnd.random()
+            if kind < 0.70:                                   # history
+                start = now - timedelta(days=rnd.randint(1, 700), minutes=rnd.randint(0, 600))
+                row.update(status="completed", scheduled_time=start.isoformat(),
+                           actual_start_time=start.isoformat(),
+                           actual_end_time=(start + timedelta(minutes=rnd.randint(5, 40))).isoformat())
+            elif kind < 0.75:
+                row.update(status="cancelled",
+                           scheduled_time=(now - timedelta(days=rnd.randint(1, 90))).isoformat())
+            else:                                             # future, scheduled
+                s = rnd.choice(slots)
+                row["doctor_id"] = s["doctor_id"]
+                start = datetime.combine(s["date"], s["start_time"])
+                if kind < 0.85:
+                    row["slot_id"] = s["slot_id"]
+                elif kind < 0.95:
+                    start += timedelta(minutes=5)             # inside the slot → resolved by the tree
+                else:
+                    start += timedelta(hours=12)              # evening, no slot → walk-in
+                row.update(status="scheduled", scheduled_time=start.isoformat())
+            if i % 100 == 99:
+                broken += 1
+                bad = rnd.randint(0, 2)
+                if bad == 0: row["urgency_level"] = "urgent"
+                elif bad == 1: row["patient_id"] = uuid.uuid4()
+                else: row["doctor_id"] = "not-a-uuid"
+            out.writerow(row)
+    return broken
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import throughput (Postgres)")
+    parser.add_argument("--rows",     type=int, default=200_000)
+    parser.add_argument("--doctors",  type=int, default=100)
+    parser.add_argument("--patients", type=int, default=50_000)
+    parser.add_argument("--days",     type=int, default=60, help="days of future slots per doctor")
+    parser.add_argument("--chunk",    type=int, default=5000)
+    args = parser.parse_args()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ DB_URL must point at Postgres")
+    Base.metadata.create_all(bind=engine)
+
+    t0 = time.perf_counter()
+    branch, doctors, patients, slots = seed(args.doctors, args.patients, args.days)
+    fd, path = tempfile.mkstemp(suffix=".csv"); os.close(fd)
+    try:
+        broken = write_rows(path, args.rows, branch, doctors, patients, slots)
+        print(f"\n📥  {args.rows:,} rows ({broken:,} broken), {len(slots):,} slots — "
+              f"seeded in {time.perf_counter() - t0:.1f}s\n")
+
+        step = max(args.rows // 10, args.chunk)
+        def progress(r):
+            if r["rows"] % step < args.chunk:
+                print(f"  … {r['rows']:>9,} rows  {r['rows'] / r['secs']:8,.0f} rows/s")
+
+        db = SessionLocal()
+        try:
+            with open(path, newline="") as f:
+                report = import_appointments(db, read_rows(f, "csv"), chunk_size=args.chunk, progress=progress)
+            appts = db.query(func.count()).select_from(Appointment).filter(Appointment.branch_id == branch).scalar()
+            logs  = db.query(func.count()).select_from(AppointmentLog).filter(AppointmentLog.branch_id == branch).scalar()
+            queue = db.query(func.count()).select_from(QueueEntry).filter(QueueEntry.branch_id == branch).scalar()
+            over  = db.query(func.count()).select_from(TimeSlot).filter(
+                TimeSlot.branch_id == branch, TimeSlot.booked_count > TimeSlot.capacity).scalar()
+            unranked = db.query(func.count()).select_from(QueueEntry).filter(
+                QueueEntry.branch_id == branch, QueueEntry.estimated_wait_mins.is_(None)).scalar()
+        finally:
+            db.close()
+    finally:
+        os.remove(path)
+
+    print(f"\n  ✔ {report['imported']:,} imported, {report['failed']:,} rejected in {report['secs']}s "
+          f"({report['rows'] / report['secs']:,.0f} rows/s → 1M rows ≈ {1e6 / (report['rows'] / report['secs']) / 60:.1f} min)")
+    print(f"    {report['queued']:,} queued, {report['slotted']:,} in slots; "
+          f"slot conflicts / full slots: {report['failed'] - broken:,}")
+    print(f"    rows in DB: appointments {appts:,}  logs {logs:,}  queue entries {queue:,}   "
+          f"slots over capacity {over}   queue entries without a wait {unranked}")
+    if appts != report["imported"] or logs != appts or queue != report["queued"] or over or unranked:
+        raise SystemExit("❌ Database does not match the report")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+bench_interval_tree.py — augmented AVL IntervalTree: correctness + scale
+
+1. Property check: random insert / remove / re-insert / overlap queries,
+   including long intervals that start far earlier, against a brute-force
+   list oracle. AVL balance, heights, max_end and the slot index are
+   verified along the way.
+2. Benchmark: bulk-build N intervals (default 1M), then time random
+   inserts, conflict checks, overlap queries and removals.
+
+Usage (from backend/):
+    python -m benchmarks.bench_interval_tree
+    python -m benchmarks.bench_interval_tree --n 200000 --ops 20000 --check-steps 5000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from algorithms.interval_tree import IntervalTree, Interval, _height
+
+BASE = datetime(2026, 1, 1)
+
+
+def random_interval(rng: random.Random, slot_id, horizon_mins: int) -> Interval:
+    start = BASE + timedelta(minutes=rng.randrange(horizon_mins))
+    # Mostly short slots, occasionally a very long block
+    length = rng.choice((15, 15, 15, 30, 60)) if rng.random() > 0.02 else rng.randrange(600, 20000)
+    return Interval(start, start + timedelta(minutes=length), slot_id, 1, 1)
+
+
+def check_invariants(tree: IntervalTree) -> int:
+    def walk(n, lo, hi):
+        if n is None:
+            return 0, None
+        assert (lo is None or lo <= n.key) and (hi is None or n.key <= hi), "BST order"
+        lh, lmax = walk(n.left, lo, n.key)
+        rh, rmax = walk(n.right, n.key, hi)
+        assert abs(lh - rh) <= 1, "AVL balance"
+        assert n.height == 1 + max(lh, rh), "height"
+        assert n.max_end == max(e for e in (n.interval.end, lmax, rmax) if e is not None), "max_end"
+        assert tree._by_slot[n.interval.slot_id] is n, "slot index"
+        return n.height, n.max_end
+    walk(tree._root, None, None)
+    count = 0
+    stack, n = [], tree._root
+    while stack or n:
+        while n:
+            stack.append(n); n = n.left
+        n = stack.pop(); count += 1; n = n.right
+    assert count == tree.size() == len(tree._by_slot), "size"
+    return _height(tree._root)
+
+
+def property_check(steps: int, seed: int = 3) -> None:
+    rng    = random.Random(seed)
+    tree   = IntervalTree()
+    oracle: dict[int, Interval] = {}
+    for step in range(steps):
+        op = rng.random()
+        if op < 0.45:
+            sid = rng.randrange(steps // 2 + 1)          # collisions exercise re-insert
+            iv  = random_interval(rng, sid, 5000)
+            tree.insert(iv); oracle[sid] = iv
+        elif op < 0.65 and oracle:
+            sid = rng.choice(list(oracle)) if rng.random() < 0.9 else -1
+            tree.remove(sid); oracle.pop(sid, None)
+        else:
+            qs = BASE + timedelta(minutes=rng.randrange(-100, 5100))
+            qe = qs + timedelta(minutes=rng.randrange(1, 300))
+            got  = [iv.slot_id for iv in tree.iter_overlapping(qs, qe)]
+            want = sorted((iv for iv in oracle.values() if iv.overlaps(qs, qe)),
+                          key=lambda iv: (iv.start, iv.slot_id))
+            assert got == [iv.slot_id for iv in want], f"overlap mismatch at step {step}"
+            excl = want[0].slot_id if want and rng.random() < 0.5 else None
+            hit  = tree.has_conflict(1, qs, qe, exclude_slot_id=excl)
+            rest = [iv for iv in want if iv.slot_id != excl]
+            assert (hit is None) == (not rest), f"has_conflict mismatch at step {step}"
+        if step % 500 == 0:
+            check_invariants(tree)
+    height = check_invariants(tree)
+
+    bulk = IntervalTree()
+    bulk.insert_many(list(oracle.values()))
+    check_invariants(bulk)
+    print(f"  ✔ {steps:,} random ops match brute force (final size {tree.size():,}, height {height})")
+
+
+def benchmark(n: int, ops: int, seed: int = 5) -> None:
+    rng     = random.Random(seed)
+    horizon = n * 15
+    intervals = [random_interval(rng, i, horizon) for i in range(n)]
+
+    tree = IntervalTree()
+    t0 = time.perf_counter()
+    tree.insert_many(intervals)
+    print(f"  bulk build      {n:>9,} intervals  {time.perf_counter() - t0:8.2f} s   height {_height(tree._root)}")
+
+    def timed(label, fn):
+        t0 = time.perf_counter()
+        for i in range(ops):
+            fn(i)
+        dt = time.perf_counter() - t0
+        print(f"  {label:<15} {ops:>9,} ops        {dt / ops * 1e6:8.2f} µs/op")
+
+    new = [random_interval(rng, n + i, horizon) for i in range(ops)]
+    timed("insert", lambda i: tree.insert(new[i]))
+    queries = [BASE + timedelta(minutes=rng.randrange(horizon)) for _ in range(ops)]
+    timed("has_conflict", lambda i: tree.has_conflict(1, queries[i], queries[i] + timedelta(minutes=15)))
+    timed("overlap query", lambda i: sum(1 for _ in tree.iter_overlapping(queries[i], queries[i] + timedelta(hours=2))))
+    victims = rng.sample(range(n), ops)
+    timed("remove", lambda i: tree.remove(victims[i]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IntervalTree property check + benchmark")
+    parser.add_argument("--n",           type=int, default=1_000_000)
+    parser.add_argument("--ops",         type=int, default=100_000)
+    parser.add_argument("--check-steps", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print("\n🔎  Property check against brute-force oracle\n")
+    property_check(args.check_steps)
+    print(f"\n⏱   Benchmark at {args.n:,} intervals\n")
+    benchmark(args.n, args.ops)
+    print()
+
+
+if __name__ == "__main__":
+    main()
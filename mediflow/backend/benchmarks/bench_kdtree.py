@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+bench_kdtree.py — haversine k-NN on the branch K-d tree
+
+1. Correctness: random branch sets (global, straddling the antimeridian,
+   near the pole) against a brute-force haversine sort, with exclusions
+   and unavailable branches.
+2. Benchmark: k-NN latency for 1k / 10k / 100k branches vs the previous
+   scan-and-sort of every point.
+3. Batch: k_nearest_batch for many query points (referral imports) vs the
+   same number of sequential k_nearest_km calls, results cross-checked.
+4. Incremental updates: random inserts, removes and availability flips
+   checked against brute force (single and batch queries), tree height
+   under sorted inserts, and per-update cost vs a full rebuild.
+
+Usage (from backend/):
+    python -m benchmarks.bench_kdtree
+    python -m benchmarks.bench_kdtree --queries 20000 --k 10
+"""
+import argparse
+import math
+import random
+import time
+
+from algorithms.kdtree import KDTree, BranchPoint, haversine_km
+
+
+def random_points(rng: random.Random, n: int, region: str) -> list[BranchPoint]:
+    pts = []
+    for i in range(n):
+        if region == "antimeridian":
+            lat, lng = rng.uniform(-60, 60), rng.choice((rng.uniform(170, 180), rng.uniform(-180, -170)))
+        elif region == "polar":
+            lat, lng = rng.uniform(75, 90), rng.uniform(-180, 180)
+        else:
+            lat, lng = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        pts.append(BranchPoint(i, lat, lng, is_available=rng.random() < 0.85))
+    return pts
+
+
+def brute_force(pts, lat, lng, k, exclude=frozenset()):
+    scored = [(haversine_km(lat, lng, p.lat, p.lng), p) for p in pts
+              if p.is_available and p.branch_id not in exclude]
+    scored.sort(key=lambda x: x[0])
+    return scored[:k]
+
+
+def correctness(trials: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    regions = ("global", "antimeridian", "polar")
+    for t in range(trials):
+        region = regions[t % 3]
+        pts  = random_points(rng, rng.randint(1, 400), region)
+        tree = KDTree()
+        tree.build(list(pts))
+        for _ in range(10):
+            q = random_points(rng, 1, region)[0]
+            k = rng.randint(1, 8)
+            exclude = {rng.randrange(len(pts))}
+            got  = tree.k_nearest_km(q.lat, q.lng, k, exclude)
+            want = brute_force(pts, q.lat, q.lng, k, exclude)
+            assert len(got) == len(want) and all(abs(a - b) < 1e-6 for (a, _), (b, _) in zip(got, want)), \
+                f"mismatch in trial {t}"
+    print(f"  ✔ {trials * 10:,} queries match brute-force haversine (global, antimeridian, polar)")
+
+
+def benchmark(n: int, queries: int, k: int, seed: int = 4) -> None:
+    rng  = random.Random(seed)
+    pts  = random_points(rng, n, "global")
+    tree = KDTree()
+    tree.build(list(pts))
+    qs   = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(queries)]
+
+    t0 = time.perf_counter()
+    for lat, lng in qs:
+        tree.k_nearest_km(lat, lng, k)
+    tree_us = (time.perf_counter() - t0) / queries * 1e6
+
+    scan_q = qs[:max(1, min(queries, 200_000 // n))]   # keep the O(n) baseline affordable
+    t0 = time.perf_counter()
+    for lat, lng in scan_q:
+        brute_force(pts, lat, lng, k)
+    scan_us = (time.perf_counter() - t0) / len(scan_q) * 1e6
+    print(f"  {n:>9,} branches   k-d tree {tree_us:8.1f} µs/query   scan+sort {scan_us:10.1f} µs/query   "
+          f"×{scan_us / tree_us:,.0f}")
+
+
+def batch_benchmark(n: int, queries: int, k: int, seed: int = 6) -> None:
+    rng  = random.Random(seed)
+    pts  = random_points(rng, n, "global")
+    tree = KDTree()
+    tree.build(list(pts))
+    lats = [rng.uniform(-60, 70) for _ in range(queries)]
+    lngs = [rng.uniform(-180, 180) for _ in range(queries)]
+
+    t0 = time.perf_counter()
+    seq = [tree.k_nearest_km(lat, lng, k) for lat, lng in zip(lats, lngs)]
+    seq_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch = list(tree.k_nearest_batch(lats, lngs, k))
+    batch_s = time.perf_counter() - t0
+
+    for a, b in zip(seq, batch):
+        assert len(a) == len(b) and all(abs(x - y) < 1e-6 for (x, _), (y, _) in zip(a, b)), "batch mismatch"
+    print(f"  {n:>7,} branches × {queries:,} points   sequential {seq_s:6.2f} s   "
+          f"batch {batch_s:6.2f} s   ×{seq_s / batch_s:.1f}")
+
+
+def incremental_check(ops: int, seed: int = 8) -> None:
+    rng  = random.Random(seed)
+    live = {p.branch_id: p for p in random_points(rng, 200, "global")}
+    tree = KDTree()
+    tree.build(list(live.values()))
+    next_id = len(live)
+    for step in range(ops):
+        op = rng.random()
+        if op < 0.35:
+            p = random_points(rng, 1, rng.choice(("global", "antimeridian")))[0]
+            p.branch_id = next_id; next_id += 1
+            live[p.branch_id] = p; tree.insert(p)
+        elif op < 0.6 and live:
+            bid = rng.choice(list(live)); del live[bid]
+            assert tree.remove(bid)
+        elif live:
+            bid = rng.choice(list(live))
+            tree.set_available(bid, not live[bid].is_available)
+        if step % 25 == 0:
+            pts = list(live.values())
+            lats = [rng.uniform(-60, 70) for _ in range(5)]
+            lngs = [rng.uniform(-180, 180) for _ in range(5)]
+            for (lat, lng), batch in zip(zip(lats, lngs), tree.k_nearest_batch(lats, lngs, 4)):
+                want = brute_force(pts, lat, lng, 4)
+                got  = tree.k_nearest_km(lat, lng, 4)
+                for res in (got, batch):
+                    assert [p.branch_id for _, p in res] == [p.branch_id for _, p in want], \
+                        f"mismatch after update {step}"
+            assert tree.size() == len(live)
+    print(f"  ✔ {ops:,} inserts / removes / availability flips match brute force throughout")
+
+
+def incremental_benchmark(n: int, updates: int, seed: int = 10) -> None:
+    rng = random.Random(seed)
+    # Worst case for a plain k-d tree: branches arriving sorted by latitude
+    pts = sorted(random_points(rng, n, "global"), key=lambda p: p.lat)
+    tree = KDTree()
+    t0 = time.perf_counter()
+    for p in pts:
+        tree.insert(p)
+    ins_us = (time.perf_counter() - t0) / n * 1e6
+    bound = math.log(n) / math.log(1 / KDTree.ALPHA) + 1
+    assert tree.height() <= bound + 1, "scapegoat bound violated"
+
+    ids = [p.branch_id for p in pts]
+    t0 = time.perf_counter()
+    for _ in range(updates):
+        tree.set_available(rng.choice(ids), rng.random() < 0.5)
+    flip_us = (time.perf_counter() - t0) / updates * 1e6
+
+    t0 = time.perf_counter()
+    for bid in rng.sample(ids, min(updates, n // 2)):
+        tree.remove(bid)
+    rm_us = (time.perf_counter() - t0) / min(updates, n // 2) * 1e6
+
+    t0 = time.perf_counter()
+    KDTree().build(list(pts))
+    rebuild_us = (time.perf_counter() - t0) * 1e6
+    print(f"  {n:>7,} branches   insert {ins_us:6.1f} µs   flip {flip_us:5.1f} µs   remove {rm_us:6.1f} µs   "
+          f"full rebuild {rebuild_us / 1000:8.1f} ms   height {tree.height()} (≤ {bound:.0f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K-d tree haversine k-NN check + benchmark")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--k",       type=int, default=3)
+    parser.add_argument("--trials",  type=int, default=300)
+    parser.add_argument("--batch",   type=int, default=20_000, help="points per batch run")
+    parser.add_argument("--updates", type=int, default=2_000, help="incremental operations")
+    args = parser.parse_args()
+
+    print("\n🔎  Correctness\n")
+    correctness(args.trials)
+    print(f"\n⏱   k = {args.k}\n")
+    for n in (1_000, 10_000, 100_000):
+        benchmark(n, args.queries, args.k)
+    print(f"\n📦  Batch of {args.batch:,} points, k = {args.k}\n")
+    for n in (100, 1_000, 10_000):
+        batch_benchmark(n, args.batch, args.k)
+    print("\n🔁  Incremental updates\n")
+    incremental_check(args.updates)
+    for n in (1_000, 10_000, 100_000):
+        incremental_benchmark(n, args.updates)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+bench_load_balancer.py — virtual-time heap WRR vs the previous
+smooth WRR that scanned every branch per pick
+
+1. Fairness: fixed loads, many picks — each branch's share of picks vs its
+   weight share, and the worst lag behind the ideal schedule at any point,
+   for both schedulers. Loads then change mid-run (incl. branches crossing
+   the overload threshold) to check the heap scheduler adapts.
+2. Throughput: picks per second for 100 / 500 / 2,000 branches, with an
+   update_load every 10 picks.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load_balancer
+    python -m benchmarks.bench_load_balancer --picks 500000
+"""
+import argparse
+import random
+import time
+from typing import Optional
+
+from algorithms.load_balancer import BranchNode, WeightedRoundRobin
+
+
+class ScanWRR:
+    """The previous implementation: O(n) dict rebuild + max scan per pick."""
+
+    def __init__(self):
+        self._branches: dict = {}
+        self._current_weights: dict = {}
+
+    def register(self, branch_id, total_capacity):
+        self._branches[branch_id] = BranchNode(branch_id, total_capacity)
+        self._current_weights[branch_id] = 0.0
+
+    def update_load(self, branch_id, current_load):
+        if branch_id in self._branches:
+            node = self._branches[branch_id]
+            node.current_load = current_load
+            node.weight = max(0.01, 1.0 - node.load_factor)
+
+    def next_branch(self, exclude: Optional[list] = None):
+        exclude = exclude or []
+        eligible = {bid: n for bid, n in self._branches.items() if bid not in exclude and not n.is_overloaded}
+        if not eligible:
+            eligible = {bid: n for bid, n in self._branches.items() if bid not in exclude}
+        if not eligible:
+            return None
+        total_weight = sum(n.weight for n in eligible.values())
+        for bid in eligible:
+            self._current_weights[bid] = self._current_weights.get(bid, 0.0) + eligible[bid].weight
+        best = max(eligible.keys(), key=lambda b: self._current_weights[b])
+        self._current_weights[best] -= total_weight
+        return best
+
+
+def seeded(cls, n: int, rng: random.Random):
+    lb = cls()
+    for b in range(n):
+        cap = rng.choice((50, 100, 200))
+        lb.register(b, cap)
+        lb.update_load(b, int(cap * rng.uniform(0.0, 0.95)))
+    return lb
+
+
+def fairness(cls, n: int, picks: int, seed: int = 3) -> tuple[float, float]:
+    """(worst relative share error, worst lag in picks) over eligible branches."""
+    lb = seeded(cls, n, random.Random(seed))
+    nodes   = lb._branches
+    weights = {b: nd.weight for b, nd in nodes.items() if not nd.is_overloaded}
+    total   = sum(weights.values())
+    counts  = dict.fromkeys(weights, 0)
+    lag = 0.0
+    for t in range(1, picks + 1):
+        b = lb.next_branch()
+        assert b in weights, "picked an overloaded branch while others were eligible"
+        counts[b] += 1
+        if t % 97 == 0:
+            lag = max(lag, max(abs(counts[x] - t * w / total) for x, w in weights.items()))
+    err = max(abs(counts[b] / picks - w / total) / (w / total) for b, w in weights.items())
+    return err, lag
+
+
+def adapts(n: int, picks: int, seed: int = 5) -> None:
+    rng = random.Random(seed)
+    lb  = seeded(WeightedRoundRobin, n, rng)
+    for _ in range(picks):
+        lb.next_branch()
+    # Shift loads: some branches tip over the threshold, others drain
+    for b in range(n):
+        cap = lb._branches[b].total_capacity
+        lb.update_load(b, int(cap * rng.uniform(0.0, 0.95)))
+    nodes   = lb._branches
+    weights = {b: nd.weight for b, nd in nodes.items() if not nd.is_overloaded}
+    total   = sum(weights.values())
+    counts  = dict.fromkeys(weights, 0)
+    for _ in range(picks):
+        b = lb.next_branch()
+        assert b in weights, "overloaded branch picked after load change"
+        counts[b] += 1
+    err = max(abs(counts[b] / picks - w / total) / (w / total) for b, w in weights.items())
+    excl = set(range(0, n, 2))
+    assert all(lb.next_branch(exclude=list(excl)) not in excl for _ in range(100)), "excluded branch picked"
+    print(f"  ✔ after a load shift: worst share error {err:.2%}, exclusions respected")
+
+
+def throughput(cls, n: int, picks: int, seed: int = 7) -> float:
+    rng = random.Random(seed)
+    lb  = seeded(cls, n, rng)
+    caps = [lb._branches[b].total_capacity for b in range(n)]
+    updates = [(rng.randrange(n), rng.uniform(0.0, 0.95)) for _ in range(picks // 10 + 1)]
+    t0 = time.perf_counter()
+    for i in range(picks):
+        lb.next_branch()
+        if i % 10 == 0:
+            b, f = updates[i // 10]
+            lb.update_load(b, int(caps[b] * f))
+    return picks / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load balancer fairness + throughput")
+    parser.add_argument("--picks",    type=int, default=200_000)
+    parser.add_argument("--branches", type=int, default=200, help="branches for the fairness runs")
+    args = parser.parse_args()
+
+    print("\n⚖️   Fairness\n")
+    for cls in (ScanWRR, WeightedRoundRobin):
+        err, lag = fairness(cls, args.branches, args.picks)
+        print(f"  {cls.__name__:<20} worst share error {err:7.3%}   worst lag {lag:5.2f} picks")
+    adapts(args.branches, args.picks)
+
+    print("\n⏱   Throughput (update_load every 10 picks)\n")
+    for n in (100, 500, 2_000):
+        picks = args.picks if n <= 500 else args.picks // 4
+        scan  = throughput(ScanWRR, n, max(1_000, picks // (n // 50)))
+        heap  = throughput(WeightedRoundRobin, n, picks)
+        print(f"  {n:>5,} branches   scan {scan:>10,.0f} picks/s   heap {heap:>10,.0f} picks/s   ×{heap / scan:,.0f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
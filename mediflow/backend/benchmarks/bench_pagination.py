@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+bench_pagination.py — OFFSET vs keyset walk of GET /api/appointments
+
+Seeds N appointments (many sharing a scheduled_time, so the appointment_id
+tiebreak matters) for a throw-away branch, then walks every page of
+list_appointments twice — skip/limit and cursor — and reports total time,
+time spent in SQL, and the SQL time of the first and last pages (the rest
+of a page is building and serialising its rows, the same for both).
+Checks that both walks return every appointment once, in the same order.
+
+Usage (from backend/, DB_URL set as for the app):
+    python -m benchmarks.bench_pagination
+    python -m benchmarks.bench_pagination --rows 1000000 --page 1000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import event, insert
+
+from mediflow_db.config import Base, SessionLocal, engine
+from mediflow_db.models import Appointment, Branch, Doctor, Hospital, Patient
+from pagination import NEXT_CURSOR_HEADER
+from routers.appointment_router import list_appointments
+
+SEED_BATCH = 10_000
+_in_db = [0.0, 0.0]   # [statement start, seconds in statements]
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start(*_):
+    _in_db[0] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _stop(*_):
+    _in_db[1] += time.perf_counter() - _in_db[0]
+
+
+def seed(rows: int) -> str:
+    db = SessionLocal()
+    try:
+        h = Hospital(name=f"bench-{uuid.uuid4().hex[:8]}"); db.add(h); db.flush()
+        b = Branch(hospital_id=h.hospital_id, branch_name="Bench", latitude=0.0, longitude=0.0, total_capacity=1000)
+        d, p = Doctor(full_name="Dr Bench"), Patient(full_name="P Bench")
+        db.add_all([b, d, p]); db.flush()
+        t0 = datetime(2025, 1, 1, 9)
+        for lo in range(0, rows, SEED_BATCH):
+            db.execute(insert(Appointment.__table__), [
+                {"appointment_id": uuid.uuid4(), "patient_id": p.patient_id, "doctor_id": d.doctor_id,
+                 "branch_id": b.branch_id, "urgency_level": "low", "appointment_type": "consultation",
+                 "status": "completed", "scheduled_time": t0 + timedelta(minutes=15 * (i // 4)),
+                 "booked_at": t0}
+                for i in range(lo, min(rows, lo + SEED_BATCH))])
+        db.commit()
+        return str(b.branch_id)
+    finally:
+        db.close()
+
+
+def walk(branch: str, page: int, keyset: bool) -> tuple[list[str], list[float]]:
+    """Every appointment id of the branch, and the database seconds of each page."""
+    ids, times, skip, cursor = [], [], 0, None
+    db = SessionLocal()
+    try:
+        while True:
+            response = Response()
+            _in_db[1] = 0.0
+            rows = list_appointments(response, branch_id=branch, skip=0 if keyset else skip, limit=page,
+                                     cursor=cursor if keyset else None, db=db, _={})
+            times.append(_in_db[1])
+            ids.extend(r["appointment_id"] for r in rows)
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                return ids, times
+            skip += page
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFFSET vs keyset pagination (appointments)")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--page", type=int, default=1000)
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+
+    t0 = time.perf_counter()
+    branch = seed(args.rows)
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("ANALYZE scheduling.appointments")
+    print(f"\n📄  {args.rows:,} appointments, {args.page:,} per page — seeded in {time.perf_counter() - t0:.1f}s\n")
+
+    walks = {}
+    for name, keyset in (("offset", False), ("cursor", True)):
+        t0 = time.perf_counter()
+        ids, times = walk(branch, args.page, keyset)
+        walks[name] = ids
+        print(f"  {name:<7} {time.perf_counter() - t0:7.2f}s total, {sum(times):6.2f}s in SQL   "
+              f"SQL first page {times[0] * 1e3:6.2f} ms   last page {times[-1] * 1e3:6.2f} ms   {len(times):,} pages")
+
+    ok = walks["offset"] == walks["cursor"] and len(set(walks["cursor"])) == args.rows
+    print(f"\n  {'✔' if ok else '❌'} both walks return all {args.rows:,} appointments once, same order\n")
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+bench_peak_prediction.py — HoltWinters (per-series Python loop) vs
+HoltWintersBatch (all series as one NumPy array)
+
+1. Equivalence: random ragged series (incl. shorter than one period and
+   all-zero) — fitted level/trend/seasonals, 24h forecasts and peak hours
+   must match the scalar class series by series.
+2. Benchmark: nightly retrain of S hourly series × D days of history,
+   scalar fit + forecast per series vs one batch fit + forecast.
+3. Incremental: folding each new hourly stat into a stored state
+   (HoltWinters.update after load_state) vs refitting the whole history —
+   forecasts must be identical. The history ends mid-day, so the forecast
+   must also pick up the daily cycle at the right hour.
+4. Tuning: one-step-ahead MSE from the batch (per-row parameters) checked
+   against a scalar replay, tuned parameters never worse than the defaults,
+   and a fleet-wide retune of 500 series over a process pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_peak_prediction
+    python -m benchmarks.bench_peak_prediction --series 5000 --days 180
+"""
+import argparse
+import math
+import os
+import random
+import time
+
+import numpy as np
+
+from algorithms.peak_prediction import DEFAULT_PARAMS, HoltWinters, HoltWintersBatch, tune_parameters
+
+
+def demand_series(rng: random.Random, hours: int) -> list[float]:
+    """Daily double peak + weekly swing + noise, like PeakHourStat.avg_appointments."""
+    base = rng.uniform(2, 30)
+    out = []
+    for t in range(hours):
+        h, d = t % 24, (t // 24) % 7
+        daily  = 0.15 + math.exp(-((h - 10) ** 2) / 8) + 0.7 * math.exp(-((h - 17) ** 2) / 6)
+        weekly = 0.6 if d >= 5 else 1.0
+        out.append(max(0.0, base * daily * weekly + rng.gauss(0, base * 0.05)))
+    return out
+
+
+def equivalence(trials: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    series = [demand_series(rng, rng.randint(2, 24 * 14)) for _ in range(trials)]
+    series += [[0.0] * 60, [5.0] * 7, [1.0, 2.0], [3.0]]
+    batch = HoltWintersBatch().fit(series)
+    fc    = batch.forecast(24)
+    peaks = batch.peak_hours(24, 3, fc)
+    for i, x in enumerate(series):
+        hw = HoltWinters().fit(x)
+        assert hw.is_trained() == bool(batch.trained[i]), f"trained flag differs for series {i}"
+        if not hw.is_trained():
+            continue
+        assert math.isclose(hw._level, batch.level[i], rel_tol=1e-9, abs_tol=1e-9), f"level differs for series {i}"
+        assert math.isclose(hw._trend, batch.trend[i], rel_tol=1e-9, abs_tol=1e-9), f"trend differs for series {i}"
+        assert np.allclose(hw._seasonal, batch.seasonal[i], rtol=1e-9, atol=1e-9), f"seasonals differ for series {i}"
+        # Rounded to 2 dp on both sides: allow one unit in the last place
+        assert np.allclose(hw.forecast(24), fc[i], atol=0.0101), f"forecast differs for series {i}"
+        assert hw.peak_hours(24, 3) == peaks[i].tolist() or \
+            np.allclose(np.sort(fc[i][hw.peak_hours(24, 3)]), np.sort(fc[i][peaks[i]])), f"peaks differ for series {i}"
+    print(f"  ✔ {len(series):,} ragged series: state, forecasts and peak hours match HoltWinters")
+
+
+def benchmark(n_series: int, days: int, seed: int = 2) -> None:
+    rng = random.Random(seed)
+    series = [demand_series(rng, 24 * days) for _ in range(n_series)]
+
+    t0 = time.perf_counter()
+    for x in series:
+        hw = HoltWinters().fit(x)
+        hw.forecast(24); hw.peak_hours(24, 3)
+    scalar_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = HoltWintersBatch().fit(series)
+    batch.peak_hours(24, 3, batch.forecast(24))
+    batch_s = time.perf_counter() - t0
+    print(f"  {n_series:>6,} series × {days} days hourly   HoltWinters {scalar_s:7.2f} s   "
+          f"HoltWintersBatch {batch_s:6.2f} s   ×{scalar_s / batch_s:,.0f}")
+
+
+def incremental(days: int, new_hours: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    full = demand_series(rng, 24 * days + new_hours)
+    base = HoltWinters().fit(full[:24 * days])
+    state = base.get_state()
+
+    t0 = time.perf_counter()
+    for t in range(24 * days, len(full)):
+        hw = HoltWinters()
+        hw.load_state(**state)          # as read back from ForecastState
+        hw.update([full[t]])
+        state = hw.get_state()
+    inc_us = (time.perf_counter() - t0) / new_hours * 1e6
+
+    t0 = time.perf_counter()
+    for t in range(24 * days, len(full), max(1, new_hours // 10)):
+        HoltWinters().fit(full[:t + 1])
+    refit_us = (time.perf_counter() - t0) / len(range(24 * days, len(full), max(1, new_hours // 10))) * 1e6
+
+    assert hw.forecast(24) == HoltWinters().fit(full).forecast(24), "incremental state drifted from refit"
+    peak_hour = (len(full) + hw.peak_hours(24, 1)[0]) % 24   # demand_series peaks at 10:00
+    assert peak_hour == 10, f"forecast out of phase: peak at {peak_hour}:00 after {len(full)} hours, expected 10:00"
+    print(f"  {days} days of history + {new_hours} new hours   update {inc_us:7.1f} µs/hour   "
+          f"full refit {refit_us:9.1f} µs/hour   ×{refit_us / inc_us:,.0f}")
+    print(f"  ✔ forecast after incremental updates equals a full refit, in phase after {len(full):,} hours")
+
+
+def scalar_mse(x: list[float], alpha: float, beta: float, gamma: float, period: int = 24) -> float:
+    """One-step-ahead MSE by replaying HoltWinters one observation at a time."""
+    hw = HoltWinters(alpha, beta, gamma, period)
+    hw._init_components(list(x))
+    hw._is_trained = True
+    err, count = 0.0, 0
+    for t, y in enumerate(x):
+        if t >= period:
+            s = t % period
+            err += (y - (hw._level + hw._trend) * hw._seasonal[s]) ** 2; count += 1
+        hw.update([y])
+    return err / count
+
+
+def tuning(n_series: int, days: int, workers: int, seed: int = 4) -> None:
+    rng = random.Random(seed)
+    x = demand_series(rng, 24 * 20)
+    combos = [(0.3, 0.1, 0.2), (0.05, 0.3, 0.5), (0.8, 0.01, 0.05)]
+    batch = HoltWintersBatch(*(np.array(c) for c in zip(*combos))).fit([x] * len(combos))
+    for c, m in zip(combos, batch.mse):
+        assert math.isclose(scalar_mse(x, *c), m, rel_tol=1e-9), f"mse differs for {c}"
+    print(f"  ✔ per-row parameters: one-step MSE matches a scalar replay for {len(combos)} parameter sets")
+
+    series = {i: demand_series(rng, 24 * days) for i in range(n_series)}
+    sample = {i: series[i] for i in range(min(16, n_series))}
+    t0 = time.perf_counter()
+    tune_parameters(sample, workers=1)
+    single = (time.perf_counter() - t0) / len(sample)
+
+    t0 = time.perf_counter()
+    tuned = tune_parameters(series, workers=workers)
+    secs = time.perf_counter() - t0
+    default = HoltWintersBatch().fit(list(series.values())).mse
+    better = [tuned[i]["mse"] <= default[i] + 1e-12 for i in series]
+    assert all(better), "tuned parameters worse than the defaults"
+    ratio = np.median([tuned[i]["mse"] / default[i] for i in series])
+    print(f"  {n_series:,} series × {days} days on {workers} process(es)   {secs:6.1f} s   "
+          f"(single process ≈ {single * n_series:6.1f} s)")
+    print(f"  ✔ tuned MSE ≤ default MSE for every series; median tuned/default {ratio:.2f} "
+          f"(defaults {DEFAULT_PARAMS})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Holt-Winters scalar vs batch")
+    parser.add_argument("--series", type=int, default=1000)
+    parser.add_argument("--days",   type=int, default=90)
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--tune",   type=int, default=500, help="series for the fleet retune")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print("\n🔎  Equivalence\n")
+    equivalence(args.trials)
+    print("\n⏱   Nightly retrain\n")
+    for n in sorted({100, args.series}):
+        benchmark(n, args.days)
+    print("\n🔁  Incremental state updates\n")
+    incremental(args.days, 245)   # not a whole number of days
+    print("\n🎛   Parameter tuning\n")
+    tuning(args.tune, args.days, args.workers)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+bench_slot_schedule.py — in-memory cost of POST /api/slots/bulk
+
+Expands a recurring schedule (default Mon–Fri 09:00–13:00, 15 min, 12 weeks)
+for N doctors whose trees already hold some slots, sweeps it for conflicts
+and loads it into the trees — the same steps the endpoint runs around its
+single bulk INSERT. Compared with the per-slot has_conflict + insert path
+create_slot would take. The sweep is cross-checked against has_conflict.
+
+Usage (from backend/):
+    python -m benchmarks.bench_slot_schedule
+    python -m benchmarks.bench_slot_schedule --doctors 500 --weeks 26
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta
+
+from algorithms.interval_tree import IntervalTree, Interval, expand_recurring
+
+
+def existing_trees(doctors: list[str], start: date, weeks: int, per_doctor: int, rng: random.Random):
+    """Trees pre-loaded with scattered 15–60 min slots, some overlapping the new schedule."""
+    trees = {}
+    for d in doctors:
+        tree = IntervalTree()
+        ivs = []
+        for i in range(per_doctor):
+            s = datetime.combine(start, dtime(8)) + timedelta(days=rng.randrange(weeks * 7),
+                                                              minutes=15 * rng.randrange(48))
+            ivs.append(Interval(s, s + timedelta(minutes=rng.choice((15, 30, 60))), f"{d}-old-{i}", d, "b"))
+        tree.insert_many(ivs)
+        trees[d] = tree
+    return trees
+
+
+def expand(doctors, start, weeks):
+    return {d: expand_recurring(d, "b", start, weeks, range(5), dtime(9), dtime(13), 15,
+                                slot_id=lambda: str(uuid.uuid4()))
+            for d in doctors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk recurring slot generation")
+    parser.add_argument("--doctors",  type=int, default=200)
+    parser.add_argument("--weeks",    type=int, default=12)
+    parser.add_argument("--existing", type=int, default=40, help="pre-existing slots per doctor")
+    args = parser.parse_args()
+
+    rng     = random.Random(7)
+    start   = date(2026, 1, 5)
+    doctors = [f"doctor-{i}" for i in range(args.doctors)]
+    print(f"\n⏱   Schedule for {args.doctors} doctors × {args.weeks} weeks (Mon–Fri 09:00–13:00, 15 min)\n")
+
+    # Bulk path: expand → one sweep per tree → insert_many
+    trees = existing_trees(doctors, start, args.weeks, args.existing, rng)
+    t0 = time.perf_counter()
+    generated = expand(doctors, start, args.weeks)
+    t1 = time.perf_counter()
+    skipped = {}
+    for d, ivs in generated.items():
+        clash = {iv.slot_id for iv in trees[d].find_conflicts(ivs)}
+        skipped[d] = clash
+        generated[d] = [iv for iv in ivs if iv.slot_id not in clash]
+    t2 = time.perf_counter()
+    for d, ivs in generated.items():
+        trees[d].insert_many(ivs)
+    t3 = time.perf_counter()
+    created = sum(map(len, generated.values()))
+    print(f"  expand           {t1 - t0:8.3f} s   {created + sum(map(len, skipped.values())):>9,} slots")
+    print(f"  conflict sweep   {t2 - t1:8.3f} s   {sum(map(len, skipped.values())):>9,} skipped")
+    print(f"  tree load        {t3 - t2:8.3f} s   {created:>9,} inserted")
+    print(f"  bulk total       {t3 - t0:8.3f} s")
+
+    # Per-slot path, as N create_slot calls would do (minus the HTTP + commit per call)
+    trees = existing_trees(doctors, start, args.weeks, args.existing, random.Random(7))
+    t0 = time.perf_counter()
+    per_slot_skipped = {}
+    for d, ivs in expand(doctors, start, args.weeks).items():
+        tree, miss = trees[d], 0
+        for iv in ivs:
+            if tree.has_conflict(d, iv.start, iv.end):
+                miss += 1
+                continue
+            tree.insert(iv)
+        per_slot_skipped[d] = miss
+    print(f"  per-slot total   {time.perf_counter() - t0:8.3f} s")
+
+    if any(len(skipped[d]) != per_slot_skipped[d] for d in doctors):
+        raise SystemExit("❌ sweep and per-slot conflict checks disagree")
+    print(f"\n✅  {created:,} slots generated; sweep matches per-slot has_conflict\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+bench_state_backend.py — several worker processes sharing one state server
+
+Starts a state server on a throw-away Unix socket (or localhost TCP port),
+then N worker processes all push patients into the same (doctor, branch)
+queue, wait for each other, and drain it concurrently. Also checks that a
+slot inserted into the interval tree by one worker conflicts for the others.
+Checks every appointment is popped exactly once and reports read latency.
+No external services needed.
+
+Usage (from backend/):
+    python -m benchmarks.bench_state_backend
+    python -m benchmarks.bench_state_backend --workers 8 --per-worker 5000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+AUTHKEY = b"bench-state"
+
+
+def _address():
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(tempfile.mkdtemp(), "state.sock")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return ("127.0.0.1", s.getsockname()[1])
+
+
+def _server(address):
+    from algorithms.state_backend import serve
+    serve(address, AUTHKEY)
+
+
+def _worker(wid: int, address, per_worker: int, barrier, results):
+    from algorithms.state_backend import SocketBackend, set_backend
+    set_backend(SocketBackend(address, AUTHKEY, autostart=False))
+    from algorithms.priority_queue import get_queue, QueueNode
+    from algorithms.interval_tree import get_tree, Interval
+
+    pq    = get_queue("doctor-1", "branch-1")
+    start = datetime(2026, 1, 5, 9, 0)
+    for i in range(per_worker):
+        pq.push(QueueNode(neg_score=0.0, appointment_id=f"{wid}-{i}", patient_id=f"p{wid}-{i}",
+                          doctor_id="doctor-1", branch_id="branch-1", urgency="medium",
+                          appointment_type="consultation", entered_at=start))
+
+    # Each worker books its own 15-min slot; everyone must see everyone else's
+    tree = get_tree("doctor-1")
+    slot_start = start + timedelta(minutes=15 * wid)
+    tree.insert(Interval(slot_start, slot_start + timedelta(minutes=15),
+                         f"slot-{wid}", "doctor-1", "branch-1"))
+    barrier.wait()
+    seen_slots = sum(
+        1 for w in range(barrier.parties)
+        if tree.has_conflict("doctor-1", start + timedelta(minutes=15 * w, seconds=1),
+                             start + timedelta(minutes=15 * w + 1)) is not None
+    )
+
+    t0 = time.perf_counter()
+    reads = 200
+    for _ in range(reads):
+        pq.size()
+    read_us = (time.perf_counter() - t0) / reads * 1e6
+
+    popped = []
+    while True:
+        node = pq.pop()
+        if node is None:
+            break
+        popped.append(node.appointment_id)
+    results.put((wid, popped, seen_slots, read_us))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process shared state check")
+    parser.add_argument("--workers",    type=int, default=4)
+    parser.add_argument("--per-worker", type=int, default=2000)
+    args = parser.parse_args()
+
+    ctx     = mp.get_context("spawn")
+    address = _address()
+    server  = ctx.Process(target=_server, args=(address,), daemon=True)
+    server.start()
+
+    from algorithms.state_backend import SocketBackend
+    SocketBackend(address, AUTHKEY, autostart=False, connect_timeout=10)  # wait until up
+
+    print(f"\n⏱   Shared state: {args.workers} workers × {args.per_worker:,} patients on {address}\n")
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    t0 = time.perf_counter()
+    workers = [ctx.Process(target=_worker, args=(w, address, args.per_worker, barrier, results))
+               for w in range(args.workers)]
+    for p in workers:
+        p.start()
+    out = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    server.terminate()
+
+    all_popped = [aid for _, popped, _, _ in out for aid in popped]
+    expected   = {f"{w}-{i}" for w in range(args.workers) for i in range(args.per_worker)}
+    for wid, popped, seen, read_us in sorted(out):
+        print(f"  worker {wid}: popped {len(popped):>6,}   sees {seen}/{args.workers} slots   "
+              f"size() {read_us:6.1f} µs")
+    if len(all_popped) != len(set(all_popped)) or set(all_popped) != expected:
+        raise SystemExit("❌ queue state diverged between workers")
+    if any(seen != args.workers for _, _, seen, _ in out):
+        raise SystemExit("❌ interval tree state diverged between workers")
+    print(f"\n✅  {len(all_popped):,} pops, each appointment exactly once — {elapsed:.2f}s total\n")
+
+
+if __name__ == "__main__":
+    main()
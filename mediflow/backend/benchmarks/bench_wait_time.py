@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+bench_wait_time.py — rolling statistics behind WaitTimeEstimator
+
+1. Correctness: long random streams through RollingStats — mean, sum,
+   sample variance and P50 / P90 checked against a recompute of the
+   window (statistics module, nearest-rank quantiles) after every update.
+2. Reaction: a doctor's consults jump from ~12 to ~25 minutes — how many
+   completions until the estimate crosses 20 minutes, EWMA vs the plain
+   20-sample window average.
+3. Coverage: simulated waits vs the estimator's 80% band.
+4. Benchmark: per-update and per-estimate cost vs the previous
+   sum-the-deque RollingAverage.
+
+Usage (from backend/):
+    python -m benchmarks.bench_wait_time
+    python -m benchmarks.bench_wait_time --updates 1000000
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from algorithms.wait_time import RollingStats, WaitTimeEstimator
+
+
+class DequeAverage:
+    """The previous RollingAverage: sums the whole window on every read."""
+
+    def __init__(self, window: int = 20):
+        self._values = deque(maxlen=window)
+
+    def update(self, value: float) -> None:
+        self._values.append(value)
+
+    def get(self) -> float:
+        return sum(self._values) / len(self._values) if self._values else 15.0
+
+
+def nearest_rank(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+def correctness(updates: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    for window in (1, 2, 5, 20, 64):
+        rs = RollingStats(window=window, refresh=997)
+        ref: deque = deque(maxlen=window)
+        res = rs._res
+        for i in range(updates // 5):
+            v = rng.choice((rng.uniform(2, 60), rng.lognormvariate(2.5, 0.6), 15.0))
+            rs.update(v); ref.append(v)
+            assert math.isclose(rs.get(), statistics.fmean(ref), rel_tol=1e-9, abs_tol=1e-9), f"mean at {i}"
+            var = statistics.variance(ref) if len(ref) > 1 else 0.0
+            assert math.isclose(rs.variance(), var, rel_tol=1e-6, abs_tol=1e-6), f"variance at {i}"
+            for q in (0.5, 0.9):
+                # Clamped to the histogram range; within half a bucket otherwise
+                want = min(nearest_rank(ref, q), rs._buckets * res)
+                assert abs(rs.quantile(q) - want) <= res / 2 + 1e-9, f"P{int(q * 100)} at {i}"
+    print(f"  ✔ {updates:,} updates over windows 1–64: mean, variance exact; P50/P90 within ±{res / 2} min")
+
+
+def reaction(seed: int = 2) -> None:
+    rng = random.Random(seed)
+    est, plain = WaitTimeEstimator(), DequeAverage()
+    at = datetime(2026, 3, 2, 8)
+    for _ in range(30):                     # settled at ~12 min
+        d = rng.gauss(12, 2)
+        at += timedelta(minutes=d)
+        est.record_completion(d, at); plain.update(d)
+    ewma_n = plain_n = None
+    for n in range(1, 41):                  # doctor slows to ~25 min
+        d = rng.gauss(25, 3)
+        at += timedelta(minutes=d)
+        est.record_completion(d, at); plain.update(d)
+        if ewma_n is None and est.estimate(1, 1)["avg_consult_mins"] >= 20:
+            ewma_n = n
+        if plain_n is None and plain.get() >= 20:
+            plain_n = n
+    print(f"  consults 12 → 25 min: estimate passes 20 min after {ewma_n} completions (EWMA) "
+          f"vs {plain_n} (20-sample window)")
+
+
+def coverage(trials: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    inside = 0
+    for _ in range(trials):
+        est = WaitTimeEstimator()
+        mu, sd = rng.uniform(8, 30), rng.uniform(2, 8)
+        at = datetime(2026, 3, 2, 8)
+        for _ in range(20):
+            d = max(1.0, rng.gauss(mu, sd))
+            at += timedelta(minutes=d)
+            est.record_completion(d, at)
+        pos  = rng.randint(1, 12)
+        band = est.estimate(pos, pos)
+        wait = sum(max(1.0, rng.gauss(mu, sd)) for _ in range(pos))
+        inside += band["wait_low_mins"] <= wait <= band["wait_high_mins"]
+    print(f"  80% band covered {inside / trials:.1%} of {trials:,} simulated waits")
+
+
+def benchmark(updates: int, seed: int = 4) -> None:
+    rng  = random.Random(seed)
+    vals = [rng.uniform(5, 40) for _ in range(updates)]
+    for window in (20, 200):
+        old, new = DequeAverage(window), RollingStats(window)
+        t0 = time.perf_counter()
+        for v in vals:
+            old.update(v); old.get()
+        old_us = (time.perf_counter() - t0) / updates * 1e6
+        t0 = time.perf_counter()
+        for v in vals:
+            new.update(v); new.get()
+        new_us = (time.perf_counter() - t0) / updates * 1e6
+        t0 = time.perf_counter()
+        for _ in range(updates // 10):
+            new.variance(); new.quantile(0.5); new.quantile(0.9)
+        q_us = (time.perf_counter() - t0) / (updates // 10) * 1e6
+        print(f"  window {window:>3}   deque sum {old_us:5.2f} µs/update+read   "
+              f"RollingStats {new_us:5.2f} µs   variance+P50+P90 {q_us:5.2f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling wait-time statistics check + benchmark")
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--trials",  type=int, default=5_000)
+    args = parser.parse_args()
+
+    print("\n🔎  Correctness\n")
+    correctness(args.updates // 4)
+    print("\n🐢  Reaction to a slowdown\n")
+    reaction()
+    coverage(args.trials)
+    print("\n⏱   Benchmark\n")
+    benchmark(args.updates)
+    print()
+
+
+if __name__ == "__main__":
+    main()
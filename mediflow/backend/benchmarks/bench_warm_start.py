@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+bench_warm_start.py — startup rehydration cost (warm_start.py)
+
+Default mode feeds synthetic rows shaped like the warm-start queries straight
+into the loaders, so it measures the in-memory build without needing data:
+100k future slots over 200 doctors, 20k waiting patients, 4k completions.
+With --db it runs the real warm_start() against DB_URL instead.
+
+Usage (from backend/, DB_URL set as for the app):
+    python -m benchmarks.bench_warm_start
+    python -m benchmarks.bench_warm_start --slots 250000 --doctors 500
+    python -m benchmarks.bench_warm_start --db
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, date, time as dtime, timedelta
+
+from algorithms.priority_queue import URGENCY_SCORES, TYPE_SCORES
+from warm_start import load_queues, load_trees, load_estimators, warm_start
+
+
+def slot_rows(n: int, doctors: list[uuid.UUID], branch: uuid.UUID):
+    """Consecutive 15-min slots, 09:00–17:00 weekdays, round-robin over doctors."""
+    per_doctor = -(-n // len(doctors))
+    day0 = date.today()
+    for d in doctors:
+        emitted, day = 0, day0
+        while emitted < per_doctor:
+            if day.weekday() < 5:
+                for k in range(32):
+                    if emitted >= per_doctor:
+                        break
+                    start = datetime.combine(day, dtime(9)) + timedelta(minutes=15 * k)
+                    yield (uuid.uuid4(), d, branch, day, start.time(), (start + timedelta(minutes=15)).time())
+                    emitted += 1
+            day += timedelta(days=1)
+
+
+def queue_rows(n: int, doctors: list[uuid.UUID], branch: uuid.UUID, rng: random.Random):
+    now = datetime.utcnow()
+    for _ in range(n):
+        yield (uuid.uuid4(), uuid.uuid4(), rng.choice(doctors), branch,
+               rng.choice(list(URGENCY_SCORES)), rng.choice(list(TYPE_SCORES)),
+               now - timedelta(minutes=rng.uniform(0, 300)), rng.random() < 0.01,
+               date(rng.randint(1935, 2020), 1, 1))
+
+
+def completion_rows(doctors: list[uuid.UUID], branch: uuid.UUID, rng: random.Random):
+    start = datetime.utcnow() - timedelta(hours=8)
+    for d in doctors:
+        for i in range(20):
+            yield (d, branch, rng.uniform(5, 40), start + timedelta(minutes=20 * i))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup warm-start")
+    parser.add_argument("--slots",   type=int, default=100_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--waiting", type=int, default=20_000)
+    parser.add_argument("--db", action="store_true", help="run warm_start() against DB_URL")
+    args = parser.parse_args()
+
+    print("\n⏱   Warm start\n")
+    progress = lambda stage, n: print(f"  … {n:,} {stage}")
+
+    if args.db:
+        from mediflow_db.config import SessionLocal
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            stats = warm_start(db, progress)
+            total = time.perf_counter() - t0
+        finally:
+            db.close()
+    else:
+        rng     = random.Random(11)
+        branch  = uuid.uuid4()
+        doctors = [uuid.uuid4() for _ in range(args.doctors)]
+        # Materialise rows first so only the build is timed
+        stages = (
+            ("queue_entries", load_queues,     list(queue_rows(args.waiting, doctors, branch, rng))),
+            ("time_slots",    load_trees,      list(slot_rows(args.slots, doctors, branch))[:args.slots]),
+            ("completions",   load_estimators, list(completion_rows(doctors, branch, rng))),
+        )
+        stats, total = {}, 0.0
+        for stage, load, rows in stages:
+            t0 = time.perf_counter()
+            count = load(rows, progress)
+            secs  = time.perf_counter() - t0
+            stats[stage] = {"rows": count, "secs": round(secs, 3)}
+            total += secs
+
+    for stage, s in stats.items():
+        print(f"  ✔ {s['rows']:>9,} {stage:<14} {s['secs']:8.3f}s")
+    print(f"\n✅  Warm start finished in {total:.2f}s\n")
+
+
+if __name__ == "__main__":
+    main()
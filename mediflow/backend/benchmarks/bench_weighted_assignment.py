@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+bench_weighted_assignment.py — min-cost patient → slot assignment
+
+1. Optimality check: small random instances against
+   scipy.optimize.linear_sum_assignment on the dense cost matrix
+   (skipped if scipy is not installed).
+2. Benchmark: 5k patients × 20k slots over 200 doctors and 4 weeks, each
+   patient compatible with 1–3 doctors (default), plus a high-contention
+   variant with few doctors and a short horizon.
+
+Usage (from backend/):
+    python -m benchmarks.bench_weighted_assignment
+    python -m benchmarks.bench_weighted_assignment --patients 10000 --slots 40000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from algorithms.weighted_assignment import AssignmentPatient, AssignmentSlot, MinCostAssignment
+
+BASE     = datetime(2026, 1, 5, 9)
+URGENCY  = ("critical", "high", "medium", "low")
+
+
+def instance(rng: random.Random, n: int, m: int, doctors: int, days: int, max_caps: int = 1):
+    slots = [AssignmentSlot(j, rng.randrange(doctors),
+                            BASE + timedelta(days=rng.randrange(days), minutes=15 * rng.randrange(32)),
+                            rng.randint(1, max_caps))
+             for j in range(m)]
+    patients = [AssignmentPatient(i, BASE + timedelta(days=rng.randrange(days), minutes=rng.randrange(480)),
+                                  rng.choice(URGENCY), rng.sample(range(doctors), rng.randint(1, min(3, doctors))))
+                for i in range(n)]
+    return patients, slots
+
+
+def optimality_check(trials: int, seed: int = 1) -> None:
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        print("  – scipy not installed, skipping optimality check")
+        return
+    rng = random.Random(seed)
+    for t in range(trials):
+        patients, slots = instance(rng, rng.randint(1, 15), rng.randint(0, 20),
+                                   rng.randint(1, 4), 2, max_caps=2)
+        solver = MinCostAssignment(patients, slots)
+        solver.solve()
+        dense = np.array([solver._cost_row(i) for i in range(solver.n)])
+        dense = np.where(np.isinf(dense), 1e12, dense)
+        rows, cols = linear_sum_assignment(dense)
+        assert abs(dense[rows, cols].sum() - solver.total_cost) < 1e-6, f"suboptimal at trial {t}"
+    print(f"  ✔ {trials} random instances match scipy's optimum")
+
+
+def benchmark(label: str, n: int, m: int, doctors: int, days: int, seed: int = 5) -> None:
+    patients, slots = instance(random.Random(seed), n, m, doctors, days)
+    t0 = time.perf_counter()
+    solver = MinCostAssignment(patients, slots)
+    result = solver.solve()
+    dt = time.perf_counter() - t0
+    placed = [i for i, s in result.items() if s is not None]
+    late   = np.mean([solver.lateness_mins(i) for i in placed]) if placed else 0.0
+    crit   = [i for i, p in enumerate(patients) if p.urgency == "critical"]
+    crit_placed = sum(1 for i in crit if result[i] is not None)
+    print(f"  {label:<16} {n:,} × {m:,}   {dt:6.2f} s   placed {len(placed):,}/{n:,}   "
+          f"critical {crit_placed:,}/{len(crit):,}   mean lateness {late:7.1f} min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Min-cost assignment check + benchmark")
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--slots",    type=int, default=20000)
+    parser.add_argument("--trials",   type=int, default=200)
+    args = parser.parse_args()
+
+    print("\n🔎  Optimality check\n")
+    optimality_check(args.trials)
+    print("\n⏱   Benchmark\n")
+    benchmark("200 doctors/4w", args.patients, args.slots, doctors=200, days=28)
+    benchmark("20 doctors/1w",  args.patients, args.slots, doctors=20,  days=5)
+    print()
+
+
+if __name__ == "__main__":
+    main()
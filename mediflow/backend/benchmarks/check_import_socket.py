@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+check_import_socket.py — bulk import against the socket state backend
+
+Every state-backend call the import makes has to survive the proxy: the
+arguments and results are pickled across the socket. This seeds a doctor
+with one two-seat slot and imports, through a private state server:
+  1. a row with no slot_id at 09:05 → resolved into the slot from the tree
+  2. a row naming the slot          → takes the second seat
+  3. a row with no slot_id at 09:05 → slot full, offered as a walk-in
+  4. an unparsable line             → reported, skipped
+Then it checks the report, the slot count, the queue and the matcher. The
+seed and the import run in one outer transaction that is rolled back, and
+the server is stopped, so nothing is left behind. Exits 1 on any mismatch.
+
+Usage (from backend/, DB_URL set as for the app):
+    python -m benchmarks.check_import_socket
+"""
+import os
+import tempfile
+import uuid
+
+os.environ["MEDIFLOW_STATE_BACKEND"] = "socket"
+os.environ["MEDIFLOW_STATE_ADDRESS"] = os.path.join(tempfile.gettempdir(), f"mediflow-check-{uuid.uuid4().hex[:8]}.sock")
+os.environ["MEDIFLOW_DEPLOY_ID"]     = "check-import-socket"
+
+import io
+import json
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy.orm import Session
+
+from mediflow_db.config import Base, engine
+from mediflow_db.models import Branch, Doctor, Hospital, Patient, TimeSlot
+from algorithms.bipartite_matching import get_matcher, slot_group
+from algorithms.interval_tree import Interval, get_tree
+from algorithms.priority_queue import get_queue
+from algorithms.state_backend import default_address, get_backend, stop_server
+from bulk_import import import_appointments, read_rows
+
+
+def seed(db: Session) -> tuple[str, str, str, list[str]]:
+    """(branch, doctor, slot, patients) — a 09:00–09:15 slot with two seats, tomorrow."""
+    h = Hospital(name=f"Check {uuid.uuid4().hex[:8]}")
+    db.add(h); db.flush()
+    b = Branch(hospital_id=h.hospital_id, branch_name="Main", latitude=12.9, longitude=77.5, total_capacity=100)
+    d = Doctor(full_name="Dr Check")
+    ps = [Patient(full_name=f"Patient {i}", date_of_birth=date(1960 + i, 1, 1)) for i in range(3)]
+    db.add_all([b, d, *ps]); db.flush()
+    day = date.today() + timedelta(days=1)
+    slot = TimeSlot(doctor_id=d.doctor_id, branch_id=b.branch_id, date=day,
+                    start_time=time(9, 0), end_time=time(9, 15), capacity=2)
+    db.add(slot); db.flush()
+    get_tree(str(d.doctor_id)).insert(Interval(
+        start=datetime.combine(day, slot.start_time), end=datetime.combine(day, slot.end_time),
+        slot_id=str(slot.slot_id), doctor_id=str(d.doctor_id), branch_id=str(b.branch_id)))
+    return str(b.branch_id), str(d.doctor_id), str(slot.slot_id), [str(p.patient_id) for p in ps]
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    backend = get_backend()
+    conn  = engine.connect()
+    outer = conn.begin()   # chunk commits become savepoints; everything is rolled back at the end
+    db = Session(bind=conn, join_transaction_mode="create_savepoint", autoflush=False)
+    problems = []
+    try:
+        backend.claim_warm_start()
+        b, d, slot, ps = seed(db)
+        at = datetime.combine(date.today() + timedelta(days=1), time(9, 5)).isoformat()
+        row = lambda p, **extra: json.dumps({"patient_id": p, "doctor_id": d, "branch_id": b, "urgency_level": "medium",
+                                             "appointment_type": "consultation", "scheduled_time": at, **extra})
+        body = "\n".join([row(ps[0]), row(ps[1], slot_id=slot), row(ps[2]), "{broken"]) + "\n"
+
+        report = import_appointments(db, read_rows(io.StringIO(body), "ndjson"))
+        print(f"\n📥  {backend.name}: {json.dumps({k: v for k, v in report.items() if k != 'secs'})}\n")
+
+        expect = {"rows": 4, "imported": 3, "queued": 3, "slotted": 2, "failed": 1}
+        for key, want in expect.items():
+            if report.get(key) != want:
+                problems.append(f"report {key} = {report.get(key)}, expected {want}")
+        booked = db.get(TimeSlot, uuid.UUID(slot)).booked_count
+        if booked != 2:
+            problems.append(f"slot booked_count = {booked}, expected 2")
+        if get_queue(d, b).size() != 3:
+            problems.append(f"queue holds {get_queue(d, b).size()}, expected 3")
+        if not get_matcher(b).has_group(slot_group(d, date.today() + timedelta(days=1))):
+            problems.append("the walk-in never reached the matcher")
+    finally:
+        db.close()
+        outer.rollback()
+        conn.close()
+        stop_server(default_address())
+        for leftover in (".lock", ".key"):
+            if os.path.exists(default_address() + leftover):
+                os.unlink(default_address() + leftover)
+
+    for p in problems:
+        print(f"  ❌ {p}")
+    print(f"\n  {'❌ ' + str(len(problems)) + ' check(s) failed' if problems else '✔ import path works through the socket backend'}\n")
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
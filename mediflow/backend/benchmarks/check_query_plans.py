@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+check_query_plans.py — query-plan regression check for the declared indexes
+
+Seeds a scratch Postgres with a year of realistic volume (~300k
+appointments, ~580k time slots, queue / analytics history to match), then
+runs the real router handlers and warm start against it. Every SELECT /
+UPDATE they send is EXPLAINed with its own parameters, and each case must
+(a) use the indexes it was declared for and (b) not Seq Scan any table
+over --min-rows rows. Handlers that write run inside one outer
+transaction that is rolled back, so the seed is left as it was and
+--reuse can re-check it (or a restored copy of production) later.
+Exits 1 on any regression.
+
+DB_URL must point at a scratch database: seeding refuses to run when
+scheduling.appointments already has rows.
+
+Usage (from backend/, DB_URL set as for the app):
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --scale 0.2      # quicker seed
+    python -m benchmarks.check_query_plans --reuse          # check plans only
+"""
+import os
+os.environ["MEDIFLOW_DB_MODE"] = "sync"   # call the handlers directly; the SQL is the same in both modes
+
+import argparse
+import time
+import uuid
+from datetime import date, timedelta
+
+from fastapi import Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from mediflow_db.config import Base, engine, ensure_indexes
+from mediflow_db.models import AutoAssignData
+from routers.analytics_router import (admin_summary, appointment_density, branch_load_history,
+                                      doctor_performance, peak_forecast, wait_time_trends)
+from routers.appointment_router import (auto_assign, cancel_appointment, complete_appointment,
+                                        get_appointment, list_appointments)
+from routers.queue_router import get_live_queue, get_next_patient, get_priority_score
+from routers.slot_router import get_available_slots, get_free_windows
+from pagination import NEXT_CURSOR_HEADER
+from warm_start import warm_start
+
+BRANCHES         = 20
+DEPTS_PER_BRANCH = 5
+DOCTORS_PER_DEPT = 4
+
+# ----------------------------------------------------------------
+#  Seed — generated server-side, one statement per table
+# ----------------------------------------------------------------
+
+SEED_SQL = """
+INSERT INTO organization.branches (branch_id, hospital_id, branch_name, city, latitude, longitude,
+                                   total_capacity, current_load, is_active)
+SELECT gen_random_uuid(), :hospital_id, 'Branch ' || i, 'City ' || (i % 5),
+       12.9 + i * 0.01, 77.5 + i * 0.01, 200, 0.0, true
+  FROM generate_series(1, :branches) i;
+
+INSERT INTO organization.departments (department_id, branch_id, name, specialty, is_active)
+SELECT gen_random_uuid(), b.branch_id, 'Dept ' || k, 'Specialty ' || k, true
+  FROM organization.branches b, generate_series(1, :depts) k;
+
+INSERT INTO users.doctors (doctor_id, department_id, full_name, specialization, avg_consult_mins, is_active)
+SELECT gen_random_uuid(), d.department_id, 'Dr ' || k || ' ' || d.name, d.specialty, 15.0, true
+  FROM organization.departments d, generate_series(1, :doctors_per_dept) k;
+
+INSERT INTO users.patients (patient_id, full_name, date_of_birth, is_active)
+SELECT gen_random_uuid(), 'Patient ' || i, date '1940-01-01' + (i * 7) % 30000, true
+  FROM generate_series(1, :patients) i;
+
+CREATE TEMP TABLE seed_doctors ON COMMIT DROP AS
+SELECT row_number() OVER (ORDER BY doc.doctor_id) - 1 AS n, doc.doctor_id, dep.branch_id
+  FROM users.doctors doc JOIN organization.departments dep USING (department_id);
+
+CREATE TEMP TABLE seed_patients ON COMMIT DROP AS
+SELECT row_number() OVER (ORDER BY patient_id) - 1 AS n, patient_id FROM users.patients;
+
+-- 16 half-hour slots a day per doctor, two months back, one forward
+INSERT INTO scheduling.time_slots (slot_id, doctor_id, branch_id, date, start_time, end_time,
+                                   capacity, booked_count, is_available)
+SELECT gen_random_uuid(), d.doctor_id, d.branch_id, current_date + day,
+       make_time(9, 0, 0) + k * interval '30 minutes', make_time(9, 30, 0) + k * interval '30 minutes',
+       2, 0, day >= 0
+  FROM seed_doctors d, generate_series(-60, 30) day, generate_series(0, 15) k;
+
+-- a year of history plus the coming month; future ones mostly booked into a slot
+INSERT INTO scheduling.appointments (appointment_id, patient_id, doctor_id, branch_id, slot_id,
+                                     urgency_level, appointment_type, status, booked_at,
+                                     scheduled_time, actual_start_time, actual_end_time)
+SELECT gen_random_uuid(), p.patient_id, d.doctor_id, d.branch_id,
+       CASE WHEN a.day >= 0 AND a.i % 10 <> 0 THEN s.slot_id END,
+       (CASE WHEN (a.i / 3) % 20 = 0 THEN 'critical' WHEN (a.i / 3) % 20 < 4 THEN 'high'
+             WHEN (a.i / 3) % 20 < 10 THEN 'medium' ELSE 'low' END)::urgencyenum,
+       (ARRAY['consultation', 'consultation', 'follow_up', 'surgery', 'emergency'])[1 + a.i % 5]::appointmenttypeenum,
+       (CASE WHEN a.day >= 0 THEN 'scheduled' WHEN a.i % 20 = 0 THEN 'cancelled'
+             WHEN a.i % 20 = 1 THEN 'no_show' ELSE 'completed' END)::appointmentstatusenum,
+       a.at - interval '7 days', a.at,
+       CASE WHEN a.day < 0 THEN a.at + interval '5 minutes' END,
+       CASE WHEN a.day < 0 THEN a.at + (5 + a.i % 35) * interval '1 minute' END
+  FROM (SELECT i::bigint AS i, -365 + (i * 31) % 396 AS day,
+               current_date + (-365 + (i * 31) % 396) + make_time(9, 0, 0) + ((i * 13) % 16) * interval '30 minutes' AS at
+          FROM generate_series(1, :appointments) i) a
+  JOIN seed_doctors  d ON d.n = (a.i * 7919) % :n_doctors
+  JOIN seed_patients p ON p.n = (a.i * 104729) % :patients
+  LEFT JOIN scheduling.time_slots s
+         ON s.doctor_id = d.doctor_id AND s.date = a.at::date AND s.start_time = a.at::time;
+
+UPDATE scheduling.time_slots t
+   SET booked_count = c.n, is_available = c.n < t.capacity
+  FROM (SELECT slot_id, count(*) AS n FROM scheduling.appointments
+         WHERE slot_id IS NOT NULL GROUP BY slot_id) c
+ WHERE t.slot_id = c.slot_id;
+
+INSERT INTO scheduling.slot_blocks (block_id, doctor_id, branch_id, start_datetime, end_datetime, reason)
+SELECT gen_random_uuid(), d.doctor_id, d.branch_id,
+       current_date + (-60 + k * 4) + make_time(13, 0, 0), current_date + (-60 + k * 4) + make_time(14, 0, 0), 'Leave'
+  FROM seed_doctors d, generate_series(0, 24) k
+UNION ALL
+SELECT gen_random_uuid(), NULL, b.branch_id,
+       current_date + (-60 + k * 3) + make_time(8, 0, 0), current_date + (-60 + k * 3) + make_time(9, 0, 0), 'Drill'
+  FROM organization.branches b, generate_series(0, 29) k;
+
+-- queue history for the last 90 days; every scheduled appointment is waiting
+INSERT INTO queue.queue_entries (queue_id, appointment_id, branch_id, doctor_id, position,
+                                 entered_queue_at, estimated_wait_mins, is_emergency, status)
+SELECT gen_random_uuid(), appointment_id, branch_id, doctor_id,
+       row_number() OVER (PARTITION BY doctor_id, branch_id, status ORDER BY scheduled_time),
+       booked_at, 15, urgency_level = 'critical',
+       (CASE status WHEN 'scheduled' THEN 'waiting' WHEN 'no_show' THEN 'skipped' ELSE 'done' END)::queuestatusenum
+  FROM scheduling.appointments
+ WHERE scheduled_time >= current_date - 90 AND status <> 'cancelled';
+
+INSERT INTO queue.priority_scores (score_id, queue_id, urgency_weight, wait_weight, age_weight, type_weight,
+                                   final_score, computed_at)
+SELECT gen_random_uuid(), queue_id, 0.5, 0.3, 0.1, 0.1, random() * 100, entered_queue_at
+  FROM queue.queue_entries;
+
+INSERT INTO queue.wait_time_estimates (estimate_id, queue_id, estimated_wait_mins, queue_length,
+                                       service_rate, calculated_at)
+SELECT gen_random_uuid(), queue_id, estimated_wait_mins, position, 4.0, entered_queue_at
+  FROM queue.queue_entries;
+
+INSERT INTO analytics.appointment_logs (log_id, appointment_id, patient_id, doctor_id, branch_id,
+                                        urgency_level, appointment_type, status, scheduled_time,
+                                        actual_start_time, actual_end_time, wait_time_mins,
+                                        consult_duration_mins, logged_at)
+SELECT gen_random_uuid(), appointment_id, patient_id, doctor_id, branch_id, urgency_level,
+       appointment_type, status, scheduled_time, actual_start_time, actual_end_time, 5.0,
+       CASE WHEN status = 'completed'
+            THEN extract(epoch FROM actual_end_time - actual_start_time) / 60 END,
+       coalesce(actual_end_time, scheduled_time)
+  FROM scheduling.appointments
+ WHERE scheduled_time < current_date;
+
+INSERT INTO analytics.peak_hour_stats (stat_id, branch_id, day_of_week, hour_of_day, avg_appointments,
+                                       max_appointments, avg_wait_mins, recorded_on)
+SELECT gen_random_uuid(), b.branch_id, extract(dow FROM current_date + day), h,
+       10 + 8 * sin(h / 3.8) + random() * 3, 30, 12.0, current_date + day
+  FROM organization.branches b, generate_series(-365, -1) day, generate_series(0, 23) h;
+
+INSERT INTO analytics.wait_time_trends (trend_id, department_id, branch_id, date, hour_of_day,
+                                        avg_wait_mins, min_wait_mins, max_wait_mins, sample_count)
+SELECT gen_random_uuid(), d.department_id, d.branch_id, current_date + day, h, 14.0, 2.0, 45.0, 12
+  FROM organization.departments d, generate_series(-180, -1) day, generate_series(8, 19) h;
+
+INSERT INTO analytics.doctor_performance (perf_id, doctor_id, date, total_appointments, completed_count,
+                                          no_show_count, avg_consult_mins, avg_wait_mins, utilization_pct)
+SELECT gen_random_uuid(), d.doctor_id, current_date + day, 16, 14, 1, 15.0, 12.0, 80.0
+  FROM seed_doctors d, generate_series(-365, -1) day;
+
+INSERT INTO analytics.branch_load_stats (load_id, branch_id, recorded_at, active_appointments,
+                                         queue_depth, utilization_pct, overflow_redirects)
+SELECT gen_random_uuid(), b.branch_id, now()::timestamp - h * interval '1 hour', 40, 12, 60.0, 0
+  FROM organization.branches b, generate_series(0, 90 * 24) h;
+"""
+
+
+def seed(scale: float) -> None:
+    counts = {"branches": BRANCHES, "depts": DEPTS_PER_BRANCH, "doctors_per_dept": DOCTORS_PER_DEPT,
+              "n_doctors": BRANCHES * DEPTS_PER_BRANCH * DOCTORS_PER_DEPT,
+              "patients": max(1000, int(100_000 * scale)), "appointments": max(10_000, int(300_000 * scale))}
+    with engine.begin() as conn:
+        counts["hospital_id"] = conn.execute(text(
+            "INSERT INTO organization.hospitals (hospital_id, name, is_active) "
+            "VALUES (gen_random_uuid(), :name, true) RETURNING hospital_id"),
+            {"name": f"plan-check-{uuid.uuid4().hex[:8]}"}).scalar()
+        for stmt in filter(str.strip, SEED_SQL.split(";\n")):
+            conn.execute(text(stmt), counts)
+    # Fresh statistics and visibility map, as autovacuum would leave them
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM ANALYZE")
+
+
+def table_rows() -> dict[str, int]:
+    with engine.connect() as conn:
+        return dict(conn.execute(text(
+            "SELECT c.relname, c.reltuples::bigint FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relkind = 'r' AND n.nspname IN ('organization', 'users', 'scheduling', 'queue', 'analytics')")).all())
+
+
+def pick_ids() -> dict:
+    """A busy (doctor, branch) queue and its rows — ids the cases are called with."""
+    with engine.connect() as conn:
+        row = conn.execute(text("""
+            SELECT q.doctor_id, q.branch_id, q.queue_id, a.appointment_id, a.patient_id, d.department_id
+              FROM queue.queue_entries q
+              JOIN scheduling.appointments a USING (appointment_id)
+              JOIN users.doctors d ON d.doctor_id = q.doctor_id
+             WHERE q.status = 'waiting' AND a.slot_id IS NOT NULL
+             LIMIT 1""")).mappings().first()
+        if row is None:
+            raise SystemExit("❌ No waiting queue entries — seed first (drop --reuse)")
+        ids = {k: str(v) for k, v in row.items()}
+        ids["branch_doctors"] = [str(d) for (d,) in conn.execute(text(
+            "SELECT doctor_id FROM users.doctors JOIN organization.departments USING (department_id) "
+            "WHERE branch_id = :b LIMIT 5"), {"b": row["branch_id"]})]
+    return ids
+
+
+# ----------------------------------------------------------------
+#  Cases — (name, call, indexes the plans must use, tables allowed a Seq Scan)
+# ----------------------------------------------------------------
+
+def cases(ids: dict) -> list[tuple]:
+    today, d, b = date.today(), ids["doctor_id"], ids["branch_id"]
+
+    def pages(limit=50, **filters):
+        """First page and the page after it (keyset)."""
+        def call(db):
+            response = Response()
+            list_appointments(response, limit=limit, db=db, _={}, **filters)
+            list_appointments(Response(), limit=limit, cursor=response.headers[NEXT_CURSOR_HEADER], db=db, _={}, **filters)
+        return call
+
+    auto = AutoAssignData(branch_id=b, date_from=today, date_to=today + timedelta(days=6))
+    return [
+        # Startup reads every future slot — a third of the seeded table, where a Seq Scan is the right plan
+        ("warm start", lambda db: warm_start(db),
+         {"ix_queue_entries_waiting", "ix_appointment_logs_completions"}, {"time_slots"}),
+        ("appointments · all",       pages(),                {"ix_appointments_scheduled_time_id"}, set()),
+        ("appointments · patient",   pages(2, patient_id=ids["patient_id"]), {"ix_appointments_patient_time"}, set()),
+        ("appointments · doctor",    pages(doctor_id=d),     {"ix_appointments_doctor_time"}, set()),
+        ("appointments · branch",    pages(branch_id=b),     {"ix_appointments_branch_time"}, set()),
+        ("appointment by id",        lambda db: get_appointment(ids["appointment_id"], db=db, _={}),
+         {"appointments_pkey"}, set()),
+        ("auto-assign proposals",    lambda db: auto_assign(auto, db=db, _={}),
+         {"ix_appointments_unslotted", "ix_time_slots_branch_date"}, set()),
+        ("available slots",          lambda db: get_available_slots(d, b, str(today + timedelta(days=1)), db=db, _={}),
+         {"ix_time_slots_doctor_branch_date"}, set()),
+        ("free windows",             lambda db: get_free_windows(str(today), str(today + timedelta(days=6)),
+                                                                 doctor_ids=",".join(ids["branch_doctors"]),
+                                                                 branch_id=b, db=db, _={}),
+         {"ix_slot_blocks_doctor_start", "ix_slot_blocks_branch_start"}, set()),
+        ("live queue",               lambda db: get_live_queue(d, b, db=db, _={}),
+         {"ix_queue_entries_doctor_branch_status", "ix_priority_scores_queue"}, set()),
+        ("priority score",           lambda db: get_priority_score(ids["queue_id"], db=db, _={}),
+         {"ix_priority_scores_queue"}, set()),
+        ("next patient",             lambda db: get_next_patient(d, b, db=db, _={}),
+         {"ix_queue_entries_appointment", "ix_wait_time_estimates_queue"}, set()),
+        ("dashboard summary",        lambda db: admin_summary(db=db, _={}),
+         {"ix_appointments_scheduled_time_id", "ix_appointments_status", "ix_appointments_urgency"}, set()),
+        ("appointment density",      lambda db: appointment_density(b, db=db, _={}),
+         {"ix_appointment_logs_branch_time"}, set()),
+        ("peak forecast",            lambda db: peak_forecast(b, ids["department_id"], db=db, _={}),
+         {"ix_peak_hour_stats_branch_day_hour"}, set()),
+        ("wait-time trends",         lambda db: wait_time_trends(ids["department_id"], db=db, _={}),
+         {"ix_wait_time_trends_department_date"}, set()),
+        ("doctor performance",       lambda db: doctor_performance(d, db=db, _={}),
+         {"ix_doctor_performance_doctor_date"}, set()),
+        ("branch load history",      lambda db: branch_load_history(b, db=db, _={}),
+         {"ix_branch_load_stats_branch_time"}, set()),
+        ("complete appointment",     lambda db: complete_appointment(ids["appointment_id"], 12.0, db=db, _={}),
+         {"appointments_pkey", "ix_queue_entries_appointment"}, set()),
+        ("cancel appointment",       lambda db: cancel_appointment(ids["appointment_id"], db=db, _={}),
+         {"appointments_pkey", "time_slots_pkey"}, set()),
+    ]
+
+
+# ----------------------------------------------------------------
+#  Plans
+# ----------------------------------------------------------------
+
+PLANNED = ("SELECT", "WITH", "UPDATE", "DELETE")   # INSERT plans are not worth checking
+_captured: list | None = None
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if _captured is not None and not executemany and statement.split(None, 1)[0].upper() in PLANNED:
+        _captured.append((statement, parameters))
+
+
+def scans(plan: dict):
+    """(node type, table, index) of every scan node under `plan`."""
+    if "Relation Name" in plan or "Index Name" in plan:
+        yield plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name")
+    for child in plan.get("Plans", ()):
+        yield from scans(child)
+
+
+def check(name: str, call, expect: set, allow_seq: set, db: Session, explain, rows: dict, min_rows: int) -> list[str]:
+    global _captured
+    _captured = []
+    try:
+        call(db)
+    finally:
+        statements, _captured = _captured, None
+        db.rollback()
+    used, problems = set(), []
+    for statement, parameters in statements:
+        explain.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        for node, table, index in scans(explain.fetchone()[0][0]["Plan"]):
+            if index:
+                used.add(index)
+            if node == "Seq Scan" and rows.get(table, 0) >= min_rows and table not in allow_seq:
+                problems.append(f"Seq Scan on {table} ({rows[table]:,} rows)")
+    problems += [f"{ix} not used" for ix in sorted(expect - used)]
+    mark = "❌" if problems else "✔"
+    print(f"  {mark} {name:<24} {len(statements):>2} stmts   {', '.join(sorted(used)) or '—'}")
+    for p in dict.fromkeys(problems):
+        print(f"      ↳ {p}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert router queries use the declared indexes (Postgres)")
+    parser.add_argument("--scale",    type=float, default=1.0, help="Seed volume (1.0 ≈ 300k appointments)")
+    parser.add_argument("--reuse",    action="store_true",     help="Skip seeding, check the current data")
+    parser.add_argument("--min-rows", type=int, default=10_000, help="Tables this big must not be Seq Scanned")
+    args = parser.parse_args()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ DB_URL must point at Postgres")
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+
+    if not args.reuse:
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT EXISTS (SELECT 1 FROM scheduling.appointments)")).scalar():
+                raise SystemExit("❌ scheduling.appointments is not empty — use a scratch DB, or --reuse")
+        t0 = time.perf_counter()
+        seed(args.scale)
+        print(f"\n🌱  Seeded in {time.perf_counter() - t0:.1f}s")
+    rows = table_rows()
+    print("\n🔎  " + "   ".join(f"{t} {n:,}" for t, n in sorted(rows.items(), key=lambda r: -r[1]) if n >= args.min_rows) + "\n")
+
+    ids = pick_ids()
+    conn = engine.connect()
+    outer = conn.begin()   # handlers commit into savepoints; everything is rolled back at the end
+    db = Session(bind=conn, join_transaction_mode="create_savepoint", autoflush=False)
+    raw = engine.raw_connection()
+    failed = 0
+    try:
+        explain = raw.cursor()
+        for name, call, expect, allow_seq in cases(ids):
+            failed += bool(check(name, call, expect, allow_seq, db, explain, rows, args.min_rows))
+    finally:
+        raw.close()
+        db.close()
+        outer.rollback()
+        conn.close()
+
+    print(f"\n  {'❌ ' + str(failed) + ' case(s) regressed' if failed else '✔ every case uses its indexes'}\n")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
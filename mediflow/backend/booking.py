@@ -0,0 +1,126 @@
+# ================================================================
+#  booking.py — Single-round-trip appointment booking
+#  Per booking, against the 10 statements + 2 flushes + refresh
+#  the ORM path issued:
+#    1. lock_slot_and_patient  slot row FOR UPDATE + patient DOB
+#                              in one SELECT (concurrent bookings of
+#                              a slot serialise here — no double-booking)
+#    2. conflict check, score and wait estimate in memory
+#    3. insert_booking         one INSERT … CTE: appointment, queue
+#                              entry, priority score, wait estimate,
+#                              log and the slot's booked_count
+#    4. commit
+#  UUIDs are generated client-side, so no flush is needed to learn
+#  a parent key before inserting its children.
+#  The *_async twins issue the same statements on an AsyncSession.
+# ================================================================
+
+import uuid
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import bindparam, insert, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from mediflow_db.models import (
+    Appointment, AppointmentLog, Patient, PriorityScore, QueueEntry, TimeSlot, WaitTimeEstimate,
+)
+
+
+def _dob(patient_id: uuid.UUID):
+    return select(Patient.date_of_birth).where(Patient.patient_id == patient_id).scalar_subquery()
+
+
+def _locked_slot(slot_id: uuid.UUID, dob):
+    return select(TimeSlot, dob).where(TimeSlot.slot_id == slot_id).with_for_update(of=TimeSlot)
+
+
+def lock_slot_and_patient(db: Session, slot_id: Optional[uuid.UUID],
+                          patient_id: uuid.UUID) -> tuple[Optional[TimeSlot], Optional[date]]:
+    """
+    (slot locked FOR UPDATE or None, patient date_of_birth or None) in one round trip.
+    The DOB rides along as a scalar subquery so the lock covers time_slots only.
+    """
+    dob = _dob(patient_id)
+    if slot_id is None:
+        return None, db.execute(select(dob)).scalar()
+    row = db.execute(_locked_slot(slot_id, dob)).first()
+    if row is None:
+        return None, db.execute(select(dob)).scalar()
+    return row[0], row[1]
+
+
+async def lock_slot_and_patient_async(db: AsyncSession, slot_id: Optional[uuid.UUID],
+                                      patient_id: uuid.UUID) -> tuple[Optional[TimeSlot], Optional[date]]:
+    dob = _dob(patient_id)
+    if slot_id is None:
+        return None, (await db.execute(select(dob))).scalar()
+    row = (await db.execute(_locked_slot(slot_id, dob))).first()
+    if row is None:
+        return None, (await db.execute(select(dob))).scalar()
+    return row[0], row[1]
+
+
+# (column names per table, with slot update?) → compiled-once statement
+_statements: dict[tuple, object] = {}
+
+_TABLES = (
+    ("appt",     Appointment.__table__),
+    ("entry",    QueueEntry.__table__),
+    ("score",    PriorityScore.__table__),
+    ("estimate", WaitTimeEstimate.__table__),
+    ("log",      AppointmentLog.__table__),
+)
+
+
+def _booking_statement(columns: tuple, with_slot: bool):
+    """
+    The WITH … statement for one column layout, built once and reused —
+    rebuilding it per booking (values(**row) coercion) cost more than the
+    database round trip. Values are bind parameters named <cte>_<column>.
+    """
+    key = (columns, with_slot)
+    stmt = _statements.get(key)
+    if stmt is None:
+        ctes = [
+            insert(table).values({c: bindparam(f"{name}_{c}", type_=table.c[c].type) for c in cols})
+            .returning(*table.primary_key.columns).cte(name)
+            for (name, table), cols in zip(_TABLES, columns)
+        ]
+        if with_slot:
+            slots = TimeSlot.__table__
+            ctes.append(
+                update(slots).where(slots.c.slot_id == bindparam("slot_slot_id", type_=slots.c.slot_id.type))
+                .values(booked_count=bindparam("slot_booked_count"), is_available=bindparam("slot_is_available"))
+                .returning(slots.c.slot_id).cte("slot")
+            )
+        stmt = _statements[key] = select(literal_column("1")).add_cte(*ctes)
+    return stmt
+
+
+def _booking(appointment: dict, queue_entry: dict, score: dict, estimate: dict, log: dict,
+             slot: Optional[dict]) -> tuple:
+    rows   = (appointment, queue_entry, score, estimate, log)
+    params = {f"{name}_{c}": v for (name, _), row in zip(_TABLES, rows) for c, v in row.items()}
+    if slot is not None:
+        params.update({f"slot_{c}": v for c, v in slot.items()})
+    return _booking_statement(tuple(tuple(row) for row in rows), slot is not None), params
+
+
+def insert_booking(db: Session, appointment: dict, queue_entry: dict, score: dict,
+                   estimate: dict, log: dict, slot: Optional[dict] = None) -> None:
+    """
+    Write every row of one booking as a single data-modifying CTE statement.
+    Each dict carries its client-generated primary key; `slot`, if given,
+    is {"slot_id", "booked_count", "is_available"} for the locked slot.
+    Foreign keys are checked at the end of the statement, so children may
+    sit beside their parent in the same WITH. Inserts inside a CTE skip
+    Python-side column defaults — pass every column that has one.
+    """
+    db.execute(*_booking(appointment, queue_entry, score, estimate, log, slot))
+
+
+async def insert_booking_async(db: AsyncSession, appointment: dict, queue_entry: dict, score: dict,
+                               estimate: dict, log: dict, slot: Optional[dict] = None) -> None:
+    await db.execute(*_booking(appointment, queue_entry, score, estimate, log, slot))
@@ -0,0 +1,87 @@
+# ================================================================
+#  branch_index.py — Per-worker branch geometry, kept in step
+#  The k-d tree and the road graph live in each worker process and
+#  are built from the branch table at startup. Creating or
+#  deactivating a branch is logged, with its coordinates, in the
+#  load balancer — which sits in the (possibly shared) state
+#  backend — so every worker applies just those inserts and removals
+#  before its next geometry query. Only a worker that has fallen
+#  further behind than the log reaches rebuilds from the DB.
+# ================================================================
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from mediflow_db.config import SessionLocal
+from mediflow_db.models import Branch
+from algorithms.kdtree import BranchPoint, get_kdtree, rebuild_kdtree, sync_availability
+from algorithms.branch_graph import get_branch_graph, rebuild_branch_graph
+from algorithms.load_balancer import get_load_balancer
+
+_built_version = -1   # membership version this worker's tree and graph reflect
+
+
+def rebuild_branch_index(db: Session, precompute: bool = False) -> int:
+    """
+    Rebuild this worker's k-d tree and branch graph from the active
+    branches. The version is read before the query, so a change that
+    lands in between is applied again from the log. Returns the branch count.
+    """
+    global _built_version
+    version  = get_load_balancer().membership_version()
+    branches = (db.query(Branch.branch_id, Branch.latitude, Branch.longitude)
+                .filter(Branch.is_active == True).all())
+    rebuild_kdtree([{
+        "branch_id": str(b.branch_id),
+        "latitude":  b.latitude  or 0.0,
+        "longitude": b.longitude or 0.0,
+        "is_active": True,
+    } for b in branches])
+    rebuild_branch_graph([{
+        "branch_id": str(b.branch_id), "latitude": b.latitude, "longitude": b.longitude,
+    } for b in branches], precompute=precompute)
+    _built_version = version
+    sync_availability()
+    return len(branches)
+
+
+def apply_branch_changes(changes: list) -> int:
+    """
+    Apply logged (version, op, branch_id, lat, lng) entries in order to
+    this worker's tree and graph. Re-applying an entry is harmless: an
+    insert replaces the same id, a remove of an absent id does nothing.
+    """
+    global _built_version
+    kdtree, graph = get_kdtree(), get_branch_graph()
+    for version, op, branch_id, lat, lng in changes:
+        if op == "add":
+            if lat and lng:   # as rebuild_kdtree / rebuild_branch_graph: no coordinates, no geometry
+                kdtree.insert(BranchPoint(branch_id=branch_id, lat=lat, lng=lng))
+                graph.add_branch(branch_id, lat, lng)
+        else:
+            kdtree.remove(branch_id)
+            graph.remove_branch(branch_id)
+        _built_version = version
+    return len(changes)
+
+
+def sync_branch_index(db: Optional[Session] = None) -> bool:
+    """
+    Catch up with branches created or deactivated by any worker since the
+    last sync — incrementally from the log, by a rebuild only if the log
+    has moved past this worker's version. Returns whether anything changed.
+    """
+    _, changes = get_load_balancer().membership_changes(_built_version)
+    if changes:
+        apply_branch_changes(changes)
+        sync_availability()   # new points start available until the overload state is applied
+        return True
+    if changes is not None:
+        return False
+    if db is not None:
+        rebuild_branch_index(db)
+    else:
+        with SessionLocal() as own:
+            rebuild_branch_index(own)
+    return True
@@ -0,0 +1,410 @@
+# ================================================================
+#  bulk_import.py — Streaming appointment import (CSV / NDJSON)
+#  Rows are read lazily and handled CHUNK_SIZE at a time, so memory
+#  stays flat however large the file. Per chunk:
+#    1. validate      AppointmentImportRow per row; a bad row is
+#                     reported with its line number, never fatal
+#    2. references    patients / doctors / branches — one IN query
+#                     per table for ids not seen in earlier chunks
+#    3. slots         explicit slot_id: exists, same doctor/branch,
+#                     capacity left, no overlap in the interval tree;
+#                     no slot_id: the doctor's slot covering
+#                     scheduled_time (tree lookup) if it has room.
+#                     Candidate slots are locked FOR UPDATE
+#    4. load          COPY (psycopg2) or executemany: appointments,
+#                     queue entries + scores + wait estimates for
+#                     scheduled rows, appointment logs; slot counts
+#                     in one UPDATE … FROM unnest
+#    5. commit, then queues and trees in memory
+#  At the end each touched queue is re-ranked once (queue_waits.py)
+#  and unslotted rows are offered to the slot matchers in one pass.
+# ================================================================
+
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from mediflow_db.models import (
+    Appointment, AppointmentImportRow, AppointmentLog, Branch, Doctor, Patient, PriorityScore,
+    QueueEntry, TimeSlot, WaitTimeEstimate, AppointmentStatusEnum, QueueStatusEnum,
+)
+from algorithms.interval_tree import get_tree, Interval
+from algorithms.priority_queue import get_queue, compute_score
+from algorithms.bipartite_matching import get_matcher, slot_group, evict_past_groups
+from queue_waits import refresh_queue_waits
+from warm_start import load_queues, _age
+
+CHUNK_SIZE          = 5000
+MAX_REPORTED_ERRORS = 1000   # per-row errors kept in the report; the count is always exact
+FORMATS             = ("csv", "ndjson")
+
+# Statuses that hold a place in a slot (cancelled / no-show rows keep their slot_id only)
+_HOLDS_SLOT = {AppointmentStatusEnum.scheduled, AppointmentStatusEnum.in_progress,
+               AppointmentStatusEnum.completed}
+
+Progress = Callable[[dict], None]
+
+_SLOT_COUNTS_SQL = text("""
+    UPDATE scheduling.time_slots AS s
+       SET booked_count = v.booked,
+           is_available = v.booked < s.capacity
+      FROM unnest(CAST(:ids AS uuid[]), CAST(:booked AS int[])) AS v (slot_id, booked)
+     WHERE s.slot_id = v.slot_id
+""")
+
+# Free slots of many (doctor, day) groups — a join, not a row-by-row IN list
+_FREE_SLOTS_SQL = text("""
+    SELECT s.slot_id, s.doctor_id, s.branch_id, s.date
+      FROM scheduling.time_slots AS s
+      JOIN unnest(CAST(:doctors AS uuid[]), CAST(:days AS date[])) AS g (doctor_id, day)
+        ON s.doctor_id = g.doctor_id AND s.date = g.day
+     WHERE s.is_available
+""")
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """'ndjson' for .ndjson / .jsonl / .json, otherwise 'csv'."""
+    name = (filename or "").lower()
+    return "ndjson" if name.endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+
+def read_rows(stream: Iterable[str], fmt: str) -> Iterator[tuple[int, Optional[dict], Optional[str]]]:
+    """
+    (line number, raw row, parse error) for every record of a text stream.
+    CSV needs a header row; NDJSON skips blank lines. Lazy — O(1) memory.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for raw in reader:
+            yield reader.line_num, raw, None
+    elif fmt == "ndjson":
+        for line, text_line in enumerate(stream, start=1):
+            if not text_line.strip():
+                continue
+            try:
+                raw = json.loads(text_line)
+            except ValueError as e:
+                yield line, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(raw, dict):
+                yield line, raw, None
+            else:
+                yield line, None, "Expected a JSON object"
+    else:
+        raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+
+def _validation_message(e: ValidationError) -> str:
+    err = e.errors()[0]
+    loc = ".".join(str(p) for p in err["loc"])
+    return f"{loc}: {err['msg']}" if loc else err["msg"]
+
+
+def _copy_rows(db: Session, table, columns: tuple, rows: list[tuple]) -> None:
+    """COPY … FROM STDIN on psycopg2, executemany INSERT elsewhere."""
+    if not rows:
+        return
+    cursor = db.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        cursor.close()
+        db.execute(insert(table), [dict(zip(columns, r)) for r in rows])
+        return
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)          # None → unquoted empty field → NULL
+    buf.seek(0)
+    try:
+        cursor.copy_expert(
+            f"COPY {table.schema}.{table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
+def _set_slot_counts(db: Session, counts: dict) -> None:
+    if counts:
+        db.execute(_SLOT_COUNTS_SQL, {"ids": [str(s) for s in counts], "booked": list(counts.values())})
+
+
+class _SlotCounts(dict):
+    """slot_id → new booked_count, remembering each slot's capacity and branch."""
+
+    def __init__(self):
+        super().__init__()
+        self.capacity: dict = {}
+        self.branch:   dict = {}
+
+
+APPT_COLUMNS  = ("appointment_id", "patient_id", "doctor_id", "branch_id", "slot_id", "urgency_level",
+                 "appointment_type", "status", "booked_at", "scheduled_time", "actual_start_time",
+                 "actual_end_time", "notes")
+ENTRY_COLUMNS = ("queue_id", "appointment_id", "branch_id", "doctor_id", "position", "entered_queue_at",
+                 "estimated_wait_mins", "is_emergency", "status")
+SCORE_COLUMNS = ("score_id", "queue_id", "urgency_weight", "wait_weight", "age_weight", "type_weight",
+                 "raw_urgency_score", "raw_wait_score", "raw_age_score", "raw_type_score",
+                 "final_score", "computed_at")
+EST_COLUMNS   = ("estimate_id", "queue_id", "estimated_wait_mins", "queue_length", "service_rate",
+                 "calculated_at")
+LOG_COLUMNS   = ("log_id", "appointment_id", "patient_id", "doctor_id", "branch_id", "urgency_level",
+                 "appointment_type", "status", "scheduled_time", "actual_start_time", "actual_end_time",
+                 "consult_duration_mins", "logged_at")
+
+
+class _Import:
+    """State carried across chunks: id caches, queue positions, the report."""
+
+    def __init__(self, db: Session, dry_run: bool):
+        self.db       = db
+        self.dry_run  = dry_run
+        self.known    = {Patient: {}, Doctor: set(), Branch: set()}   # patients map to date_of_birth
+        self.missing  = {Patient: set(), Doctor: set(), Branch: set()}
+        self.position: dict[tuple, int] = {}                          # (doctor, branch) → next position
+        self.walk_ins: list[tuple] = []                               # offered to matchers at the end
+        self.report   = {"rows": 0, "imported": 0, "queued": 0, "slotted": 0, "failed": 0,
+                         "errors": [], "dry_run": dry_run}
+
+    # ---------------------------------------------------------- errors
+    def fail(self, line: int, message: str) -> None:
+        self.report["failed"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": line, "error": message})
+
+    # ---------------------------------------------------------- 1. validate
+    def validate(self, chunk: list) -> list[tuple[int, AppointmentImportRow, tuple]]:
+        valid = []
+        for line, raw, error in chunk:
+            if error:
+                self.fail(line, error); continue
+            clean = {k: v for k, v in raw.items() if k is not None and v not in ("", None)}
+            try:
+                row = AppointmentImportRow.model_validate(clean)
+                ids = (uuid.UUID(row.patient_id), uuid.UUID(row.doctor_id), uuid.UUID(row.branch_id),
+                       uuid.UUID(row.slot_id) if row.slot_id else None)
+            except ValidationError as e:
+                self.fail(line, _validation_message(e)); continue
+            except ValueError:
+                self.fail(line, "Invalid UUID"); continue
+            valid.append((line, row, ids))
+        return valid
+
+    # ---------------------------------------------------------- 2. references
+    def check_references(self, valid: list) -> list:
+        wanted = {Patient: set(), Doctor: set(), Branch: set()}
+        for _, _, (p, d, b, _) in valid:
+            wanted[Patient].add(p); wanted[Doctor].add(d); wanted[Branch].add(b)
+        for model, ids in wanted.items():
+            known  = self.known[model]
+            unseen = {k for k in ids - self.missing[model] if k not in known}
+            if not unseen:
+                continue
+            pk = model.__table__.primary_key.columns[0]
+            if model is Patient:
+                found = dict(self.db.execute(
+                    select(Patient.patient_id, Patient.date_of_birth).where(pk.in_(unseen))).all())
+            else:
+                found = set(self.db.execute(select(pk).where(pk.in_(unseen))).scalars())
+            known.update(found)
+            self.missing[model].update(k for k in unseen if k not in found)
+        out = []
+        for line, row, ids in valid:
+            for model, key, label in ((Patient, ids[0], "Patient"), (Doctor, ids[1], "Doctor"),
+                                      (Branch, ids[2], "Branch")):
+                if key in self.missing[model]:
+                    self.fail(line, f"{label} not found: {key}"); break
+            else:
+                out.append((line, row, ids))
+        return out
+
+    # ---------------------------------------------------------- 3. slots
+    def resolve_slots(self, valid: list) -> tuple[list, _SlotCounts, list[Interval]]:
+        """(line, row, ids, slot_id or None) per accepted row, new slot counts, intervals to add."""
+        wanted: dict[int, uuid.UUID] = {}        # row index → candidate slot
+        for i, (_, row, (_, d, b, s)) in enumerate(valid):
+            if s is not None:
+                wanted[i] = s
+            elif row.status in _HOLDS_SLOT:
+                t = row.scheduled_time
+                for iv in get_tree(str(d)).overlapping(t, t + timedelta(microseconds=1)):
+                    if iv.doctor_id == str(d) and iv.branch_id == str(b):
+                        wanted[i] = uuid.UUID(str(iv.slot_id)); break
+        slots = {}
+        if wanted:
+            stmt = (select(TimeSlot.slot_id, TimeSlot.doctor_id, TimeSlot.branch_id, TimeSlot.date,
+                           TimeSlot.start_time, TimeSlot.end_time, TimeSlot.capacity, TimeSlot.booked_count)
+                    .where(TimeSlot.slot_id.in_(set(wanted.values()))).with_for_update())
+            slots = {r.slot_id: r for r in self.db.execute(stmt)}
+
+        counts, intervals, conflicted, out = _SlotCounts(), [], {}, []
+        for i, (line, row, ids) in enumerate(valid):
+            _, d, b, explicit = ids
+            s = wanted.get(i)
+            slot = slots.get(s) if s else None
+            if explicit is not None:
+                if slot is None:
+                    self.fail(line, f"Slot not found: {explicit}"); continue
+                if slot.doctor_id != d or slot.branch_id != b:
+                    self.fail(line, "Slot belongs to another doctor or branch"); continue
+            if slot is None or row.status not in _HOLDS_SLOT:
+                out.append((line, row, ids, explicit)); continue
+
+            booked = counts.get(s, slot.booked_count)
+            if booked >= slot.capacity:
+                if explicit is not None:
+                    self.fail(line, "Slot not available"); continue
+                out.append((line, row, ids, None)); continue     # covering slot is full → walk-in
+            start = datetime.combine(slot.date, slot.start_time)
+            end   = datetime.combine(slot.date, slot.end_time)
+            if s not in conflicted:
+                tree = get_tree(str(d))
+                conflicted[s] = tree.has_conflict(str(d), start, end, exclude_slot_id=str(s))
+                if not tree.contains(str(s)):
+                    intervals.append(Interval(start=start, end=end, slot_id=str(s),
+                                              doctor_id=str(d), branch_id=str(b)))
+            if conflicted[s]:
+                self.fail(line, f"Slot conflicts with slot {conflicted[s].slot_id}"); continue
+            counts[s] = booked + 1
+            counts.capacity[s] = slot.capacity
+            counts.branch[s]   = b
+            out.append((line, row, ids, s))
+        return out, counts, intervals
+
+    # ---------------------------------------------------------- 4. load
+    def load(self, accepted: list, counts: _SlotCounts) -> tuple[list, list]:
+        """
+        Write the chunk; (queue rows for warm_start.load_queues, unslotted walk-ins).
+        Rows are built as text — ids as strings, enums as member names (what
+        the enum columns store) — so COPY writes them without conversion.
+        """
+        now   = datetime.utcnow()
+        today = now.date()
+        waiting = QueueStatusEnum.waiting.name
+        appts, entries, scores, estimates, logs, queued, walk_ins = [], [], [], [], [], [], []
+        for _, row, (p, d, b, _), s in accepted:
+            a_id = str(uuid.uuid4())
+            p_s, d_s, b_s = str(p), str(d), str(b)
+            urgency, appt_type, status = row.urgency_level.name, row.appointment_type.name, row.status.name
+            booked_at = row.booked_at or now
+            appts.append((a_id, p_s, d_s, b_s, s and str(s), urgency, appt_type, status, booked_at,
+                          row.scheduled_time, row.actual_start_time, row.actual_end_time, row.notes))
+            duration = None
+            if row.actual_start_time and row.actual_end_time:
+                duration = (row.actual_end_time - row.actual_start_time).total_seconds() / 60
+            logs.append((str(uuid.uuid4()), a_id, p_s, d_s, b_s, urgency, appt_type, status,
+                         row.scheduled_time, row.actual_start_time, row.actual_end_time, duration, now))
+            if s is not None:
+                self.report["slotted"] += 1
+            if row.status != AppointmentStatusEnum.scheduled:
+                continue
+
+            dob   = self.known[Patient].get(p)
+            sc    = compute_score(row.urgency_level.value, row.appointment_type.value, booked_at, _age(dob, today))
+            key   = (d_s, b_s)
+            pos   = self.position.get(key) or get_queue(d_s, b_s).size() + 1
+            self.position[key] = pos + 1
+            q_id  = str(uuid.uuid4())
+            entries.append((q_id, a_id, b_s, d_s, pos, booked_at, None, False, waiting))
+            scores.append((str(uuid.uuid4()), q_id, 0.50, 0.30, 0.10, 0.10, sc["raw_urgency_score"],
+                           sc["raw_wait_score"], sc["raw_age_score"], sc["raw_type_score"],
+                           sc["final_score"], now))
+            estimates.append((str(uuid.uuid4()), q_id, None, None, None, now))
+            queued.append((a_id, p_s, d_s, b_s, row.urgency_level, row.appointment_type, booked_at, False, dob))
+            if s is None:
+                walk_ins.append((a_id, d_s, b_s, row.scheduled_time.date()))
+
+        if not self.dry_run:
+            for table, columns, rows in ((Appointment.__table__, APPT_COLUMNS, appts),
+                                         (QueueEntry.__table__, ENTRY_COLUMNS, entries),
+                                         (PriorityScore.__table__, SCORE_COLUMNS, scores),
+                                         (WaitTimeEstimate.__table__, EST_COLUMNS, estimates),
+                                         (AppointmentLog.__table__, LOG_COLUMNS, logs)):
+                _copy_rows(self.db, table, columns, rows)
+            _set_slot_counts(self.db, counts)
+        self.report["imported"] += len(appts)
+        self.report["queued"]   += len(entries)
+        return queued, walk_ins
+
+    # ---------------------------------------------------------- 5. memory
+    def apply(self, queued: list, walk_ins: list, counts: _SlotCounts, intervals: list) -> None:
+        """Mirror a committed chunk into the in-memory structures, as booking does."""
+        per_doctor: dict[str, list] = {}
+        for iv in intervals:
+            per_doctor.setdefault(iv.doctor_id, []).append(iv)
+        for doctor_id, ivs in per_doctor.items():
+            get_tree(doctor_id).insert_many(ivs)
+        for s, booked in counts.items():
+            if booked >= counts.capacity[s]:
+                get_matcher(str(counts.branch[s])).remove_slot(str(s))
+        load_queues(queued)
+        self.walk_ins.extend(walk_ins)
+
+    def offer_slots(self) -> None:
+        """
+        Unslotted scheduled rows join their branch matcher; groups the
+        matcher hasn't seen load their free slots in one query for the
+        whole import, after those matchers evict their past days.
+        """
+        new_groups: dict[tuple, str] = {}        # slot_group → branch
+        for _, d, b, day in self.walk_ins:
+            group = slot_group(d, day)
+            if not get_matcher(str(b)).has_group(group):
+                new_groups[group] = str(b)
+        if new_groups:
+            today = datetime.utcnow().date()
+            for b in set(new_groups.values()):
+                evict_past_groups(get_matcher(b), today)
+            free = self.db.execute(_FREE_SLOTS_SQL, {"doctors": [d for d, _ in new_groups],
+                                                     "days":    [day for _, day in new_groups]})
+            for s, d, b, day in free:
+                group = slot_group(d, day)
+                if new_groups.get(group) == str(b):
+                    get_matcher(str(b)).add_slot(str(s), group=group)
+        for a_id, d, b, day in self.walk_ins:
+            get_matcher(str(b)).add_patient(str(a_id), group=slot_group(d, day))
+
+
+def import_appointments(db: Session, records: Iterable[tuple], chunk_size: int = CHUNK_SIZE,
+                        dry_run: bool = False, progress: Optional[Progress] = None) -> dict:
+    """
+    Import read_rows() output. Each chunk commits on its own, so a failure
+    part-way keeps earlier chunks; `dry_run` validates and resolves slots
+    but writes nothing. Returns the report: rows, imported, queued, slotted,
+    failed, errors (first MAX_REPORTED_ERRORS as {line, error}), secs.
+    """
+    run = _Import(db, dry_run)
+    t0  = time.perf_counter()
+
+    def flush(chunk: list) -> None:
+        run.report["rows"] += len(chunk)
+        valid = run.check_references(run.validate(chunk))
+        accepted, counts, intervals = run.resolve_slots(valid)
+        queued, walk_ins = run.load(accepted, counts)
+        if dry_run:
+            db.rollback()              # releases the slot locks
+        else:
+            db.commit()
+            run.apply(queued, walk_ins, counts, intervals)
+        if progress:
+            progress({**run.report, "secs": round(time.perf_counter() - t0, 2)})
+
+    chunk: list = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            flush(chunk); chunk = []
+    if chunk:
+        flush(chunk)
+
+    if not dry_run and run.position:
+        for doctor_id, branch_id in run.position:
+            refresh_queue_waits(db, doctor_id, branch_id)
+        db.commit()
+        run.offer_slots()
+    run.report["errors"].sort(key=lambda e: e["line"])
+    run.report["secs"] = round(time.perf_counter() - t0, 2)
+    return run.report
@@ -0,0 +1,162 @@
+# ================================================================
+#  forecast_cache.py — Persisted Holt-Winters state + forecast cache
+#  ForecastState keeps each (branch, department) fit and the last
+#  PeakHourStat folded into it (the watermark). Per request:
+#    checked < WATERMARK_TTL_SECS ago → cached response, no DB
+#    watermark unchanged              → cached response
+#    new stats since the watermark    → fold only those in
+#    no stored state                  → one full fit
+#  A state fitted with other smoothing parameters than the current
+#  ForecastParams row counts as missing.
+# ================================================================
+
+import time
+import uuid
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import and_, or_, false
+from sqlalchemy.orm import Session
+
+from mediflow_db.models import Department, ForecastParams, ForecastState, PeakHourStat
+from algorithms.peak_prediction import get_forecaster, parameters_for, set_parameter_table
+
+MIN_HISTORY        = 4      # stats needed before a first fit
+WATERMARK_TTL_SECS = 10.0   # stats are hourly; dashboards polling faster skip the DB entirely
+FORECAST_STEPS     = 24
+PEAK_TOP_N         = 3
+
+Watermark = tuple[date, Optional[int]]
+
+# (branch_id, department_id) → [(watermark, params), checked_at (monotonic), response]
+_cache: dict[tuple[str, str], list] = {}
+
+
+def invalidate(branch_id: Optional[str] = None) -> None:
+    """Drop cached responses for one branch, or all of them."""
+    if branch_id is None:
+        _cache.clear()
+        return
+    for key in [k for k in _cache if k[0] == str(branch_id)]:
+        del _cache[key]
+
+
+def latest_watermark(db: Session, branch_id: uuid.UUID) -> Optional[Watermark]:
+    row = (db.query(PeakHourStat.recorded_on, PeakHourStat.hour_of_day)
+           .filter(PeakHourStat.branch_id == branch_id)
+           .order_by(PeakHourStat.recorded_on.desc(), PeakHourStat.hour_of_day.desc().nullslast())
+           .first())
+    return (row[0], row[1]) if row else None
+
+
+def _stats_after(db: Session, branch_id: uuid.UUID, mark: Optional[Watermark]) -> list[tuple]:
+    q = db.query(PeakHourStat.avg_appointments, PeakHourStat.recorded_on, PeakHourStat.hour_of_day) \
+          .filter(PeakHourStat.branch_id == branch_id)
+    if mark is not None:
+        day, hour = mark
+        newer_hour = PeakHourStat.hour_of_day > hour if hour is not None else false()
+        q = q.filter(or_(PeakHourStat.recorded_on > day,
+                         and_(PeakHourStat.recorded_on == day, newer_hour)))
+    return q.order_by(PeakHourStat.recorded_on, PeakHourStat.hour_of_day).all()
+
+
+def load_histories(db: Session, min_points: int = MIN_HISTORY) -> tuple[dict, dict]:
+    """
+    Every active department's series in one ordered scan. Peak-hour stats
+    are per branch, so departments of a branch share its list.
+    Returns ({(branch_id, department_id): [values]}, {branch_id: watermark}).
+    """
+    rows = (db.query(PeakHourStat.branch_id, PeakHourStat.avg_appointments,
+                     PeakHourStat.recorded_on, PeakHourStat.hour_of_day)
+            .filter(PeakHourStat.branch_id.isnot(None))
+            .order_by(PeakHourStat.branch_id, PeakHourStat.recorded_on, PeakHourStat.hour_of_day)
+            .yield_per(5000))
+    by_branch: dict[str, list[float]] = {}
+    marks: dict[str, Watermark] = {}
+    for b_id, avg, day, hour in rows:
+        by_branch.setdefault(str(b_id), []).append(avg or 0.0)
+        marks[str(b_id)] = (day, hour)
+    departments = (db.query(Department.branch_id, Department.department_id)
+                   .filter(Department.is_active == True).all())
+    histories = {(str(b), str(d)): by_branch[str(b)] for b, d in departments
+                 if len(by_branch.get(str(b), ())) >= min_points}
+    return histories, marks
+
+
+def load_parameters(db: Session) -> int:
+    """Install the ForecastParams table for get_forecaster. Returns rows loaded."""
+    rows = db.query(ForecastParams).all()
+    set_parameter_table({(r.branch_id, r.department_id): (r.alpha, r.beta, r.gamma) for r in rows})
+    return len(rows)
+
+
+def save_parameters(db: Session, tuned: dict, data_points: dict) -> None:
+    """Upsert tune_parameters output keyed by (branch_id, department_id) strings (caller commits)."""
+    for (b, d), p in tuned.items():
+        db.merge(ForecastParams(branch_id=uuid.UUID(b), department_id=uuid.UUID(d),
+                                alpha=p["alpha"], beta=p["beta"], gamma=p["gamma"],
+                                mse=p["mse"], data_points=data_points.get((b, d))))
+
+
+def save_state(db: Session, branch_id: uuid.UUID, department_id: uuid.UUID,
+               state: dict, mark: Watermark) -> None:
+    """Upsert a fitted state (caller commits)."""
+    alpha, beta, gamma = parameters_for(branch_id, department_id)
+    db.merge(ForecastState(
+        branch_id=branch_id, department_id=department_id,
+        level=state["level"], trend=state["trend"], seasonal=state["seasonal"],
+        observations=state["observations"], last_recorded_on=mark[0], last_hour=mark[1],
+        alpha=alpha, beta=beta, gamma=gamma,
+    ))
+
+
+def get_forecast(db: Session, branch_id: uuid.UUID, department_id: uuid.UUID,
+                 refit: bool = False) -> Optional[dict]:
+    """Forecast + peak hours for one (branch, department); None if history is too short."""
+    key = (str(branch_id), str(department_id))
+    hit = _cache.get(key)
+    now = time.monotonic()
+    if hit and not refit and now - hit[1] < WATERMARK_TTL_SECS:
+        return hit[2]
+    mark = latest_watermark(db, branch_id)
+    if mark is None:
+        return None
+    params = parameters_for(branch_id, department_id)
+    if hit and not refit and hit[0] == (mark, params):
+        hit[1] = now
+        return hit[2]
+
+    # Row lock: concurrent workers fold the same new stats once
+    stored = (db.query(ForecastState)
+              .filter(ForecastState.branch_id == branch_id, ForecastState.department_id == department_id)
+              .with_for_update().first())
+    if stored is not None and (stored.alpha, stored.beta, stored.gamma) != params:
+        load_parameters(db)   # another worker may have loaded a newer tuning run
+        params = parameters_for(branch_id, department_id)
+    hw = get_forecaster(*key)
+    if stored is not None and not refit and (stored.alpha, stored.beta, stored.gamma) == params:
+        new = _stats_after(db, branch_id, (stored.last_recorded_on, stored.last_hour))
+        hw.load_state(stored.level, stored.trend, stored.seasonal, stored.observations)
+        if new:
+            hw.update([r[0] or 0.0 for r in new])
+            mark = (new[-1][1], new[-1][2])
+    else:
+        rows = _stats_after(db, branch_id, None)
+        if len(rows) < MIN_HISTORY:
+            db.rollback()
+            return None
+        hw.fit([r[0] or 0.0 for r in rows])
+        mark = (rows[-1][1], rows[-1][2])
+    state = hw.get_state()
+    save_state(db, branch_id, department_id, state, mark)
+    db.commit()
+
+    response = {
+        "branch_id": key[0], "department_id": key[1],
+        "forecast_24h": hw.forecast(FORECAST_STEPS),
+        "peak_hours":   hw.peak_hours(FORECAST_STEPS, top_n=PEAK_TOP_N),
+        "data_points":  state["observations"],
+        "as_of":        {"date": str(mark[0]), "hour": mark[1]},
+    }
+    _cache[key] = [(mark, params), now, response]
+    return response
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+import_appointments.py — Bulk appointment import from CSV or NDJSON.
+
+Streams the file through bulk_import.py: chunked validation, slot
+resolution against the interval trees, COPY into appointments, queue
+entries and appointment logs. Bad rows are skipped and listed by line.
+Columns / keys: patient_id, doctor_id, branch_id, urgency_level,
+appointment_type, scheduled_time, and optionally slot_id, status, notes,
+booked_at, actual_start_time, actual_end_time.
+
+With MEDIFLOW_STATE_BACKEND=socket the import updates the running
+servers' queues and trees directly; in-process servers pick the rows up
+at their next start.
+
+Usage:
+    python import_appointments.py appointments.csv
+    python import_appointments.py export.ndjson --chunk 10000
+    python import_appointments.py appointments.csv --dry-run --errors bad_rows.ndjson
+"""
+import argparse
+import json
+
+from mediflow_db.config import engine, SessionLocal, Base
+import mediflow_db.models  # noqa: F401 — registers all ORM classes with Base
+from algorithms.state_backend import get_backend
+from bulk_import import import_appointments, read_rows, detect_format, CHUNK_SIZE, FORMATS
+from warm_start import warm_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import appointments from CSV / NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format",  choices=FORMATS, default=None, help="Default: from the file extension")
+    parser.add_argument("--chunk",   type=int, default=CHUNK_SIZE,  help="Rows per validation / COPY batch")
+    parser.add_argument("--dry-run", action="store_true",           help="Validate only, write nothing")
+    parser.add_argument("--errors",  default=None,                  help="Write reported row errors here (NDJSON)")
+    args = parser.parse_args()
+    fmt = args.format or detect_format(args.path)
+
+    print(f"\n📥  Importing {args.path} ({fmt}{', dry run' if args.dry_run else ''})\n")
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        # Slot resolution reads the interval trees, queue positions the queues
+        if get_backend().claim_warm_start():
+            stats = warm_start(db)
+            print(f"  ✔ State warmed ({stats['time_slots']['rows']:,} slots, "
+                  f"{stats['queue_entries']['rows']:,} queue entries)")
+
+        def progress(r: dict) -> None:
+            rate = r["rows"] / r["secs"] if r["secs"] else 0.0
+            print(f"  … {r['rows']:,} rows   {r['imported']:,} imported   {r['failed']:,} failed   "
+                  f"{rate:,.0f} rows/s")
+
+        with open(args.path, newline="", encoding="utf-8-sig") as f:
+            report = import_appointments(db, read_rows(f, fmt), chunk_size=args.chunk,
+                                         dry_run=args.dry_run, progress=progress)
+    finally:
+        db.close()
+
+    print(f"\n  ✔ {report['imported']:,} of {report['rows']:,} rows {'valid' if args.dry_run else 'imported'} "
+          f"in {report['secs']}s — {report['queued']:,} queued, {report['slotted']:,} in slots")
+    if report["failed"]:
+        print(f"  ⚠️  {report['failed']:,} rows rejected")
+        for e in report["errors"][:10]:
+            print(f"    line {e['line']}: {e['error']}")
+        if args.errors:
+            with open(args.errors, "w") as out:
+                out.writelines(json.dumps(e) + "\n" for e in report["errors"])
+            print(f"  … first {len(report['errors']):,} written to {args.errors}")
+    if get_backend().name == "inprocess" and not args.dry_run:
+        print("  – Running servers pick these rows up at their next start")
+    print()
+
+
+if __name__ == "__main__":
+    main()
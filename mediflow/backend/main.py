@@ -6,16 +6,20 @@
 # before passlib initialises its CryptContext.
 import auth  # noqa: F401 — bcrypt patch applied here
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from sqlalchemy import text
 
-from mediflow_db.config import Base, engine, SessionLocal
+from mediflow_db.config import Base, engine, SessionLocal, DB_MODE, get_async_engine, dispose_async_engine, ensure_indexes
 import mediflow_db.models  # noqa: F401 — registers all ORM classes with Base
 
 from algorithms.load_balancer import get_load_balancer
-from algorithms.kdtree import rebuild_kdtree
+from algorithms.branch_graph import get_branch_graph
+from algorithms.state_backend import get_backend
+from warm_start import warm_start
+from branch_index import rebuild_branch_index
+import forecast_cache
 
 from routers.auth_router        import router as auth_router
 from routers.patient_router     import router as patient_router
@@ -58,18 +62,38 @@ async def lifespan(app: FastAPI):
     try:
         from mediflow_db.models import Branch, UserAuth, RoleEnum
         branches = db.query(Branch).filter(Branch.is_active == True).all()
-        lb = get_load_balancer()
-        for b in branches:
-            lb.register(str(b.branch_id), b.total_capacity)
-            lb.update_load(str(b.branch_id), int((b.current_load or 0) * b.total_capacity))
-
-        rebuild_kdtree([{
-            "branch_id": str(b.branch_id),
-            "latitude":  b.latitude  or 0.0,
-            "longitude": b.longitude or 0.0,
-            "is_active": b.is_active,
-        } for b in branches])
+
+        # Shared backends are seeded by the first worker only
+        backend = get_backend()
+        print(f"\n🧠  State backend: {backend.name}")
+        print(f"🔌  DB handlers: {DB_MODE}")
+        if DB_MODE == "async":
+            get_async_engine()
+        seed_shared = backend.claim_warm_start()
+
+        if seed_shared:   # one worker builds missing indexes, without blocking writes
+            created = ensure_indexes()
+            print(f"  ✔ Indexes ready ({created} created)" if created else "  ✔ Indexes ready")
+
+        if seed_shared:
+            lb = get_load_balancer()
+            for b in branches:
+                lb.register(str(b.branch_id), b.total_capacity, b.latitude, b.longitude)
+                lb.update_load(str(b.branch_id), int((b.current_load or 0) * b.total_capacity))
+
+        rebuild_branch_index(db, precompute=True)
         print(f"  ✔ Load balancer + K-d tree seeded ({len(branches)} branches)")
+        print(f"  ✔ Branch graph: {get_branch_graph().edge_count():,} edges, all-pairs distances cached")
+        tuned = forecast_cache.load_parameters(db)
+        print(f"  ✔ Forecast parameters loaded ({tuned} tuned series)")
+
+        if seed_shared:
+            print("\n♻️   Rehydrating queues, interval trees and wait estimators…")
+            stats = warm_start(db, progress=lambda stage, n: print(f"  … {n:,} {stage}"))
+            for stage, s in stats.items():
+                print(f"  ✔ {s['rows']:,} {stage.replace('_', ' ')} loaded in {s['secs']}s")
+        else:
+            print("  ✔ Shared state already warm — skipping rehydration")
 
         # ── Admin check: warn loudly if no admin account exists ──
         admin_exists = db.query(UserAuth).filter(UserAuth.role == RoleEnum.admin).first()
@@ -88,6 +112,7 @@ async def lifespan(app: FastAPI):
     print("\n✅  MediFlow ready → http://localhost:8000\n")
     yield
     print("🛑  MediFlow shutting down…")
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -105,15 +130,39 @@ app.add_middleware(
     allow_credentials = True,
     allow_methods     = ["*"],
     allow_headers     = ["*"],
+    expose_headers    = ["X-Next-Cursor"],   # keyset pagination (pagination.py)
 )
 
+def include_hot_router(sync_router: APIRouter, async_router: APIRouter) -> None:
+    """
+    Under MEDIFLOW_DB_MODE=async, serve a hot router's DB routes from its
+    async twin and only the rest (bulk / CPU-heavy / no-DB routes) from the
+    sync one; otherwise just the sync router.
+    """
+    if DB_MODE != "async":
+        app.include_router(sync_router)
+        return
+    served = {(r.path, m) for r in async_router.routes for m in r.methods}
+    rest = APIRouter()
+    rest.routes.extend(r for r in sync_router.routes if not {(r.path, m) for m in r.methods} & served)
+    app.include_router(async_router)
+    app.include_router(rest)
+
+
 app.include_router(auth_router)
 app.include_router(patient_router)
 app.include_router(doctor_router)
-app.include_router(appointment_router)
-app.include_router(queue_router)
-app.include_router(slot_router)
-app.include_router(branch_router)
+if DB_MODE == "async":
+    from routers.async_appointment_router import router as async_appointment_router
+    from routers.async_queue_router       import router as async_queue_router
+    from routers.async_slot_router        import router as async_slot_router
+    from routers.async_branch_router      import router as async_branch_router
+else:
+    async_appointment_router = async_queue_router = async_slot_router = async_branch_router = None
+include_hot_router(appointment_router, async_appointment_router)
+include_hot_router(queue_router,       async_queue_router)
+include_hot_router(slot_router,        async_slot_router)
+include_hot_router(branch_router,      async_branch_router)
 app.include_router(analytics_router)
 
 
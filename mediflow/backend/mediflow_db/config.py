@@ -2,7 +2,8 @@
 #  mediflow_db/config.py  — SINGLE SOURCE OF TRUTH for DB setup
 # ================================================================
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 import os
@@ -27,6 +28,41 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+_INDEX_STATE = text("""
+    SELECT n.nspname, c.relname, i.indisvalid
+      FROM pg_index i
+      JOIN pg_class c     ON c.oid = i.indexrelid
+      JOIN pg_namespace n ON n.oid = c.relnamespace
+""")
+
+
+def ensure_indexes() -> int:
+    """
+    Create any declared index the database lacks. create_all() only indexes
+    the tables it creates, so indexes added to the models later (query-plan
+    set, see benchmarks/check_query_plans.py) reach existing databases here.
+    Built CONCURRENTLY IF NOT EXISTS in autocommit, so writes keep flowing
+    and a rerun is harmless; an INVALID leftover of an interrupted build is
+    dropped and rebuilt. Call it from one process only (main.py: the worker
+    that wins claim_warm_start) — concurrent builds of one index still clash.
+    """
+    created = 0
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        state = {(schema, name): valid for schema, name, valid in conn.execute(_INDEX_STATE)}
+        for table in Base.metadata.sorted_tables:
+            schema = table.schema or "public"
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                valid = state.get((schema, index.name))
+                if valid:
+                    continue
+                if valid is False:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}"."{index.name}"'))
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+                conn.execute(text(ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)))
+                created += 1
+    return created
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -35,6 +71,58 @@ def get_db():
         db.close()
 
 
+# ── Async engine (asyncpg) ───────────────────────────────────────
+# "sync" (default) serves DB routes from Starlette's thread pool (~40
+# threads, psycopg2). "async" mounts routers/async_*_router.py in front
+# of the hot routers (main.py): real coroutines awaiting an asyncpg
+# pool, so concurrency is capped by the pool, not by threads. The sync
+# routers stay as they are, so the two can be A/B'd with one env var.
+DB_MODE = os.getenv("MEDIFLOW_DB_MODE", "sync")
+
+ASYNC_POOL_SIZE     = int(os.getenv("MEDIFLOW_ASYNC_POOL_SIZE", "20"))
+ASYNC_POOL_OVERFLOW = int(os.getenv("MEDIFLOW_ASYNC_POOL_OVERFLOW", "60"))
+
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "postgresql+psycopg2": "postgresql+asyncpg",
+                  "sqlite": "sqlite+aiosqlite"}
+
+_async_engine      = None
+_AsyncSessionLocal = None
+
+
+def async_db_url():
+    """ASYNC_DB_URL if set, else DB_URL with its driver swapped for the async one."""
+    url = make_url(os.getenv("ASYNC_DB_URL") or db_url)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def get_async_engine():
+    """Built on first use, so the sync path never needs asyncpg installed."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        _async_engine = create_async_engine(
+            async_db_url(),
+            pool_size=ASYNC_POOL_SIZE,
+            max_overflow=ASYNC_POOL_OVERFLOW,
+            pool_timeout=30,
+            pool_recycle=1800,
+            echo=False,
+        )
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False)
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
 def test_connection():
     try:
         with engine.connect() as conn:
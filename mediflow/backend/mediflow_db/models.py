@@ -11,7 +11,7 @@ from typing import Optional
 
 from sqlalchemy import (
     Column, String, Integer, Float, Boolean,
-    DateTime, Date, Time, Text, ForeignKey, Enum, JSON
+    DateTime, Date, Time, Text, ForeignKey, Enum, JSON, Index, text
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -199,7 +199,12 @@ class UserAuth(Base):
 
 class TimeSlot(Base):
     __tablename__  = "time_slots"
-    __table_args__ = {"schema": "scheduling"}
+    __table_args__ = (
+        Index("ix_time_slots_doctor_branch_date", "doctor_id", "branch_id", "date", "is_available"),  # available slots
+        Index("ix_time_slots_branch_date", "branch_id", "date"),          # auto-assign
+        Index("ix_time_slots_date", "date"),                              # warm start: future slots
+        {"schema": "scheduling"},
+    )
 
     slot_id      = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     doctor_id    = Column(UUID(as_uuid=True), ForeignKey("users.doctors.doctor_id"), nullable=False)
@@ -219,7 +224,19 @@ class TimeSlot(Base):
 
 class Appointment(Base):
     __tablename__  = "appointments"
-    __table_args__ = {"schema": "scheduling"}
+    __table_args__ = (
+        # keyset pagination order of GET /api/appointments (pagination.py), unfiltered and per filter
+        Index("ix_appointments_scheduled_time_id", "scheduled_time", "appointment_id"),
+        Index("ix_appointments_patient_time", "patient_id", "scheduled_time", "appointment_id"),
+        Index("ix_appointments_doctor_time", "doctor_id", "scheduled_time", "appointment_id"),
+        Index("ix_appointments_branch_time", "branch_id", "scheduled_time", "appointment_id"),
+        Index("ix_appointments_status", "status"),                        # dashboard counts
+        Index("ix_appointments_urgency", "urgency_level"),
+        # walk-ins waiting for a slot: auto-assign, slot matchers
+        Index("ix_appointments_unslotted", "branch_id", "scheduled_time",
+              postgresql_where=text("slot_id IS NULL AND status = 'scheduled'")),
+        {"schema": "scheduling"},
+    )
 
     appointment_id    = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     patient_id        = Column(UUID(as_uuid=True), ForeignKey("users.patients.patient_id"), nullable=False)
@@ -243,7 +260,11 @@ class Appointment(Base):
 
 class SlotBlock(Base):
     __tablename__  = "slot_blocks"
-    __table_args__ = {"schema": "scheduling"}
+    __table_args__ = (
+        Index("ix_slot_blocks_doctor_start", "doctor_id", "start_datetime"),   # free windows
+        Index("ix_slot_blocks_branch_start", "branch_id", "start_datetime"),
+        {"schema": "scheduling"},
+    )
 
     block_id       = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     doctor_id      = Column(UUID(as_uuid=True), ForeignKey("users.doctors.doctor_id"), nullable=True)
@@ -272,7 +293,13 @@ class Recurrence(Base):
 
 class QueueEntry(Base):
     __tablename__  = "queue_entries"
-    __table_args__ = {"schema": "queue"}
+    __table_args__ = (
+        Index("ix_queue_entries_appointment", "appointment_id"),
+        Index("ix_queue_entries_doctor_branch_status", "doctor_id", "branch_id", "status"),  # live queue
+        # waiting entries only — warm start, wait refresh
+        Index("ix_queue_entries_waiting", "doctor_id", "branch_id", postgresql_where=text("status = 'waiting'")),
+        {"schema": "queue"},
+    )
 
     queue_id            = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     appointment_id      = Column(UUID(as_uuid=True), ForeignKey("scheduling.appointments.appointment_id"), nullable=False)
@@ -292,7 +319,10 @@ class QueueEntry(Base):
 
 class PriorityScore(Base):
     __tablename__  = "priority_scores"
-    __table_args__ = {"schema": "queue"}
+    __table_args__ = (
+        Index("ix_priority_scores_queue", "queue_id"),
+        {"schema": "queue"},
+    )
 
     score_id          = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     queue_id          = Column(UUID(as_uuid=True), ForeignKey("queue.queue_entries.queue_id"), nullable=False)
@@ -325,7 +355,10 @@ class EmergencyOverride(Base):
 
 class WaitTimeEstimate(Base):
     __tablename__  = "wait_time_estimates"
-    __table_args__ = {"schema": "queue"}
+    __table_args__ = (
+        Index("ix_wait_time_estimates_queue", "queue_id"),
+        {"schema": "queue"},
+    )
 
     estimate_id         = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     queue_id            = Column(UUID(as_uuid=True), ForeignKey("queue.queue_entries.queue_id"), nullable=False)
@@ -343,7 +376,13 @@ class WaitTimeEstimate(Base):
 
 class AppointmentLog(Base):
     __tablename__  = "appointment_logs"
-    __table_args__ = {"schema": "analytics"}
+    __table_args__ = (
+        Index("ix_appointment_logs_branch_time", "branch_id", "scheduled_time"),   # appointment density
+        # recent completions — warm start of the wait estimators
+        Index("ix_appointment_logs_completions", "logged_at",
+              postgresql_where=text("consult_duration_mins IS NOT NULL")),
+        {"schema": "analytics"},
+    )
 
     log_id                = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     appointment_id        = Column(UUID(as_uuid=True), nullable=False)
@@ -363,7 +402,10 @@ class AppointmentLog(Base):
 
 class PeakHourStat(Base):
     __tablename__  = "peak_hour_stats"
-    __table_args__ = {"schema": "analytics"}
+    __table_args__ = (
+        Index("ix_peak_hour_stats_branch_day_hour", "branch_id", "recorded_on", "hour_of_day"),  # forecasts
+        {"schema": "analytics"},
+    )
 
     stat_id          = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     branch_id        = Column(UUID(as_uuid=True), ForeignKey("organization.branches.branch_id"), nullable=True)
@@ -375,9 +417,46 @@ class PeakHourStat(Base):
     recorded_on      = Column(Date, default=date.today)
 
 
+class ForecastState(Base):
+    """Fitted Holt-Winters state per (branch, department) and the last PeakHourStat folded in."""
+    __tablename__  = "forecast_states"
+    __table_args__ = {"schema": "analytics"}
+
+    branch_id        = Column(UUID(as_uuid=True), ForeignKey("organization.branches.branch_id"), primary_key=True)
+    department_id    = Column(UUID(as_uuid=True), ForeignKey("organization.departments.department_id"), primary_key=True)
+    level            = Column(Float, nullable=False)
+    trend            = Column(Float, nullable=False)
+    seasonal         = Column(JSON, nullable=False)
+    observations     = Column(Integer, nullable=False)   # series position; next seasonal index = observations % period
+    last_recorded_on = Column(Date, nullable=False)
+    last_hour        = Column(Integer, nullable=True)
+    alpha            = Column(Float, nullable=True)   # smoothing the state was fitted with
+    beta             = Column(Float, nullable=True)
+    gamma            = Column(Float, nullable=True)
+    updated_at       = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ForecastParams(Base):
+    """Tuned Holt-Winters smoothing per (branch, department) — read by get_forecaster."""
+    __tablename__  = "forecast_params"
+    __table_args__ = {"schema": "analytics"}
+
+    branch_id     = Column(UUID(as_uuid=True), ForeignKey("organization.branches.branch_id"), primary_key=True)
+    department_id = Column(UUID(as_uuid=True), ForeignKey("organization.departments.department_id"), primary_key=True)
+    alpha         = Column(Float, nullable=False)
+    beta          = Column(Float, nullable=False)
+    gamma         = Column(Float, nullable=False)
+    mse           = Column(Float, nullable=True)   # one-step-ahead error at tuning time
+    data_points   = Column(Integer, nullable=True)
+    tuned_at      = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class DoctorPerformance(Base):
     __tablename__  = "doctor_performance"
-    __table_args__ = {"schema": "analytics"}
+    __table_args__ = (
+        Index("ix_doctor_performance_doctor_date", "doctor_id", "date"),
+        {"schema": "analytics"},
+    )
 
     perf_id            = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     doctor_id          = Column(UUID(as_uuid=True), ForeignKey("users.doctors.doctor_id"), nullable=True)
@@ -392,7 +471,10 @@ class DoctorPerformance(Base):
 
 class BranchLoadStat(Base):
     __tablename__  = "branch_load_stats"
-    __table_args__ = {"schema": "analytics"}
+    __table_args__ = (
+        Index("ix_branch_load_stats_branch_time", "branch_id", "recorded_at"),
+        {"schema": "analytics"},
+    )
 
     load_id             = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     branch_id           = Column(UUID(as_uuid=True), ForeignKey("organization.branches.branch_id"), nullable=True)
@@ -405,7 +487,10 @@ class BranchLoadStat(Base):
 
 class WaitTimeTrend(Base):
     __tablename__  = "wait_time_trends"
-    __table_args__ = {"schema": "analytics"}
+    __table_args__ = (
+        Index("ix_wait_time_trends_department_date", "department_id", "date", "hour_of_day"),
+        {"schema": "analytics"},
+    )
 
     trend_id      = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     department_id = Column(UUID(as_uuid=True), ForeignKey("organization.departments.department_id"), nullable=True)
@@ -469,6 +554,10 @@ class BranchData(BaseModel):
     total_capacity: int = 100
     class Config: from_attributes = True
 
+class NearestBatchData(BaseModel):
+    points: list[tuple[float, float]]              # [(lat, lng), ...]
+    k: int = Field(3, ge=1, le=50)
+
 class BranchResponse(BaseModel):
     branch_id: str
     hospital_id: str
@@ -549,6 +638,12 @@ class AppointmentData(BaseModel):
     notes: Optional[str] = None
     class Config: from_attributes = True
 
+class AppointmentImportRow(AppointmentData):
+    status: AppointmentStatusEnum = AppointmentStatusEnum.scheduled
+    booked_at: Optional[datetime] = None          # default: import time
+    actual_start_time: Optional[datetime] = None
+    actual_end_time: Optional[datetime] = None
+
 class AppointmentResponse(BaseModel):
     appointment_id: str
     patient_id: str
@@ -573,6 +668,27 @@ class TimeSlotData(BaseModel):
     capacity: int = 1
     class Config: from_attributes = True
 
+class SlotScheduleData(BaseModel):
+    doctor_ids: list[str]
+    branch_id: str
+    start_date: date
+    weeks: int = Field(1, ge=1, le=52)
+    days_of_week: list[int] = [0, 1, 2, 3, 4]   # 0 = Monday
+    start_time: time
+    end_time: time
+    slot_duration_mins: int = Field(15, gt=0)
+    frequency: str = "weekly"                     # weekly | biweekly
+    capacity: int = 1
+    skip_conflicts: bool = False                  # False → 409 if any generated slot overlaps
+
+class AutoAssignData(BaseModel):
+    branch_id: str
+    date_from: date
+    date_to: date
+    doctor_ids: Optional[list[str]] = None        # restrict to these doctors
+    same_specialization: bool = False             # allow any doctor with the booked doctor's specialization
+    apply: bool = False                           # False → proposals only
+
 class TimeSlotResponse(BaseModel):
     slot_id: str
     doctor_id: str
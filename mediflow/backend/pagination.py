@@ -0,0 +1,95 @@
+# ================================================================
+#  pagination.py — Keyset (cursor) pagination for list endpoints
+#  OFFSET k reads and throws away k rows, so walking a table page by
+#  page costs O(n²) overall. A keyset page seeks past the last row
+#  the client saw instead:
+#    WHERE (k1, k2) > (:last_k1, :last_k2) ORDER BY k1, k2 LIMIT n
+#  — one index range scan per page, however deep. Keys end in the
+#  primary key, so the order is total and stable under inserts.
+#  Cursors are opaque (urlsafe base64 of the list name + last key);
+#  the next one goes out in the X-Next-Cursor header, absent on the
+#  last page. skip/limit keeps working as a compatibility mode.
+#  paginate_async pages a select() on an AsyncSession the same way.
+# ================================================================
+
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(kind: str, values: list) -> str:
+    raw = json.dumps([kind, [v.isoformat() if isinstance(v, (date, datetime)) else str(v) for v in values]],
+                     separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, kind: str, keys: tuple) -> list:
+    """Key values of a cursor issued for `kind`; 400 if it is malformed or from another list."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        token_kind, values = json.loads(raw)
+        if token_kind != kind or len(values) != len(keys):
+            raise ValueError(token_kind)
+        return [_parse(key, v) for key, v in zip(keys, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse(key, value: str):
+    python_type = key.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return python_type(value)
+
+
+def _page(query, keys: tuple, kind: str, limit: int, skip: int, cursor: Optional[str]):
+    """`query` (a Query or a select()) narrowed to one page plus the look-ahead row."""
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    query = query.order_by(*keys)
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=400, detail="Use either skip or cursor, not both")
+        after = decode_cursor(cursor, kind, keys)
+        query = query.filter(tuple_(*keys) > tuple_(*(literal(v, k.type) for k, v in zip(keys, after))))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def _trim(rows: list, keys: tuple, kind: str, response: Response, limit: int) -> list:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(kind, [getattr(rows[-1], k.key) for k in keys])
+    return rows
+
+
+def paginate(query: Query, keys: tuple, kind: str, response: Response, limit: int,
+             skip: int = 0, cursor: Optional[str] = None) -> list:
+    """
+    One page of `query` ordered by `keys` (columns, last one unique).
+    With `cursor`: the rows after it. Without: OFFSET `skip`, as before.
+    Either way X-Next-Cursor is set when more rows follow — one extra
+    row is fetched to tell, so the last page costs no second query.
+    """
+    rows = _page(query, keys, kind, limit, skip, cursor).all()
+    return _trim(rows, keys, kind, response, limit)
+
+
+async def paginate_async(db: AsyncSession, stmt: Select, keys: tuple, kind: str, response: Response,
+                         limit: int, skip: int = 0, cursor: Optional[str] = None) -> list:
+    rows = (await db.scalars(_page(stmt, keys, kind, limit, skip, cursor))).all()
+    return _trim(list(rows), keys, kind, response, limit)
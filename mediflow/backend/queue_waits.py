@@ -0,0 +1,88 @@
+# ================================================================
+#  queue_waits.py — Queue-wide wait-time refresh
+#  WaitTimeEstimate rows are written at booking; this keeps them
+#  current as the queue moves. One pass over the priority order:
+#    queue.ordered()        → appointment_ids, best first  O(n log n)
+#    estimator.estimate_queue → wait for every position     O(n)
+#    one UPDATE … FROM unnest(…) CTE → queue_entries.position /
+#    estimated_wait_mins and the matching wait_time_estimates rows
+#  Called on pop, completion and emergency override, inside the
+#  caller's transaction (caller commits); refresh_queue_waits_async
+#  is the same on an AsyncSession.
+# ================================================================
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from algorithms.priority_queue import get_queue
+from algorithms.wait_time import get_estimator
+
+# Postgres: arrays arrive as text[] / float8[] bind parameters and are
+# zipped back into rows by unnest, so n entries cost one round trip.
+_REFRESH_SQL = text("""
+    WITH ranked (appointment_id, position, wait) AS (
+        SELECT * FROM unnest(CAST(:ids AS uuid[]), CAST(:positions AS int[]), CAST(:waits AS float8[]))
+    ),
+    moved AS (
+        UPDATE queue.queue_entries AS q
+           SET position            = ranked.position,
+               estimated_wait_mins = CAST(round(ranked.wait) AS int)
+          FROM ranked
+         WHERE q.appointment_id = ranked.appointment_id
+           AND q.doctor_id      = :doctor_id
+           AND q.branch_id      = :branch_id
+           AND q.status         = 'waiting'
+        RETURNING q.queue_id, ranked.wait
+    )
+    UPDATE queue.wait_time_estimates AS w
+       SET estimated_wait_mins = moved.wait,
+           queue_length        = :queue_length,
+           service_rate        = :service_rate,
+           calculated_at       = :now
+      FROM moved
+     WHERE w.queue_id = moved.queue_id
+""")
+
+
+def _refresh_params(doctor_id, branch_id) -> Optional[dict]:
+    d_key, b_key = str(doctor_id), str(branch_id)
+    now   = datetime.utcnow()
+    order = get_queue(d_key, b_key).ordered(now)
+    if not order:
+        return None
+    est = get_estimator(d_key, b_key).estimate_queue(len(order))
+    return {
+        "ids":          [str(a) for a in order],
+        "positions":    list(range(1, len(order) + 1)),
+        "waits":        est["waits_mins"],
+        "doctor_id":    uuid.UUID(d_key),
+        "branch_id":    uuid.UUID(b_key),
+        "queue_length": len(order),
+        "service_rate": est["service_rate"],
+        "now":          now,
+    }
+
+
+def refresh_queue_waits(db: Session, doctor_id, branch_id) -> int:
+    """
+    Re-rank and re-estimate every waiting entry of one (doctor, branch) queue.
+    Returns the number of entries walked (0 if the queue is empty).
+    """
+    params = _refresh_params(doctor_id, branch_id)
+    if params is None:
+        return 0
+    db.execute(_REFRESH_SQL, params)
+    return params["queue_length"]
+
+
+async def refresh_queue_waits_async(db: AsyncSession, doctor_id, branch_id) -> int:
+    params = _refresh_params(doctor_id, branch_id)
+    if params is None:
+        return 0
+    await db.execute(_REFRESH_SQL, params)
+    return params["queue_length"]
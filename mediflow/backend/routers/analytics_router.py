@@ -4,15 +4,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
+import time
 import uuid
 
 from mediflow_db.config import get_db
 from mediflow_db.models import (
-    AppointmentLog, PeakHourStat, DoctorPerformance,
+    AppointmentLog, DoctorPerformance,
     BranchLoadStat, WaitTimeTrend, Appointment,
 )
 from auth import require_role
-from algorithms.peak_prediction import train_forecaster, get_forecaster
+from algorithms.peak_prediction import train_forecasters
+import forecast_cache
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 
@@ -34,21 +36,36 @@ def admin_summary(db: Session = Depends(get_db), _: dict = Depends(require_role(
 
 
 @router.get("/peak-forecast")
-def peak_forecast(branch_id: str, department_id: str, db: Session = Depends(get_db),
+def peak_forecast(branch_id: str, department_id: str, retrain: bool = False, db: Session = Depends(get_db),
                   _: dict = Depends(require_role("admin", "staff"))):
-    b_id = _try_uuid(branch_id)
-    stats = (db.query(PeakHourStat)
-             .filter(PeakHourStat.branch_id == b_id)
-             .order_by(PeakHourStat.recorded_on, PeakHourStat.hour_of_day)
-             .all()) if b_id else []
-    history = [s.avg_appointments or 0.0 for s in stats]
-    if len(history) < 4:
+    """Served from cache until new PeakHourStat rows arrive; those are folded into the stored fit."""
+    b_id, d_id = _try_uuid(branch_id), _try_uuid(department_id)
+    result = forecast_cache.get_forecast(db, b_id, d_id, refit=retrain) if b_id and d_id else None
+    if result is None:
         return {"message": "Not enough historical data", "forecast": []}
-    forecast = train_forecaster(branch_id, department_id, history)
-    hw       = get_forecaster(branch_id, department_id)
-    peaks    = hw.peak_hours(24, top_n=3)
-    return {"branch_id": branch_id, "department_id": department_id,
-            "forecast_24h": forecast, "peak_hours": peaks, "data_points": len(history)}
+    return result
+
+
+@router.post("/peak-forecast/retrain")
+def retrain_peak_forecasts(db: Session = Depends(get_db), _: dict = Depends(require_role("admin"))):
+    """
+    Refit every active department's forecaster in one vectorized pass
+    (nightly job, after tune_forecasts.py). Peak-hour stats are per
+    branch, so departments of a branch share its series.
+    """
+    t0 = time.perf_counter()
+    forecast_cache.load_parameters(db)   # pick up the latest tune_forecasts run
+    histories, marks = forecast_cache.load_histories(db)
+    results = train_forecasters(histories)
+    for (b, d), r in results.items():
+        if r["state"] is not None:
+            forecast_cache.save_state(db, uuid.UUID(b), uuid.UUID(d), r["state"], marks[b])
+    db.commit()
+    forecast_cache.invalidate()
+    return {"series": len(results), "secs": round(time.perf_counter() - t0, 3),
+            "results": [{"branch_id": b, "department_id": d, "forecast_24h": r["forecast"],
+                         "peak_hours": r["peak_hours"], "data_points": len(histories[(b, d)])}
+                        for (b, d), r in results.items()]}
 
 
 @router.get("/appointment-density")
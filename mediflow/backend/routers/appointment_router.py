@@ -1,21 +1,32 @@
 # ================================================================
 #  routers/appointment_router.py — FIXED: UUID PKs, hashed_password chain
 # ================================================================
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from typing import Optional
+import csv
+import dataclasses
+import io
 import uuid
 
 from mediflow_db.config import get_db
 from mediflow_db.models import (
-    Appointment, AppointmentData, TimeSlot, Patient,
-    QueueEntry, PriorityScore, WaitTimeEstimate, AppointmentLog,
+    Appointment, AppointmentData, AutoAssignData, TimeSlot, Doctor,
+    QueueEntry, AppointmentLog, AppointmentStatusEnum, QueueStatusEnum,
 )
 from auth import get_current_user, require_role
 from algorithms.interval_tree import get_tree, Interval
 from algorithms.priority_queue import get_queue, compute_score, QueueNode
 from algorithms.wait_time import get_estimator
-from algorithms.bipartite_matching import match_patients_to_slots
+from algorithms.bipartite_matching import match_patients_to_slots, get_matcher, slot_group, evict_past_groups
+from algorithms.weighted_assignment import AssignmentPatient, AssignmentSlot, assign_patients_to_slots
+from queue_waits import refresh_queue_waits
+from booking import lock_slot_and_patient, insert_booking
+from bulk_import import import_appointments, read_rows, detect_format, FORMATS
+from pagination import paginate
+
+MAX_AUTO_ASSIGN = 5000   # unslotted appointments per auto-assign call
 
 router = APIRouter(prefix="/api/appointments", tags=["Appointments"])
 
@@ -27,102 +38,278 @@ def _to_uuid(val):
     except ValueError: raise HTTPException(status_code=400, detail=f"Invalid UUID: {val}")
 
 
-def _get_patient_age(db, patient_id_uuid):
-    patient = db.query(Patient).filter(Patient.patient_id == patient_id_uuid).first()
-    if patient and patient.date_of_birth:
-        return (datetime.utcnow().date() - patient.date_of_birth).days // 365
+def _age_from_dob(dob):
+    if dob:
+        return (datetime.utcnow().date() - dob).days // 365
     return 30
 
 
 @router.post("/", status_code=201)
 def book_appointment(data: AppointmentData, db: Session = Depends(get_db),
                      current_user: dict = Depends(get_current_user)):
+    """
+    One locking SELECT, one INSERT … CTE, one commit (booking.py). The slot
+    row stays locked until commit, so concurrent bookings of the same slot
+    see each other's booked_count — capacity can't be oversold.
+    """
     p_id = _to_uuid(data.patient_id)
     d_id = _to_uuid(data.doctor_id)
     b_id = _to_uuid(data.branch_id)
     s_id = _to_uuid(data.slot_id) if data.slot_id else None
+    now  = datetime.utcnow()
 
+    slot, dob = lock_slot_and_patient(db, s_id, p_id)
+    slot_update = interval = None
     if s_id:
-        slot = db.query(TimeSlot).filter(TimeSlot.slot_id == s_id).first()
-        if not slot: raise HTTPException(status_code=404, detail="Slot not found")
-        if not slot.is_available: raise HTTPException(status_code=409, detail="Slot not available")
+        if not slot:
+            db.rollback(); raise HTTPException(status_code=404, detail="Slot not found")
+        if not slot.is_available or slot.booked_count >= slot.capacity:
+            db.rollback(); raise HTTPException(status_code=409, detail="Slot not available")
 
         tree = get_tree(str(d_id))
         start_dt = datetime.combine(slot.date, slot.start_time)
         end_dt   = datetime.combine(slot.date, slot.end_time)
-        conflict = tree.has_conflict(str(d_id), start_dt, end_dt)
+        # The slot itself is in the tree (created or rehydrated) — only other slots conflict
+        conflict = tree.has_conflict(str(d_id), start_dt, end_dt, exclude_slot_id=str(s_id))
         if conflict:
-            raise HTTPException(status_code=409, detail=f"Slot conflicts with existing appointment")
-
-        slot.booked_count += 1
-        if slot.booked_count >= slot.capacity:
-            slot.is_available = False
-        tree.insert(Interval(start=start_dt, end=end_dt, slot_id=str(s_id), doctor_id=str(d_id), branch_id=str(b_id)))
+            db.rollback(); raise HTTPException(status_code=409, detail=f"Slot conflicts with existing appointment")
+        booked = slot.booked_count + 1
+        slot_update = {"slot_id": s_id, "booked_count": booked, "is_available": booked < slot.capacity}
+        interval = Interval(start=start_dt, end=end_dt, slot_id=str(s_id), doctor_id=str(d_id), branch_id=str(b_id))
 
     appointment = Appointment(
-        patient_id=p_id, doctor_id=d_id, branch_id=b_id, slot_id=s_id,
+        appointment_id=uuid.uuid4(), patient_id=p_id, doctor_id=d_id, branch_id=b_id, slot_id=s_id,
         urgency_level=data.urgency_level, appointment_type=data.appointment_type,
-        scheduled_time=data.scheduled_time, notes=data.notes, booked_at=datetime.utcnow(),
+        status=AppointmentStatusEnum.scheduled, scheduled_time=data.scheduled_time,
+        notes=data.notes, booked_at=now,
     )
-    db.add(appointment); db.flush()
 
-    age    = _get_patient_age(db, p_id)
+    age    = _age_from_dob(dob)
     scores = compute_score(urgency=data.urgency_level.value, appointment_type=data.appointment_type.value,
-                           entered_at=datetime.utcnow(), age=age)
+                           entered_at=now, age=age)
 
     pq          = get_queue(str(d_id), str(b_id))
     queue_depth = pq.size()
     position    = queue_depth + 1
+    estimator   = get_estimator(str(d_id), str(b_id))
+    wait_data   = estimator.estimate(position, queue_depth + 1)
+    queue_id    = uuid.uuid4()
 
-    queue_entry = QueueEntry(
-        appointment_id=appointment.appointment_id, branch_id=b_id, doctor_id=d_id,
-        position=position, entered_queue_at=datetime.utcnow(), is_emergency=False,
-    )
-    db.add(queue_entry); db.flush()
-
-    ps = PriorityScore(
-        queue_id=queue_entry.queue_id, urgency_weight=0.50, wait_weight=0.30,
-        age_weight=0.10, type_weight=0.10,
-        raw_urgency_score=scores["raw_urgency_score"], raw_wait_score=scores["raw_wait_score"],
-        raw_age_score=scores["raw_age_score"], raw_type_score=scores["raw_type_score"],
-        final_score=scores["final_score"], computed_at=datetime.utcnow(),
-    )
-    db.add(ps)
-
-    estimator = get_estimator(str(d_id), str(b_id))
-    wait_data  = estimator.estimate(position, queue_depth + 1)
-    wte = WaitTimeEstimate(
-        queue_id=queue_entry.queue_id,
-        estimated_wait_mins=wait_data["estimated_wait_mins"],
-        queue_length=wait_data["queue_length"],
-        service_rate=wait_data["service_rate"],
-        calculated_at=datetime.utcnow(),
+    insert_booking(
+        db,
+        appointment={c: getattr(appointment, c) for c in (
+            "appointment_id", "patient_id", "doctor_id", "branch_id", "slot_id", "urgency_level",
+            "appointment_type", "status", "scheduled_time", "notes", "booked_at")},
+        queue_entry=dict(
+            queue_id=queue_id, appointment_id=appointment.appointment_id, branch_id=b_id, doctor_id=d_id,
+            position=position, entered_queue_at=now, is_emergency=False, status=QueueStatusEnum.waiting,
+            estimated_wait_mins=int(wait_data["estimated_wait_mins"]),
+        ),
+        score=dict(
+            score_id=uuid.uuid4(), queue_id=queue_id, urgency_weight=0.50, wait_weight=0.30,
+            age_weight=0.10, type_weight=0.10,
+            raw_urgency_score=scores["raw_urgency_score"], raw_wait_score=scores["raw_wait_score"],
+            raw_age_score=scores["raw_age_score"], raw_type_score=scores["raw_type_score"],
+            final_score=scores["final_score"], computed_at=now,
+        ),
+        estimate=dict(
+            estimate_id=uuid.uuid4(), queue_id=queue_id,
+            estimated_wait_mins=wait_data["estimated_wait_mins"],
+            queue_length=wait_data["queue_length"],
+            service_rate=wait_data["service_rate"],
+            calculated_at=now,
+        ),
+        log=dict(
+            log_id=uuid.uuid4(), appointment_id=appointment.appointment_id, patient_id=p_id,
+            doctor_id=d_id, branch_id=b_id, urgency_level=data.urgency_level,
+            appointment_type=data.appointment_type, status=appointment.status,
+            scheduled_time=data.scheduled_time, logged_at=now,
+        ),
+        slot=slot_update,
     )
-    db.add(wte)
-    queue_entry.estimated_wait_mins = int(wait_data["estimated_wait_mins"])
+    db.commit()
 
-    node = QueueNode(
+    # In-memory structures change only once the rows are durable
+    if interval is not None:
+        if not slot_update["is_available"]:
+            get_matcher(str(b_id)).remove_slot(str(s_id))
+        tree.insert(interval)
+    else:
+        _offer_slot(db, appointment)
+    pq.push(QueueNode(
         neg_score=-scores["final_score"], appointment_id=str(appointment.appointment_id),
         patient_id=str(p_id), doctor_id=str(d_id), branch_id=str(b_id),
         urgency=data.urgency_level.value, appointment_type=data.appointment_type.value, age=age,
-        entered_at=datetime.utcnow(),
-    )
-    pq.push(node)
-
-    log = AppointmentLog(
-        appointment_id=appointment.appointment_id, patient_id=p_id,
-        doctor_id=d_id, branch_id=b_id, urgency_level=data.urgency_level,
-        appointment_type=data.appointment_type, status=appointment.status,
-        scheduled_time=data.scheduled_time, logged_at=datetime.utcnow(),
-    )
-    db.add(log); db.commit(); db.refresh(appointment)
+        entered_at=now,
+    ))
     return _serialize(appointment)
 
 
+@router.post("/auto-assign")
+def auto_assign(data: AutoAssignData, db: Session = Depends(get_db),
+                _: dict = Depends(require_role("admin", "staff"))):
+    """
+    Place every unslotted scheduled appointment at the branch into a free slot
+    in [date_from, date_to] — urgent patients first, least weighted lateness
+    overall (algorithms/weighted_assignment.py). Proposals only unless `apply`.
+    """
+    b_id  = _to_uuid(data.branch_id)
+    d_ids = [_to_uuid(d) for d in data.doctor_ids] if data.doctor_ids else None
+    if data.date_to < data.date_from: raise HTTPException(status_code=400, detail="date_to before date_from")
+    range_end = datetime.combine(data.date_to + timedelta(days=1), time.min)
+
+    q = db.query(Appointment).filter(Appointment.branch_id == b_id, Appointment.slot_id.is_(None),
+                                     Appointment.status == AppointmentStatusEnum.scheduled,
+                                     Appointment.scheduled_time < range_end)
+    if d_ids and not data.same_specialization: q = q.filter(Appointment.doctor_id.in_(d_ids))
+    if data.apply: q = q.with_for_update(of=Appointment, skip_locked=True)   # a concurrent run's rows
+    appts = q.order_by(Appointment.scheduled_time).limit(MAX_AUTO_ASSIGN + 1).all()
+    if len(appts) > MAX_AUTO_ASSIGN:
+        raise HTTPException(status_code=400, detail=f"More than {MAX_AUTO_ASSIGN} unslotted appointments — narrow the range")
+
+    sq = db.query(TimeSlot).filter(TimeSlot.branch_id == b_id, TimeSlot.is_available == True,
+                                   TimeSlot.date >= data.date_from, TimeSlot.date <= data.date_to)
+    if d_ids: sq = sq.filter(TimeSlot.doctor_id.in_(d_ids))
+    slot_rows = sq.all()
+
+    # Compatible doctors: the booked one, or everyone sharing its specialization
+    specialization = {}
+    if data.same_specialization:
+        doc_ids = {a.doctor_id for a in appts} | {s.doctor_id for s in slot_rows}
+        specialization = dict(db.query(Doctor.doctor_id, Doctor.specialization)
+                              .filter(Doctor.doctor_id.in_(doc_ids)).all())
+    by_spec: dict[str, list] = {}
+    for d, spec in specialization.items():
+        if spec: by_spec.setdefault(spec.lower(), []).append(d)
+
+    patients = [AssignmentPatient(
+        patient_key=a.appointment_id, ready_at=a.scheduled_time,
+        urgency=getattr(a.urgency_level, "value", a.urgency_level),
+        doctors=by_spec.get((specialization.get(a.doctor_id) or "").lower(), [a.doctor_id]),
+    ) for a in appts]
+    slots = [AssignmentSlot(slot_key=s.slot_id, doctor_id=s.doctor_id,
+                            start=datetime.combine(s.date, s.start_time),
+                            capacity=(s.capacity or 1) - (s.booked_count or 0)) for s in slot_rows]
+    proposals = assign_patients_to_slots(patients, slots)
+    if data.apply: proposals = _lock_proposed_slots(db, proposals, patients)
+
+    slot_by_id = {s.slot_id: s for s in slot_rows}
+    appt_by_id = {a.appointment_id: a for a in appts}
+    out, moved, publish = [], {}, []
+    for p in proposals:
+        slot = slot_by_id.get(p["slot_key"])
+        out.append({"appointment_id": str(p["patient_key"]),
+                    "slot_id": str(slot.slot_id) if slot else None,
+                    "doctor_id": str(slot.doctor_id) if slot else None,
+                    "start": datetime.combine(slot.date, slot.start_time).isoformat() if slot else None,
+                    "lateness_mins": p["lateness_mins"]})
+        if data.apply and slot:
+            appt = appt_by_id[p["patient_key"]]
+            if appt.doctor_id != slot.doctor_id: moved[appt.appointment_id] = slot.doctor_id
+            publish.append(_apply_assignment(appt, slot))
+    if data.apply:
+        # One query for the queue rows of every appointment changing doctor
+        if moved:
+            for entry in db.query(QueueEntry).filter(QueueEntry.appointment_id.in_(list(moved))):
+                entry.doctor_id = moved[entry.appointment_id]
+        db.commit()
+        for apply in publish: apply()   # shared state only once the rows are committed
+    assigned = sum(1 for p in out if p["slot_id"])
+    return {"proposals": out, "assigned": assigned, "unassigned": len(out) - assigned, "applied": data.apply}
+
+
+@router.post("/import")
+def import_appointments_file(file: UploadFile = File(...), fmt: Optional[str] = None, dry_run: bool = False,
+                             db: Session = Depends(get_db),
+                             _: dict = Depends(require_role("admin", "staff"))):
+    """
+    Bulk import from CSV (header row) or NDJSON (bulk_import.py); `fmt`
+    defaults from the file extension. Validated and loaded in chunks —
+    bad rows are skipped and reported by line, good ones are queued as if
+    booked. `dry_run` validates only. Returns the import report.
+    """
+    fmt = fmt or detect_format(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of {', '.join(FORMATS)}")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return import_appointments(db, read_rows(stream, fmt), dry_run=dry_run)
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Unreadable file: {e}")
+    finally:
+        stream.detach()
+
+
+def _lock_proposed_slots(db, proposals, patients):
+    """
+    Lock the proposed slots FOR UPDATE in id order (as /book does) and re-check
+    their seats against the committed booked_count — a booking may have taken
+    one since the unlocked read. Patients that no longer fit are re-assigned
+    among the seats still free in the locked slots; no further rows are locked,
+    so two callers can't deadlock. Returns the proposals in their original order.
+    """
+    chosen = sorted({p["slot_key"] for p in proposals if p["slot_key"] is not None})
+    if not chosen: return proposals
+    locked = (db.query(TimeSlot).filter(TimeSlot.slot_id.in_(chosen)).order_by(TimeSlot.slot_id)
+              .with_for_update().populate_existing().all())
+    free = {s.slot_id: ((s.capacity or 1) - (s.booked_count or 0)) if s.is_available else 0 for s in locked}
+
+    retry = []
+    for p in proposals:
+        if p["slot_key"] is None: continue
+        if free.get(p["slot_key"], 0) > 0: free[p["slot_key"]] -= 1
+        else: retry.append(p["patient_key"])
+    if not retry: return proposals
+
+    by_key = {pt.patient_key: pt for pt in patients}
+    spare  = [AssignmentSlot(slot_key=s.slot_id, doctor_id=s.doctor_id,
+                             start=datetime.combine(s.date, s.start_time), capacity=free[s.slot_id])
+              for s in locked if free[s.slot_id] > 0]
+    redone = {p["patient_key"]: p for p in assign_patients_to_slots([by_key[k] for k in retry], spare)}
+    return [redone.get(p["patient_key"], p) for p in proposals]
+
+
+def _apply_assignment(appt, slot):
+    """
+    Book `slot` for an unslotted appointment in the session, moving it to the
+    slot's doctor. Returns the matching matcher/tree/queue update as a callable,
+    to run once the commit has gone through — a failed commit leaves them as they were.
+    """
+    appt_id, branch_id = str(appt.appointment_id), str(appt.branch_id)
+    old_doctor, new_doctor, slot_id = str(appt.doctor_id), str(slot.doctor_id), str(slot.slot_id)
+    slot.booked_count = (slot.booked_count or 0) + 1
+    full = slot.booked_count >= (slot.capacity or 1)
+    if full: slot.is_available = False
+    start = datetime.combine(slot.date, slot.start_time)
+    interval = Interval(start=start, end=datetime.combine(slot.date, slot.end_time), slot_id=slot_id,
+                        doctor_id=new_doctor, branch_id=str(slot.branch_id))
+    appt.slot_id, appt.scheduled_time, appt.doctor_id = slot.slot_id, start, slot.doctor_id
+
+    def publish():
+        matcher = get_matcher(branch_id)
+        matcher.remove_patient(appt_id)
+        if full: matcher.remove_slot(slot_id)
+        get_tree(new_doctor).insert(interval)
+        if old_doctor == new_doctor:
+            return
+        old_pq = get_queue(old_doctor, branch_id)
+        node   = old_pq.get(appt_id)
+        old_pq.remove(appt_id)
+        if node:
+            get_queue(new_doctor, branch_id).push(dataclasses.replace(node, doctor_id=new_doctor))
+    return publish
+
+
 @router.get("/")
-def list_appointments(patient_id: str = None, doctor_id: str = None, branch_id: str = None,
-                      skip: int = 0, limit: int = 50, db: Session = Depends(get_db),
-                      _: dict = Depends(get_current_user)):
+def list_appointments(response: Response, patient_id: str = None, doctor_id: str = None,
+                      branch_id: str = None, skip: int = 0, limit: int = 50, cursor: str = None,
+                      db: Session = Depends(get_db), _: dict = Depends(get_current_user)):
+    """
+    Ordered by (scheduled_time, appointment_id). Pass the X-Next-Cursor
+    header of one page as `cursor` for the next (pagination.py); `skip`
+    still works but deep offsets get slower as the table grows.
+    """
     q = db.query(Appointment)
     if patient_id:
         try: q = q.filter(Appointment.patient_id == uuid.UUID(patient_id))
@@ -133,7 +320,9 @@ def list_appointments(patient_id: str = None, doctor_id: str = None, branch_id:
     if branch_id:
         try: q = q.filter(Appointment.branch_id == uuid.UUID(branch_id))
         except ValueError: pass
-    return [_serialize(a) for a in q.offset(skip).limit(limit).all()]
+    page = paginate(q, (Appointment.scheduled_time, Appointment.appointment_id), "appointments",
+                    response, limit, skip, cursor)
+    return [_serialize(a) for a in page]
 
 
 @router.get("/{appointment_id}")
@@ -155,10 +344,23 @@ def complete_appointment(appointment_id: str, duration_mins: float,
     appt = db.query(Appointment).filter(Appointment.appointment_id == aid).first()
     if not appt: raise HTTPException(status_code=404, detail="Not found")
     appt.status = "completed"; appt.actual_end_time = datetime.utcnow()
+    if appt.queue_entry: appt.queue_entry.status = "done"
     estimator = get_estimator(str(appt.doctor_id), str(appt.branch_id))
     estimator.record_completion(duration_mins)
     pq = get_queue(str(appt.doctor_id), str(appt.branch_id))
     pq.remove(str(appointment_id))
+    get_matcher(str(appt.branch_id)).remove_patient(str(appointment_id))
+    # Persisted so the estimator can be rehydrated on restart (warm_start.py)
+    db.add(AppointmentLog(
+        appointment_id=appt.appointment_id, patient_id=appt.patient_id,
+        doctor_id=appt.doctor_id, branch_id=appt.branch_id, urgency_level=appt.urgency_level,
+        appointment_type=appt.appointment_type, status="completed",
+        scheduled_time=appt.scheduled_time, actual_start_time=appt.actual_start_time,
+        actual_end_time=appt.actual_end_time, consult_duration_mins=duration_mins,
+        logged_at=datetime.utcnow(),
+    ))
+    # New service rate + shorter queue → re-estimate everyone still waiting
+    refresh_queue_waits(db, appt.doctor_id, appt.branch_id)
     db.commit()
     return {"message": "Appointment completed", "duration_mins": duration_mins}
 
@@ -171,17 +373,41 @@ def cancel_appointment(appointment_id: str, db: Session = Depends(get_db),
     appt = db.query(Appointment).filter(Appointment.appointment_id == aid).first()
     if not appt: raise HTTPException(status_code=404, detail="Not found")
     appt.status = "cancelled"
+    # Repair the branch's walk-in matching instead of recomputing it
+    matcher = get_matcher(str(appt.branch_id))
+    changes = matcher.remove_patient(str(appointment_id))
     if appt.slot_id:
         slot = db.query(TimeSlot).filter(TimeSlot.slot_id == appt.slot_id).first()
         if slot:
             slot.booked_count = max(0, slot.booked_count - 1)
             slot.is_available = True
+            group = slot_group(slot.doctor_id, slot.date)
+            if matcher.has_group(group):
+                changes.update(matcher.add_slot(str(slot.slot_id), group=group))
         tree = get_tree(str(appt.doctor_id))
         tree.remove(str(appt.slot_id))
     pq = get_queue(str(appt.doctor_id), str(appt.branch_id))
     pq.remove(str(appointment_id))
     db.commit()
-    return {"message": "Appointment cancelled"}
+    return {"message": "Appointment cancelled",
+            "slot_offers": [{"appointment_id": a, "slot_id": s} for a, s in changes.items()]}
+
+
+def _offer_slot(db, appt):
+    """
+    Add an unslotted appointment to the branch matcher; its day's free slots
+    join on first use, which is also when past days are evicted.
+    """
+    matcher = get_matcher(str(appt.branch_id))
+    group   = slot_group(appt.doctor_id, appt.scheduled_time.date())
+    if not matcher.has_group(group):
+        evict_past_groups(matcher, datetime.utcnow().date())
+        free = (db.query(TimeSlot.slot_id)
+                .filter(TimeSlot.doctor_id == appt.doctor_id, TimeSlot.branch_id == appt.branch_id,
+                        TimeSlot.date == appt.scheduled_time.date(), TimeSlot.is_available == True))
+        for (sid,) in free:
+            matcher.add_slot(str(sid), group=group)
+    return matcher.add_patient(str(appt.appointment_id), group=group)
 
 
 def _serialize(a):
@@ -0,0 +1,224 @@
+# ================================================================
+#  routers/async_appointment_router.py — asyncpg twin of the hot
+#  appointment routes, served instead of them under
+#  MEDIFLOW_DB_MODE=async (main.py). Same behaviour, same ordering
+#  of commit vs in-memory updates; queries are select() awaited on
+#  an AsyncSession and relationships are loaded up front.
+# ================================================================
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+import uuid
+
+from mediflow_db.config import get_async_db
+from mediflow_db.models import (
+    Appointment, AppointmentData, TimeSlot, AppointmentLog, AppointmentStatusEnum, QueueStatusEnum,
+)
+from auth import get_current_user, require_role
+from algorithms.interval_tree import get_tree, Interval
+from algorithms.priority_queue import get_queue, compute_score, QueueNode
+from algorithms.wait_time import get_estimator
+from algorithms.bipartite_matching import get_matcher, slot_group, evict_past_groups
+from queue_waits import refresh_queue_waits_async
+from booking import lock_slot_and_patient_async, insert_booking_async
+from pagination import paginate_async
+from routers.appointment_router import _to_uuid, _age_from_dob, _serialize
+
+router = APIRouter(prefix="/api/appointments", tags=["Appointments"])
+
+
+@router.post("/", status_code=201)
+async def book_appointment(data: AppointmentData, db: AsyncSession = Depends(get_async_db),
+                           current_user: dict = Depends(get_current_user)):
+    p_id = _to_uuid(data.patient_id)
+    d_id = _to_uuid(data.doctor_id)
+    b_id = _to_uuid(data.branch_id)
+    s_id = _to_uuid(data.slot_id) if data.slot_id else None
+    now  = datetime.utcnow()
+
+    slot, dob = await lock_slot_and_patient_async(db, s_id, p_id)
+    slot_update = interval = None
+    if s_id:
+        if not slot:
+            await db.rollback(); raise HTTPException(status_code=404, detail="Slot not found")
+        if not slot.is_available or slot.booked_count >= slot.capacity:
+            await db.rollback(); raise HTTPException(status_code=409, detail="Slot not available")
+
+        tree = get_tree(str(d_id))
+        start_dt = datetime.combine(slot.date, slot.start_time)
+        end_dt   = datetime.combine(slot.date, slot.end_time)
+        conflict = tree.has_conflict(str(d_id), start_dt, end_dt, exclude_slot_id=str(s_id))
+        if conflict:
+            await db.rollback(); raise HTTPException(status_code=409, detail=f"Slot conflicts with existing appointment")
+        booked = slot.booked_count + 1
+        slot_update = {"slot_id": s_id, "booked_count": booked, "is_available": booked < slot.capacity}
+        interval = Interval(start=start_dt, end=end_dt, slot_id=str(s_id), doctor_id=str(d_id), branch_id=str(b_id))
+
+    appointment = Appointment(
+        appointment_id=uuid.uuid4(), patient_id=p_id, doctor_id=d_id, branch_id=b_id, slot_id=s_id,
+        urgency_level=data.urgency_level, appointment_type=data.appointment_type,
+        status=AppointmentStatusEnum.scheduled, scheduled_time=data.scheduled_time,
+        notes=data.notes, booked_at=now,
+    )
+
+    age    = _age_from_dob(dob)
+    scores = compute_score(urgency=data.urgency_level.value, appointment_type=data.appointment_type.value,
+                           entered_at=now, age=age)
+
+    pq          = get_queue(str(d_id), str(b_id))
+    queue_depth = pq.size()
+    position    = queue_depth + 1
+    estimator   = get_estimator(str(d_id), str(b_id))
+    wait_data   = estimator.estimate(position, queue_depth + 1)
+    queue_id    = uuid.uuid4()
+
+    await insert_booking_async(
+        db,
+        appointment={c: getattr(appointment, c) for c in (
+            "appointment_id", "patient_id", "doctor_id", "branch_id", "slot_id", "urgency_level",
+            "appointment_type", "status", "scheduled_time", "notes", "booked_at")},
+        queue_entry=dict(
+            queue_id=queue_id, appointment_id=appointment.appointment_id, branch_id=b_id, doctor_id=d_id,
+            position=position, entered_queue_at=now, is_emergency=False, status=QueueStatusEnum.waiting,
+            estimated_wait_mins=int(wait_data["estimated_wait_mins"]),
+        ),
+        score=dict(
+            score_id=uuid.uuid4(), queue_id=queue_id, urgency_weight=0.50, wait_weight=0.30,
+            age_weight=0.10, type_weight=0.10,
+            raw_urgency_score=scores["raw_urgency_score"], raw_wait_score=scores["raw_wait_score"],
+            raw_age_score=scores["raw_age_score"], raw_type_score=scores["raw_type_score"],
+            final_score=scores["final_score"], computed_at=now,
+        ),
+        estimate=dict(
+            estimate_id=uuid.uuid4(), queue_id=queue_id,
+            estimated_wait_mins=wait_data["estimated_wait_mins"],
+            queue_length=wait_data["queue_length"],
+            service_rate=wait_data["service_rate"],
+            calculated_at=now,
+        ),
+        log=dict(
+            log_id=uuid.uuid4(), appointment_id=appointment.appointment_id, patient_id=p_id,
+            doctor_id=d_id, branch_id=b_id, urgency_level=data.urgency_level,
+            appointment_type=data.appointment_type, status=appointment.status,
+            scheduled_time=data.scheduled_time, logged_at=now,
+        ),
+        slot=slot_update,
+    )
+    await db.commit()
+
+    # In-memory structures change only once the rows are durable
+    if interval is not None:
+        if not slot_update["is_available"]:
+            get_matcher(str(b_id)).remove_slot(str(s_id))
+        tree.insert(interval)
+    else:
+        await _offer_slot(db, appointment)
+    pq.push(QueueNode(
+        neg_score=-scores["final_score"], appointment_id=str(appointment.appointment_id),
+        patient_id=str(p_id), doctor_id=str(d_id), branch_id=str(b_id),
+        urgency=data.urgency_level.value, appointment_type=data.appointment_type.value, age=age,
+        entered_at=now,
+    ))
+    return _serialize(appointment)
+
+
+@router.get("/")
+async def list_appointments(response: Response, patient_id: str = None, doctor_id: str = None,
+                            branch_id: str = None, skip: int = 0, limit: int = 50, cursor: str = None,
+                            db: AsyncSession = Depends(get_async_db), _: dict = Depends(get_current_user)):
+    q = select(Appointment)
+    if patient_id:
+        try: q = q.where(Appointment.patient_id == uuid.UUID(patient_id))
+        except ValueError: pass
+    if doctor_id:
+        try: q = q.where(Appointment.doctor_id == uuid.UUID(doctor_id))
+        except ValueError: pass
+    if branch_id:
+        try: q = q.where(Appointment.branch_id == uuid.UUID(branch_id))
+        except ValueError: pass
+    page = await paginate_async(db, q, (Appointment.scheduled_time, Appointment.appointment_id),
+                                "appointments", response, limit, skip, cursor)
+    return [_serialize(a) for a in page]
+
+
+@router.get("/{appointment_id}")
+async def get_appointment(appointment_id: str, db: AsyncSession = Depends(get_async_db),
+                          _: dict = Depends(get_current_user)):
+    try: aid = uuid.UUID(appointment_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid appointment ID")
+    appt = await db.scalar(select(Appointment).where(Appointment.appointment_id == aid))
+    if not appt: raise HTTPException(status_code=404, detail="Appointment not found")
+    return _serialize(appt)
+
+
+@router.patch("/{appointment_id}/complete")
+async def complete_appointment(appointment_id: str, duration_mins: float,
+                               db: AsyncSession = Depends(get_async_db),
+                               _: dict = Depends(require_role("doctor", "staff", "admin"))):
+    try: aid = uuid.UUID(appointment_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid ID")
+    appt = await db.scalar(select(Appointment).where(Appointment.appointment_id == aid)
+                           .options(selectinload(Appointment.queue_entry)))
+    if not appt: raise HTTPException(status_code=404, detail="Not found")
+    appt.status = "completed"; appt.actual_end_time = datetime.utcnow()
+    if appt.queue_entry: appt.queue_entry.status = "done"
+    estimator = get_estimator(str(appt.doctor_id), str(appt.branch_id))
+    estimator.record_completion(duration_mins)
+    pq = get_queue(str(appt.doctor_id), str(appt.branch_id))
+    pq.remove(str(appointment_id))
+    get_matcher(str(appt.branch_id)).remove_patient(str(appointment_id))
+    db.add(AppointmentLog(
+        appointment_id=appt.appointment_id, patient_id=appt.patient_id,
+        doctor_id=appt.doctor_id, branch_id=appt.branch_id, urgency_level=appt.urgency_level,
+        appointment_type=appt.appointment_type, status="completed",
+        scheduled_time=appt.scheduled_time, actual_start_time=appt.actual_start_time,
+        actual_end_time=appt.actual_end_time, consult_duration_mins=duration_mins,
+        logged_at=datetime.utcnow(),
+    ))
+    await refresh_queue_waits_async(db, appt.doctor_id, appt.branch_id)
+    await db.commit()
+    return {"message": "Appointment completed", "duration_mins": duration_mins}
+
+
+@router.patch("/{appointment_id}/cancel")
+async def cancel_appointment(appointment_id: str, db: AsyncSession = Depends(get_async_db),
+                             _: dict = Depends(get_current_user)):
+    try: aid = uuid.UUID(appointment_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid ID")
+    appt = await db.scalar(select(Appointment).where(Appointment.appointment_id == aid))
+    if not appt: raise HTTPException(status_code=404, detail="Not found")
+    appt.status = "cancelled"
+    matcher = get_matcher(str(appt.branch_id))
+    changes = matcher.remove_patient(str(appointment_id))
+    if appt.slot_id:
+        slot = await db.scalar(select(TimeSlot).where(TimeSlot.slot_id == appt.slot_id))
+        if slot:
+            slot.booked_count = max(0, slot.booked_count - 1)
+            slot.is_available = True
+            group = slot_group(slot.doctor_id, slot.date)
+            if matcher.has_group(group):
+                changes.update(matcher.add_slot(str(slot.slot_id), group=group))
+        tree = get_tree(str(appt.doctor_id))
+        tree.remove(str(appt.slot_id))
+    pq = get_queue(str(appt.doctor_id), str(appt.branch_id))
+    pq.remove(str(appointment_id))
+    await db.commit()
+    return {"message": "Appointment cancelled",
+            "slot_offers": [{"appointment_id": a, "slot_id": s} for a, s in changes.items()]}
+
+
+async def _offer_slot(db: AsyncSession, appt):
+    """appointment_router._offer_slot on an AsyncSession."""
+    matcher = get_matcher(str(appt.branch_id))
+    group   = slot_group(appt.doctor_id, appt.scheduled_time.date())
+    if not matcher.has_group(group):
+        evict_past_groups(matcher, datetime.utcnow().date())
+        free = await db.scalars(
+            select(TimeSlot.slot_id)
+            .where(TimeSlot.doctor_id == appt.doctor_id, TimeSlot.branch_id == appt.branch_id,
+                   TimeSlot.date == appt.scheduled_time.date(), TimeSlot.is_available == True))
+        for sid in free:
+            matcher.add_slot(str(sid), group=group)
+    return matcher.add_patient(str(appt.appointment_id), group=group)
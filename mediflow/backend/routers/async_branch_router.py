@@ -0,0 +1,67 @@
+# ================================================================
+#  routers/async_branch_router.py — asyncpg twin of the branch
+#  routes that touch the database, served instead of them under
+#  MEDIFLOW_DB_MODE=async (main.py). The geometry routes need no
+#  session and stay on the sync router. A branch-index rebuild
+#  (log truncated) runs its query through AsyncSession.run_sync.
+# ================================================================
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from mediflow_db.config import get_async_db
+from mediflow_db.models import Branch, BranchData
+from auth import get_current_user, require_role
+from algorithms.load_balancer import get_load_balancer
+from algorithms.branch_graph import get_branch_graph
+from branch_index import sync_branch_index
+from routers.branch_router import _serialize
+
+router = APIRouter(prefix="/api/branches", tags=["Branches"])
+
+@router.post("/", status_code=201)
+async def create_branch(data: BranchData, db: AsyncSession = Depends(get_async_db),
+                        _: dict = Depends(require_role("admin"))):
+    d = data.model_dump()
+    try: d["hospital_id"] = uuid.UUID(d["hospital_id"])
+    except (ValueError, TypeError): raise HTTPException(status_code=400, detail="Invalid hospital_id UUID")
+    branch = Branch(**d)
+    db.add(branch); await db.commit(); await db.refresh(branch)
+    get_load_balancer().register(str(branch.branch_id), branch.total_capacity, branch.latitude, branch.longitude)
+    await db.run_sync(sync_branch_index)
+    return _serialize(branch)
+
+@router.get("/")
+async def list_branches(db: AsyncSession = Depends(get_async_db), _: dict = Depends(get_current_user)):
+    return [_serialize(b) for b in await db.scalars(select(Branch).where(Branch.is_active == True))]
+
+@router.get("/suggest-routing")
+async def suggest_routing(origin_branch_id: str, db: AsyncSession = Depends(get_async_db),
+                          _: dict = Depends(get_current_user)):
+    await db.run_sync(sync_branch_index)
+    _, overloaded = get_load_balancer().overload_state()
+    if origin_branch_id not in overloaded:
+        return {"message": "Branch is not overloaded. No redirect needed."}
+    found = get_branch_graph().nearest_available(origin_branch_id, set(overloaded))
+    if not found: return {"message": "No available branch found for redirect"}
+    road_km, nearest = found
+    try: bid = uuid.UUID(nearest)
+    except ValueError: bid = None
+    name = await db.scalar(select(Branch.branch_name).where(Branch.branch_id == bid)) if bid else None
+    return {"redirect_to": nearest, "branch_name": name,
+            "road_distance_km": round(road_km, 3),
+            "reason": "Origin branch overloaded (>80% capacity)"}
+
+@router.delete("/{branch_id}")
+async def deactivate_branch(branch_id: str, db: AsyncSession = Depends(get_async_db),
+                            _: dict = Depends(require_role("admin"))):
+    try: bid = uuid.UUID(branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid branch_id UUID")
+    branch = await db.scalar(select(Branch).where(Branch.branch_id == bid))
+    if not branch: raise HTTPException(status_code=404, detail="Branch not found")
+    branch.is_active = False
+    await db.commit()
+    get_load_balancer().remove(str(bid))
+    await db.run_sync(sync_branch_index)
+    return {"message": "Branch deactivated"}
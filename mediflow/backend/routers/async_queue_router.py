@@ -0,0 +1,147 @@
+# ================================================================
+#  routers/async_queue_router.py — asyncpg twin of the queue routes
+#  that touch the database, served instead of them under
+#  MEDIFLOW_DB_MODE=async (main.py). Same behaviour and undo paths.
+# ================================================================
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, selectinload
+from datetime import datetime
+import dataclasses
+import uuid
+
+from mediflow_db.config import get_async_db
+from mediflow_db.models import (
+    QueueEntry, PriorityScore, EmergencyOverride, EmergencyOverrideData, Appointment,
+)
+from auth import get_current_user, require_role
+from algorithms.priority_queue import get_queue, QueueNode
+from queue_waits import refresh_queue_waits_async
+
+router = APIRouter(prefix="/api/queue", tags=["Queue"])
+
+
+@router.get("/live/{doctor_id}/{branch_id}")
+async def get_live_queue(doctor_id: str, branch_id: str, db: AsyncSession = Depends(get_async_db),
+                         _: dict = Depends(get_current_user)):
+    try: d_id = uuid.UUID(doctor_id); b_id = uuid.UUID(branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+
+    entries = await db.scalars(
+        select(QueueEntry)
+        .where(QueueEntry.doctor_id == d_id, QueueEntry.branch_id == b_id,
+               QueueEntry.status.in_(["waiting", "called"]))
+        .join(PriorityScore, PriorityScore.queue_id == QueueEntry.queue_id)
+        .options(contains_eager(QueueEntry.priority_score))   # the joined row, no lazy load
+        .order_by((QueueEntry.status == "called").desc(), QueueEntry.position)
+    )
+    return [{
+        "position": idx + 1, "queue_id": str(e.queue_id),
+        "appointment_id": str(e.appointment_id),
+        "estimated_wait_mins": e.estimated_wait_mins, "is_emergency": e.is_emergency,
+        "status": e.status.value,
+        "priority_score": e.priority_score.final_score if e.priority_score else None,
+    } for idx, e in enumerate(entries)]
+
+
+@router.get("/next/{doctor_id}/{branch_id}")
+async def get_next_patient(doctor_id: str, branch_id: str, db: AsyncSession = Depends(get_async_db),
+                           _: dict = Depends(require_role("doctor", "staff", "admin"))):
+    try: d_id = uuid.UUID(doctor_id); b_id = uuid.UUID(branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    pq   = get_queue(str(d_id), str(b_id))
+    node = pq.pop()
+    if not node: return {"message": "Queue is empty"}
+    try:
+        await db.execute(
+            update(QueueEntry)
+            .where(QueueEntry.appointment_id == uuid.UUID(node.appointment_id), QueueEntry.status == "waiting")
+            .values({QueueEntry.status: "called", QueueEntry.estimated_wait_mins: 0})
+            .execution_options(synchronize_session=False))
+        await refresh_queue_waits_async(db, d_id, b_id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        pq.push(node)   # still waiting in the DB — keep the in-memory queue in step
+        raise
+    return {"appointment_id": node.appointment_id, "patient_id": node.patient_id,
+            "urgency": node.urgency, "priority_score": -node.neg_score, "is_emergency": node.is_emergency}
+
+
+@router.post("/emergency-override", status_code=201)
+async def emergency_override(data: EmergencyOverrideData, db: AsyncSession = Depends(get_async_db),
+                             current_user: dict = Depends(require_role("doctor", "staff", "admin"))):
+    try: q_id = uuid.UUID(data.queue_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid queue_id UUID")
+
+    queue_entry = await db.scalar(select(QueueEntry).where(QueueEntry.queue_id == q_id)
+                                  .options(selectinload(QueueEntry.priority_score)))
+    if not queue_entry: raise HTTPException(status_code=404, detail="Queue entry not found")
+
+    appt = await db.scalar(select(Appointment).where(Appointment.appointment_id == queue_entry.appointment_id))
+    if not appt: raise HTTPException(status_code=404, detail="Appointment not found")
+
+    prev_position = queue_entry.position
+    queue_entry.is_emergency    = True
+    queue_entry.override_reason = data.reason
+    queue_entry.position        = 1
+    if queue_entry.priority_score:
+        queue_entry.priority_score.final_score = 999.0
+        queue_entry.priority_score.computed_at = datetime.utcnow()
+
+    override = EmergencyOverride(
+        queue_id=q_id, triggered_by=data.triggered_by or current_user.get("sub"),
+        reason=data.reason, previous_position=prev_position, new_position=1,
+        triggered_at=datetime.utcnow(),
+    )
+    db.add(override)
+
+    pq     = get_queue(str(queue_entry.doctor_id), str(queue_entry.branch_id))
+    queued = pq.get(str(appt.appointment_id))
+    prior  = dataclasses.replace(queued) if queued else None   # promoted in place below
+    pq.emergency_insert(QueueNode(
+        neg_score=-999.0, appointment_id=str(appt.appointment_id),
+        patient_id=str(appt.patient_id), doctor_id=str(appt.doctor_id),
+        branch_id=str(appt.branch_id), urgency=appt.urgency_level.value,
+        appointment_type=appt.appointment_type.value, is_emergency=True,
+    ))
+    try:
+        await db.flush()
+        await refresh_queue_waits_async(db, queue_entry.doctor_id, queue_entry.branch_id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        # Override never committed — put the in-memory queue back as it was
+        if prior: pq.push(prior)
+        else: pq.remove(str(appt.appointment_id))
+        raise
+    await db.refresh(override)
+    return {"override_id": str(override.override_id), "queue_id": str(override.queue_id),
+            "reason": override.reason, "previous_position": override.previous_position,
+            "new_position": override.new_position,
+            "triggered_at": override.triggered_at.isoformat() if override.triggered_at else None}
+
+
+@router.get("/score/{queue_id}")
+async def get_priority_score(queue_id: str, db: AsyncSession = Depends(get_async_db),
+                             _: dict = Depends(get_current_user)):
+    try: q_id = uuid.UUID(queue_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    score = await db.scalar(select(PriorityScore).where(PriorityScore.queue_id == q_id))
+    if not score: raise HTTPException(status_code=404, detail="Score not found")
+    return {"score_id": str(score.score_id), "queue_id": str(score.queue_id),
+            "final_score": score.final_score, "computed_at": score.computed_at.isoformat() if score.computed_at else None}
+
+
+@router.patch("/status/{queue_id}")
+async def update_queue_status(queue_id: str, new_status: str, db: AsyncSession = Depends(get_async_db),
+                              _: dict = Depends(require_role("doctor", "staff", "admin"))):
+    try: q_id = uuid.UUID(queue_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    entry = await db.scalar(select(QueueEntry).where(QueueEntry.queue_id == q_id))
+    if not entry: raise HTTPException(status_code=404, detail="Queue entry not found")
+    valid = ["waiting", "called", "in_room", "done", "skipped"]
+    if new_status not in valid: raise HTTPException(status_code=400, detail=f"Must be one of {valid}")
+    entry.status = new_status; await db.commit()
+    return {"message": f"Status updated to {new_status}"}
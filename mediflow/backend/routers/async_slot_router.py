@@ -0,0 +1,111 @@
+# ================================================================
+#  routers/async_slot_router.py — asyncpg twin of the single-slot
+#  routes, served instead of them under MEDIFLOW_DB_MODE=async
+#  (main.py). The bulk schedule stays on the sync router.
+# ================================================================
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, date, time, timedelta
+import uuid
+
+from mediflow_db.config import get_async_db
+from mediflow_db.models import TimeSlot, TimeSlotData, Doctor, SlotBlock
+from auth import get_current_user, require_role
+from algorithms.interval_tree import get_tree, Interval, merge_free_windows
+from algorithms.bipartite_matching import get_matcher, slot_group
+from routers.slot_router import MAX_FREE_WINDOW_DAYS, _serialize
+
+router = APIRouter(prefix="/api/slots", tags=["Time Slots"])
+
+@router.post("/", status_code=201)
+async def create_slot(data: TimeSlotData, db: AsyncSession = Depends(get_async_db),
+                      _: dict = Depends(require_role("admin", "staff"))):
+    try:
+        d_id = uuid.UUID(data.doctor_id); b_id = uuid.UUID(data.branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    tree     = get_tree(str(d_id))
+    start_dt = datetime.combine(data.date, data.start_time)
+    end_dt   = datetime.combine(data.date, data.end_time)
+    conflict = tree.has_conflict(str(d_id), start_dt, end_dt)
+    if conflict: raise HTTPException(status_code=409, detail=f"Slot overlaps with existing slot")
+    slot = TimeSlot(doctor_id=d_id, branch_id=b_id, date=data.date,
+                    start_time=data.start_time, end_time=data.end_time, capacity=data.capacity)
+    db.add(slot); await db.flush()
+    tree.insert(Interval(start=start_dt, end=end_dt, slot_id=str(slot.slot_id),
+                         doctor_id=str(d_id), branch_id=str(b_id)))
+    matcher = get_matcher(str(b_id))
+    if matcher.has_group(slot_group(d_id, data.date)):
+        matcher.add_slot(str(slot.slot_id), group=slot_group(d_id, data.date))
+    await db.commit(); await db.refresh(slot)
+    return _serialize(slot)
+
+@router.get("/available")
+async def get_available_slots(doctor_id: str, branch_id: str, date_str: str,
+                              db: AsyncSession = Depends(get_async_db), _: dict = Depends(get_current_user)):
+    try:
+        d_id = uuid.UUID(doctor_id); b_id = uuid.UUID(branch_id)
+        query_date = date.fromisoformat(date_str)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid input")
+    slots = await db.scalars(
+        select(TimeSlot)
+        .where(TimeSlot.doctor_id == d_id, TimeSlot.branch_id == b_id,
+               TimeSlot.date == query_date, TimeSlot.is_available == True)
+        .order_by(TimeSlot.start_time))
+    return [_serialize(s) for s in slots]
+
+@router.get("/free-windows")
+async def get_free_windows(date_from: str, date_to: str, doctor_ids: str = None, specialization: str = None,
+                           branch_id: str = None, slot_duration_mins: int = 15,
+                           day_start: str = "09:00", day_end: str = "17:00", limit: int = 50,
+                           db: AsyncSession = Depends(get_async_db), _: dict = Depends(get_current_user)):
+    try:
+        start_d, end_d = date.fromisoformat(date_from), date.fromisoformat(date_to)
+        open_t, close_t = time.fromisoformat(day_start), time.fromisoformat(day_end)
+        ids = [uuid.UUID(d) for d in doctor_ids.split(",")] if doctor_ids else []
+        b_id = uuid.UUID(branch_id) if branch_id else None
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid input")
+    if end_d < start_d or (end_d - start_d).days > MAX_FREE_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be 0–{MAX_FREE_WINDOW_DAYS} days")
+    if slot_duration_mins <= 0: raise HTTPException(status_code=400, detail="slot_duration_mins must be positive")
+
+    if not ids and specialization:
+        ids = list(await db.scalars(select(Doctor.doctor_id)
+                                    .where(Doctor.is_active == True, Doctor.specialization.ilike(specialization))))
+    if not ids: raise HTTPException(status_code=400, detail="Provide doctor_ids or a matching specialization")
+
+    range_start = datetime.combine(start_d, time.min)
+    range_end   = datetime.combine(end_d + timedelta(days=1), time.min)
+
+    applies = [SlotBlock.doctor_id.in_(ids)]
+    if b_id:
+        applies = [and_(SlotBlock.doctor_id.in_(ids), or_(SlotBlock.branch_id == b_id, SlotBlock.branch_id.is_(None))),
+                   and_(SlotBlock.doctor_id.is_(None), SlotBlock.branch_id == b_id)]
+    blocks = await db.execute(
+        select(SlotBlock.doctor_id, SlotBlock.start_datetime, SlotBlock.end_datetime)
+        .where(SlotBlock.start_datetime < range_end, SlotBlock.end_datetime > range_start, or_(*applies)))
+    blocked: dict[uuid.UUID, list] = {d: [] for d in ids}
+    for doc, b_start, b_end in blocks:
+        for d in ([doc] if doc else ids):
+            blocked[d].append((b_start, b_end))
+
+    per_doctor = {
+        str(d): get_tree(str(d)).free_windows(str(d), range_start, range_end, open_t, close_t,
+                                              slot_duration_mins, blocked[d], limit)
+        for d in ids
+    }
+    windows = merge_free_windows(per_doctor, limit)
+    return [{"doctor_id": d, "start": s.isoformat(), "end": e.isoformat()} for d, s, e in windows]
+
+@router.delete("/{slot_id}")
+async def delete_slot(slot_id: str, db: AsyncSession = Depends(get_async_db),
+                      _: dict = Depends(require_role("admin", "staff"))):
+    try: s_id = uuid.UUID(slot_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    slot = await db.scalar(select(TimeSlot).where(TimeSlot.slot_id == s_id))
+    if not slot: raise HTTPException(status_code=404, detail="Slot not found")
+    tree = get_tree(str(slot.doctor_id))
+    tree.remove(slot_id)
+    get_matcher(str(slot.branch_id)).remove_slot(str(s_id))
+    await db.delete(slot); await db.commit()
+    return {"message": f"Slot {slot_id} deleted"}
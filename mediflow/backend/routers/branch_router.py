@@ -2,17 +2,24 @@
 #  routers/branch_router.py — FIXED: UUID branch_id PKs
 # ================================================================
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import json
 import uuid
 
 from mediflow_db.config import get_db
-from mediflow_db.models import Branch, BranchData
+from mediflow_db.models import Branch, BranchData, NearestBatchData
 from auth import get_current_user, require_role
-from algorithms.kdtree import get_kdtree, rebuild_kdtree, BranchPoint
-from algorithms.load_balancer import get_load_balancer, nearest_available_branch
+from algorithms.kdtree import get_kdtree, sync_availability
+from algorithms.load_balancer import get_load_balancer
+from algorithms.branch_graph import get_branch_graph
+from branch_index import sync_branch_index
 
 router = APIRouter(prefix="/api/branches", tags=["Branches"])
 
+MAX_BATCH_POINTS = 100_000
+LINES_PER_WRITE  = 500
+
 @router.post("/", status_code=201)
 def create_branch(data: BranchData, db: Session = Depends(get_db),
                   _: dict = Depends(require_role("admin"))):
@@ -21,11 +28,8 @@ def create_branch(data: BranchData, db: Session = Depends(get_db),
     except (ValueError, TypeError): raise HTTPException(status_code=400, detail="Invalid hospital_id UUID")
     branch = Branch(**d)
     db.add(branch); db.commit(); db.refresh(branch)
-    lb = get_load_balancer()
-    lb.register(str(branch.branch_id), branch.total_capacity)
-    all_branches = db.query(Branch).filter(Branch.is_active == True).all()
-    rebuild_kdtree([{"branch_id": str(b.branch_id), "latitude": b.latitude or 0.0,
-                     "longitude": b.longitude or 0.0, "is_active": b.is_active} for b in all_branches])
+    get_load_balancer().register(str(branch.branch_id), branch.total_capacity, branch.latitude, branch.longitude)
+    sync_branch_index(db)   # other workers apply the insert on their next geometry query
     return _serialize(branch)
 
 @router.get("/")
@@ -34,10 +38,43 @@ def list_branches(db: Session = Depends(get_db), _: dict = Depends(get_current_u
 
 @router.get("/nearest")
 def find_nearest_branch(lat: float, lng: float, k: int = 3, _: dict = Depends(get_current_user)):
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180): raise HTTPException(status_code=400, detail="Invalid coordinates")
+    sync_branch_index()
+    sync_availability()
     kdtree  = get_kdtree()
-    results = kdtree.k_nearest(lat, lng, k=k, only_available=True)
+    results = kdtree.k_nearest_km(lat, lng, k=k, only_available=True)
     if not results: return {"message": "No available branches found", "results": []}
-    return {"results": [{"branch_id": r.branch_id, "lat": r.lat, "lng": r.lng} for r in results]}
+    return {"results": [{"branch_id": r.branch_id, "lat": r.lat, "lng": r.lng, "distance_km": round(d, 3)}
+                        for d, r in results]}
+
+@router.post("/nearest/batch")
+def find_nearest_branches_batch(data: NearestBatchData, _: dict = Depends(get_current_user)):
+    """
+    Nearest k branches for many points (e.g. geocoded referral addresses).
+    Streams NDJSON, one line per input point in input order:
+    {"index": i, "results": [{branch_id, lat, lng, distance_km}, ...]}
+    """
+    if len(data.points) > MAX_BATCH_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_POINTS} points per batch")
+    if any(not (-90 <= lat <= 90 and -180 <= lng <= 180) for lat, lng in data.points):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    sync_branch_index()
+    sync_availability()
+    kdtree = get_kdtree()
+    lats   = [lat for lat, _ in data.points]
+    lngs   = [lng for _, lng in data.points]
+
+    def lines():
+        buf = []
+        for i, results in enumerate(kdtree.k_nearest_batch(lats, lngs, k=data.k, only_available=True)):
+            buf.append(json.dumps({"index": i, "results": [
+                {"branch_id": r.branch_id, "lat": r.lat, "lng": r.lng, "distance_km": round(d, 3)}
+                for d, r in results]}))
+            if len(buf) >= LINES_PER_WRITE:
+                yield "\n".join(buf) + "\n"; buf = []
+        if buf: yield "\n".join(buf) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/load-summary")
 def load_summary(_: dict = Depends(require_role("admin", "staff"))):
@@ -47,21 +84,28 @@ def load_summary(_: dict = Depends(require_role("admin", "staff"))):
 @router.get("/suggest-routing")
 def suggest_routing(origin_branch_id: str, db: Session = Depends(get_db),
                     _: dict = Depends(get_current_user)):
-    lb      = get_load_balancer()
-    summary = lb.get_load_summary()
-    overloaded = {s["branch_id"] for s in summary if s["is_overloaded"]}
+    sync_branch_index(db)
+    _, overloaded = get_load_balancer().overload_state()
     if origin_branch_id not in overloaded:
         return {"message": "Branch is not overloaded. No redirect needed."}
-    all_branches = db.query(Branch).filter(Branch.is_active == True).all()
-    coords  = {str(b.branch_id): (b.latitude or 0.0, b.longitude or 0.0) for b in all_branches}
-    nearest = nearest_available_branch(origin_branch_id, coords, overloaded)
-    if not nearest: return {"message": "No available branch found for redirect"}
+    found = get_branch_graph().nearest_available(origin_branch_id, set(overloaded))
+    if not found: return {"message": "No available branch found for redirect"}
+    road_km, nearest = found
     try: bid = uuid.UUID(nearest)
     except ValueError: bid = None
     branch = db.query(Branch).filter(Branch.branch_id == bid).first() if bid else None
     return {"redirect_to": nearest, "branch_name": branch.branch_name if branch else None,
+            "road_distance_km": round(road_km, 3),
             "reason": "Origin branch overloaded (>80% capacity)"}
 
+@router.get("/route")
+def branch_route(from_branch_id: str, to_branch_id: str, _: dict = Depends(get_current_user)):
+    sync_branch_index()
+    route = get_branch_graph().shortest_path(from_branch_id, to_branch_id)
+    if route is None: raise HTTPException(status_code=404, detail="No route between these branches")
+    km, path = route
+    return {"distance_km": round(km, 3), "path": path}
+
 @router.get("/next-assignment")
 def next_assignment(_: dict = Depends(require_role("admin", "staff"))):
     lb = get_load_balancer()
@@ -72,8 +116,23 @@ def next_assignment(_: dict = Depends(require_role("admin", "staff"))):
 def update_branch_load(branch_id: str, current_load: int,
                        _: dict = Depends(require_role("admin", "staff"))):
     lb = get_load_balancer()
-    lb.update_load(branch_id, current_load)
-    return {"message": "Load updated"}
+    overloaded = lb.update_load(branch_id, current_load)
+    if overloaded is None: raise HTTPException(status_code=404, detail="Branch not registered")
+    sync_availability()
+    return {"message": "Load updated", "is_overloaded": overloaded}
+
+@router.delete("/{branch_id}")
+def deactivate_branch(branch_id: str, db: Session = Depends(get_db),
+                      _: dict = Depends(require_role("admin"))):
+    try: bid = uuid.UUID(branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid branch_id UUID")
+    branch = db.query(Branch).filter(Branch.branch_id == bid).first()
+    if not branch: raise HTTPException(status_code=404, detail="Branch not found")
+    branch.is_active = False
+    db.commit()
+    get_load_balancer().remove(str(bid))
+    sync_branch_index(db)
+    return {"message": "Branch deactivated"}
 
 def _serialize(b):
     return {
@@ -1,13 +1,14 @@
 # ================================================================
 #  routers/doctor_router.py — FIXED: UUID doctor_id PK
 # ================================================================
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 import uuid
 
 from mediflow_db.config import get_db
 from mediflow_db.models import Doctor, DoctorData
 from auth import get_current_user, require_role
+from pagination import paginate
 
 router = APIRouter(prefix="/api/doctors", tags=["Doctors"])
 
@@ -23,9 +24,11 @@ def create_doctor(data: DoctorData, db: Session = Depends(get_db),
     return _serialize(doctor)
 
 @router.get("/")
-def list_doctors(skip: int = 0, limit: int = 50, db: Session = Depends(get_db),
-                 _: dict = Depends(get_current_user)):
-    doctors = db.query(Doctor).filter(Doctor.is_active == True).offset(skip).limit(limit).all()
+def list_doctors(response: Response, skip: int = 0, limit: int = 50, cursor: str = None,
+                 db: Session = Depends(get_db), _: dict = Depends(get_current_user)):
+    """Ordered by doctor_id; next page via the X-Next-Cursor header as `cursor`."""
+    doctors = paginate(db.query(Doctor).filter(Doctor.is_active == True), (Doctor.doctor_id,),
+                       "doctors", response, limit, skip, cursor)
     return [_serialize(d) for d in doctors]
 
 @router.get("/{doctor_id}")
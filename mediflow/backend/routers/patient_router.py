@@ -1,13 +1,14 @@
 # ================================================================
 #  routers/patient_router.py — FIXED: UUID patient_id PK
 # ================================================================
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 import uuid
 
 from mediflow_db.config import get_db
 from mediflow_db.models import Patient, PatientData, PatientResponse
 from auth import get_current_user, require_role
+from pagination import paginate
 
 router = APIRouter(prefix="/api/patients", tags=["Patients"])
 
@@ -19,9 +20,12 @@ def create_patient(data: PatientData, db: Session = Depends(get_db),
     return _serialize(patient)
 
 @router.get("/")
-def list_patients(skip: int = 0, limit: int = 50, db: Session = Depends(get_db),
+def list_patients(response: Response, skip: int = 0, limit: int = 50, cursor: str = None,
+                  db: Session = Depends(get_db),
                   _: dict = Depends(require_role("admin", "staff", "doctor"))):
-    patients = db.query(Patient).filter(Patient.is_active == True).offset(skip).limit(limit).all()
+    """Ordered by patient_id; next page via the X-Next-Cursor header as `cursor`."""
+    patients = paginate(db.query(Patient).filter(Patient.is_active == True), (Patient.patient_id,),
+                        "patients", response, limit, skip, cursor)
     return [_serialize(p) for p in patients]
 
 @router.get("/{patient_id}")
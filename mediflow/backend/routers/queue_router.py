@@ -4,6 +4,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime
+import dataclasses
 import uuid
 
 from mediflow_db.config import get_db
@@ -13,6 +14,7 @@ from mediflow_db.models import (
 from auth import get_current_user, require_role
 from algorithms.priority_queue import get_queue, QueueNode
 from algorithms.wait_time import get_estimator
+from queue_waits import refresh_queue_waits
 
 router = APIRouter(prefix="/api/queue", tags=["Queue"])
 
@@ -28,7 +30,8 @@ def get_live_queue(doctor_id: str, branch_id: str, db: Session = Depends(get_db)
         .filter(QueueEntry.doctor_id == d_id, QueueEntry.branch_id == b_id,
                 QueueEntry.status.in_(["waiting", "called"]))
         .join(PriorityScore, PriorityScore.queue_id == QueueEntry.queue_id)
-        .order_by(PriorityScore.final_score.desc())
+        # Called patients first, then the rank refresh_queue_waits stored
+        .order_by((QueueEntry.status == "called").desc(), QueueEntry.position)
         .all()
     )
     return [{
@@ -40,12 +43,36 @@ def get_live_queue(doctor_id: str, branch_id: str, db: Session = Depends(get_db)
     } for idx, e in enumerate(entries)]
 
 
+@router.get("/wait-estimate/{doctor_id}/{branch_id}")
+def get_wait_estimate(doctor_id: str, branch_id: str, position: int = 1,
+                      _: dict = Depends(get_current_user)):
+    """Point estimate + 80% band for a patient at `position`, with P50 / P90 consult times."""
+    try: d_id = uuid.UUID(doctor_id); b_id = uuid.UUID(branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    if position < 1: raise HTTPException(status_code=400, detail="position must be ≥ 1")
+    queue_length = get_queue(str(d_id), str(b_id)).size()
+    return get_estimator(str(d_id), str(b_id)).estimate(position, queue_length)
+
+
 @router.get("/next/{doctor_id}/{branch_id}")
-def get_next_patient(doctor_id: str, branch_id: str,
+def get_next_patient(doctor_id: str, branch_id: str, db: Session = Depends(get_db),
                      _: dict = Depends(require_role("doctor", "staff", "admin"))):
-    pq   = get_queue(doctor_id, branch_id)
+    try: d_id = uuid.UUID(doctor_id); b_id = uuid.UUID(branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    pq   = get_queue(str(d_id), str(b_id))
     node = pq.pop()
     if not node: return {"message": "Queue is empty"}
+    try:
+        (db.query(QueueEntry)
+           .filter(QueueEntry.appointment_id == uuid.UUID(node.appointment_id), QueueEntry.status == "waiting")
+           .update({QueueEntry.status: "called", QueueEntry.estimated_wait_mins: 0}, synchronize_session=False))
+        # Everyone behind moves up one place
+        refresh_queue_waits(db, d_id, b_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        pq.push(node)   # still waiting in the DB — keep the in-memory queue in step
+        raise
     return {"appointment_id": node.appointment_id, "patient_id": node.patient_id,
             "urgency": node.urgency, "priority_score": -node.neg_score, "is_emergency": node.is_emergency}
 
@@ -77,16 +104,28 @@ def emergency_override(data: EmergencyOverrideData, db: Session = Depends(get_db
     )
     db.add(override)
 
-    pq = get_queue(str(queue_entry.doctor_id), str(queue_entry.branch_id))
-    pq.remove(str(appt.appointment_id))
-    node = QueueNode(
+    pq     = get_queue(str(queue_entry.doctor_id), str(queue_entry.branch_id))
+    queued = pq.get(str(appt.appointment_id))
+    prior  = dataclasses.replace(queued) if queued else None   # promoted in place below
+    # Promotes the queued node in place; only builds a fresh node if it isn't queued
+    pq.emergency_insert(QueueNode(
         neg_score=-999.0, appointment_id=str(appt.appointment_id),
         patient_id=str(appt.patient_id), doctor_id=str(appt.doctor_id),
         branch_id=str(appt.branch_id), urgency=appt.urgency_level.value,
         appointment_type=appt.appointment_type.value, is_emergency=True,
-    )
-    pq.push(node)
-    db.commit(); db.refresh(override)
+    ))
+    try:
+        db.flush()
+        # Positions follow the promoted order, so the queue moves first
+        refresh_queue_waits(db, queue_entry.doctor_id, queue_entry.branch_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Override never committed — put the in-memory queue back as it was
+        if prior: pq.push(prior)
+        else: pq.remove(str(appt.appointment_id))
+        raise
+    db.refresh(override)
     return {"override_id": str(override.override_id), "queue_id": str(override.queue_id),
             "reason": override.reason, "previous_position": override.previous_position,
             "new_position": override.new_position,
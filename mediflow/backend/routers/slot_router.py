@@ -2,14 +2,19 @@
 #  routers/slot_router.py — FIXED: UUID slot/doctor/branch PKs
 # ================================================================
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_, and_, insert
 from sqlalchemy.orm import Session
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 import uuid
 
 from mediflow_db.config import get_db
-from mediflow_db.models import TimeSlot, TimeSlotData
+from mediflow_db.models import TimeSlot, TimeSlotData, SlotScheduleData, Doctor, SlotBlock
 from auth import get_current_user, require_role
-from algorithms.interval_tree import get_tree, Interval
+from algorithms.interval_tree import get_tree, Interval, merge_free_windows, expand_recurring
+from algorithms.bipartite_matching import get_matcher, slot_group
+
+MAX_FREE_WINDOW_DAYS = 31
+FREQUENCY_WEEKS      = {"weekly": 1, "biweekly": 2}
 
 router = APIRouter(prefix="/api/slots", tags=["Time Slots"])
 
@@ -29,9 +34,64 @@ def create_slot(data: TimeSlotData, db: Session = Depends(get_db),
     db.add(slot); db.flush()
     tree.insert(Interval(start=start_dt, end=end_dt, slot_id=str(slot.slot_id),
                          doctor_id=str(d_id), branch_id=str(b_id)))
+    matcher = get_matcher(str(b_id))
+    if matcher.has_group(slot_group(d_id, data.date)):   # walk-ins waiting that day
+        matcher.add_slot(str(slot.slot_id), group=slot_group(d_id, data.date))
     db.commit(); db.refresh(slot)
     return _serialize(slot)
 
+@router.post("/bulk", status_code=201)
+def create_slot_schedule(data: SlotScheduleData, db: Session = Depends(get_db),
+                         _: dict = Depends(require_role("admin", "staff"))):
+    """
+    Generate a recurring schedule for many doctors in one call, e.g.
+    Mon–Fri 09:00–13:00, 15 min, 12 weeks. One conflict sweep per doctor's
+    interval tree, one bulk INSERT for every generated slot.
+    """
+    try:
+        d_ids = [uuid.UUID(d) for d in dict.fromkeys(data.doctor_ids)]
+        b_id  = uuid.UUID(data.branch_id)
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid UUID")
+    if data.frequency not in FREQUENCY_WEEKS:
+        raise HTTPException(status_code=400, detail=f"frequency must be one of {list(FREQUENCY_WEEKS)}")
+    if data.end_time <= data.start_time or any(not 0 <= d <= 6 for d in data.days_of_week):
+        raise HTTPException(status_code=400, detail="Invalid time range or days_of_week")
+
+    generated, conflicts = {}, []
+    for d_id in d_ids:
+        intervals = expand_recurring(str(d_id), str(b_id), data.start_date, data.weeks, data.days_of_week,
+                                     data.start_time, data.end_time, data.slot_duration_mins,
+                                     FREQUENCY_WEEKS[data.frequency], slot_id=lambda: str(uuid.uuid4()))
+        clashes = get_tree(str(d_id)).find_conflicts(intervals)
+        if clashes:
+            conflicts.extend(clashes)
+            clash_ids = {iv.slot_id for iv in clashes}
+            intervals = [iv for iv in intervals if iv.slot_id not in clash_ids]
+        generated[d_id] = intervals
+    if conflicts and not data.skip_conflicts:
+        sample = [{"doctor_id": iv.doctor_id, "start": iv.start.isoformat()} for iv in conflicts[:10]]
+        raise HTTPException(status_code=409, detail={"message": f"{len(conflicts)} generated slots overlap existing slots",
+                                                     "conflicts": sample})
+
+    rows = [{"slot_id": uuid.UUID(iv.slot_id), "doctor_id": d_id, "branch_id": b_id,
+             "date": iv.start.date(), "start_time": iv.start.time(), "end_time": iv.end.time(),
+             "capacity": data.capacity, "is_available": True, "booked_count": 0}
+            for d_id, intervals in generated.items() for iv in intervals]
+    if rows:
+        db.execute(insert(TimeSlot), rows)
+        db.commit()
+    matcher = get_matcher(str(b_id))
+    for d_id, intervals in generated.items():
+        get_tree(str(d_id)).insert_many(intervals)
+        waiting = {}   # one has_group check per day, not per slot
+        for iv in intervals:
+            group = slot_group(d_id, iv.start.date())
+            if group not in waiting:
+                waiting[group] = matcher.has_group(group)
+            if waiting[group]:
+                matcher.add_slot(iv.slot_id, group=group)
+    return {"created": len(rows), "skipped": len(conflicts), "doctors": len(d_ids)}
+
 @router.get("/available")
 def get_available_slots(doctor_id: str, branch_id: str, date_str: str,
                         db: Session = Depends(get_db), _: dict = Depends(get_current_user)):
@@ -45,6 +105,55 @@ def get_available_slots(doctor_id: str, branch_id: str, date_str: str,
              .order_by(TimeSlot.start_time).all())
     return [_serialize(s) for s in slots]
 
+@router.get("/free-windows")
+def get_free_windows(date_from: str, date_to: str, doctor_ids: str = None, specialization: str = None,
+                     branch_id: str = None, slot_duration_mins: int = 15,
+                     day_start: str = "09:00", day_end: str = "17:00", limit: int = 50,
+                     db: Session = Depends(get_db), _: dict = Depends(get_current_user)):
+    """
+    Earliest free windows for many doctors over a date range in one call —
+    e.g. "next free slot, any cardiologist, this week".
+    Doctors come from `doctor_ids` (comma-separated) or `specialization`.
+    """
+    try:
+        start_d, end_d = date.fromisoformat(date_from), date.fromisoformat(date_to)
+        open_t, close_t = time.fromisoformat(day_start), time.fromisoformat(day_end)
+        ids = [uuid.UUID(d) for d in doctor_ids.split(",")] if doctor_ids else []
+        b_id = uuid.UUID(branch_id) if branch_id else None
+    except ValueError: raise HTTPException(status_code=400, detail="Invalid input")
+    if end_d < start_d or (end_d - start_d).days > MAX_FREE_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be 0–{MAX_FREE_WINDOW_DAYS} days")
+    if slot_duration_mins <= 0: raise HTTPException(status_code=400, detail="slot_duration_mins must be positive")
+
+    if not ids and specialization:
+        ids = [d for (d,) in db.query(Doctor.doctor_id)
+               .filter(Doctor.is_active == True, Doctor.specialization.ilike(specialization))]
+    if not ids: raise HTTPException(status_code=400, detail="Provide doctor_ids or a matching specialization")
+
+    range_start = datetime.combine(start_d, time.min)
+    range_end   = datetime.combine(end_d + timedelta(days=1), time.min)
+
+    # All blackouts for these doctors (and branch-wide ones) in a single query
+    applies = [SlotBlock.doctor_id.in_(ids)]
+    if b_id:
+        applies = [and_(SlotBlock.doctor_id.in_(ids), or_(SlotBlock.branch_id == b_id, SlotBlock.branch_id.is_(None))),
+                   and_(SlotBlock.doctor_id.is_(None), SlotBlock.branch_id == b_id)]
+    blocks = (db.query(SlotBlock.doctor_id, SlotBlock.start_datetime, SlotBlock.end_datetime)
+              .filter(SlotBlock.start_datetime < range_end, SlotBlock.end_datetime > range_start, or_(*applies))
+              .all())
+    blocked: dict[uuid.UUID, list] = {d: [] for d in ids}
+    for doc, b_start, b_end in blocks:
+        for d in ([doc] if doc else ids):
+            blocked[d].append((b_start, b_end))
+
+    per_doctor = {
+        str(d): get_tree(str(d)).free_windows(str(d), range_start, range_end, open_t, close_t,
+                                              slot_duration_mins, blocked[d], limit)
+        for d in ids
+    }
+    windows = merge_free_windows(per_doctor, limit)
+    return [{"doctor_id": d, "start": s.isoformat(), "end": e.isoformat()} for d, s, e in windows]
+
 @router.delete("/{slot_id}")
 def delete_slot(slot_id: str, db: Session = Depends(get_db),
                 _: dict = Depends(require_role("admin", "staff"))):
@@ -54,6 +163,7 @@ def delete_slot(slot_id: str, db: Session = Depends(get_db),
     if not slot: raise HTTPException(status_code=404, detail="Slot not found")
     tree = get_tree(str(slot.doctor_id))
     tree.remove(slot_id)
+    get_matcher(str(slot.branch_id)).remove_slot(str(s_id))
     db.delete(slot); db.commit()
     return {"message": f"Slot {slot_id} deleted"}
 
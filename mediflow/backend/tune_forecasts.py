@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+tune_forecasts.py — Fleet-wide Holt-Winters parameter tuning.
+
+Grid-searches (alpha, beta, gamma) per (branch, department) series on
+one-step-ahead error and writes the winners to analytics.forecast_params,
+which get_forecaster reads. Run nightly, then POST
+/api/analytics/peak-forecast/retrain to refit with the new parameters.
+
+Usage:
+    python tune_forecasts.py                    # all cores
+    python tune_forecasts.py --workers 4
+    python tune_forecasts.py --dry-run          # print, don't write
+"""
+import argparse
+import time
+
+from mediflow_db.config import engine, SessionLocal, Base
+import mediflow_db.models  # noqa: F401 — registers all ORM classes with Base
+from algorithms.peak_prediction import tune_parameters, DEFAULT_PARAMS, PARAM_GRID
+import forecast_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune Holt-Winters parameters per series")
+    parser.add_argument("--workers",    type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--min-points", type=int, default=48,   help="Skip series shorter than this")
+    parser.add_argument("--dry-run",    action="store_true",    help="Report results without saving")
+    args = parser.parse_args()
+
+    grid_size = len(PARAM_GRID["alpha"]) * len(PARAM_GRID["beta"]) * len(PARAM_GRID["gamma"])
+    print(f"\n📈  Holt-Winters tuning — {grid_size} parameter sets per series\n")
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        histories, _ = forecast_cache.load_histories(db, min_points=args.min_points)
+        if not histories:
+            print("  – No series with enough history"); return
+        # Departments of one branch share a series — tune each distinct series once
+        by_series: dict[int, list] = {}
+        for key, values in histories.items():
+            by_series.setdefault(id(values), []).append(key)
+        unique = {keys[0]: histories[keys[0]] for keys in by_series.values()}
+        print(f"  … {len(histories):,} department series, {len(unique):,} distinct")
+
+        t0 = time.perf_counter()
+        step, last = max(1, len(unique) // 10), [0]
+
+        def progress(done: int, total: int) -> None:
+            if done - last[0] >= step or done == total:
+                last[0] = done
+                print(f"  … {done:,}/{total:,}")
+
+        tuned = tune_parameters(unique, workers=args.workers, progress=progress)
+        secs = time.perf_counter() - t0
+        results = {key: tuned[keys[0]] for keys in by_series.values() for key in keys}
+        changed = sum(1 for p in results.values() if (p["alpha"], p["beta"], p["gamma"]) != DEFAULT_PARAMS)
+        print(f"  ✔ Tuned {len(unique):,} series in {secs:.1f}s ({changed:,} differ from the defaults)")
+
+        if args.dry_run:
+            for (b, d), p in list(results.items())[:20]:
+                print(f"    {b} / {d}: α={p['alpha']} β={p['beta']} γ={p['gamma']}  mse={p['mse']}")
+            return
+        forecast_cache.save_parameters(db, results, {k: len(v) for k, v in histories.items()})
+        db.commit()
+        print(f"  ✔ {len(results):,} rows written to analytics.forecast_params\n")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
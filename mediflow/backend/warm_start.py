@@ -0,0 +1,206 @@
+# ================================================================
+#  warm_start.py — Rehydrate in-memory algorithm state from Postgres
+#  Four streamed, set-based queries on startup:
+#    waiting queue entries → priority queues
+#    future time slots     → interval trees
+#    recent completions    → wait-time estimators
+#    unslotted walk-ins    → slot matchers (with their days' free slots)
+# ================================================================
+
+import time
+from datetime import datetime, date, timedelta
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import select, func, literal, literal_column, cast, exists, union_all, Date
+from sqlalchemy.orm import Session
+
+from mediflow_db.models import (
+    Appointment, AppointmentLog, Patient, QueueEntry, TimeSlot,
+    AppointmentStatusEnum, QueueStatusEnum,
+)
+from algorithms.priority_queue import get_queue, compute_score, QueueNode
+from algorithms.interval_tree import get_tree, Interval
+from algorithms.wait_time import get_estimator
+from algorithms.bipartite_matching import get_matcher, slot_group
+
+BATCH_SIZE                = 5000   # rows fetched per round trip (server-side cursor)
+COMPLETIONS_PER_ESTIMATOR = 20     # matches the estimator's rolling window
+COMPLETION_LOOKBACK_DAYS  = 7
+PROGRESS_EVERY            = 25000
+
+Progress = Callable[[str, int], None]
+
+
+def _age(date_of_birth: Optional[date], today: date) -> int:
+    if date_of_birth:
+        return (today - date_of_birth).days // 365
+    return 30
+
+
+def _report(progress: Optional[Progress], stage: str, count: int) -> None:
+    if progress and count % PROGRESS_EVERY == 0:
+        progress(stage, count)
+
+
+def load_queues(rows: Iterable[tuple], progress: Optional[Progress] = None) -> int:
+    """
+    rows = (appointment_id, patient_id, doctor_id, branch_id, urgency, appointment_type,
+            entered_queue_at, is_emergency, date_of_birth)
+    """
+    today = datetime.utcnow().date()
+    count = 0
+    for (appointment_id, patient_id, doctor_id, branch_id, urgency, appt_type,
+         entered_at, is_emergency, dob) in rows:
+        urgency    = getattr(urgency, "value", urgency)
+        appt_type  = getattr(appt_type, "value", appt_type)
+        entered_at = entered_at or datetime.utcnow()
+        age        = _age(dob, today)
+        pq         = get_queue(str(doctor_id), str(branch_id))
+        node = QueueNode(
+            neg_score=0.0, appointment_id=str(appointment_id), patient_id=str(patient_id),
+            doctor_id=str(doctor_id), branch_id=str(branch_id), urgency=urgency,
+            appointment_type=appt_type, age=age, entered_at=entered_at,
+        )
+        if is_emergency:
+            pq.emergency_insert(node)
+        else:
+            node.neg_score = -compute_score(urgency, appt_type, entered_at, age)["final_score"]
+            pq.push(node)
+        count += 1
+        _report(progress, "queue entries", count)
+    return count
+
+
+def load_trees(rows: Iterable[tuple], progress: Optional[Progress] = None) -> int:
+    """
+    rows = (slot_id, doctor_id, branch_id, date, start_time, end_time)
+    Grouped per doctor, then bulk-built — one balanced build per tree.
+    """
+    per_doctor: dict[str, list[Interval]] = {}
+    count = 0
+    for slot_id, doctor_id, branch_id, slot_date, start_time, end_time in rows:
+        per_doctor.setdefault(str(doctor_id), []).append(Interval(
+            start=datetime.combine(slot_date, start_time),
+            end=datetime.combine(slot_date, end_time),
+            slot_id=str(slot_id), doctor_id=str(doctor_id), branch_id=str(branch_id),
+        ))
+        count += 1
+        _report(progress, "time slots", count)
+    for doctor_id, intervals in per_doctor.items():
+        get_tree(doctor_id).insert_many(intervals)
+    return count
+
+
+def load_estimators(rows: Iterable[tuple], progress: Optional[Progress] = None) -> int:
+    """rows = (doctor_id, branch_id, consult_duration_mins, logged_at), oldest first."""
+    count = 0
+    for doctor_id, branch_id, duration, logged_at in rows:
+        get_estimator(str(doctor_id), str(branch_id)).record_completion(duration, logged_at)
+        count += 1
+        _report(progress, "completions", count)
+    return count
+
+
+def load_matchers(rows: Iterable[tuple], progress: Optional[Progress] = None) -> int:
+    """
+    rows = (kind, key, doctor_id, branch_id, day), kind "slot" or "patient",
+    slots first — each patient then augments once against its day's slots.
+    """
+    count = 0
+    for kind, key, doctor_id, branch_id, day in rows:
+        matcher = get_matcher(str(branch_id))
+        group   = slot_group(doctor_id, day)
+        if kind == "slot":
+            matcher.add_slot(str(key), group=group)
+        else:
+            matcher.add_patient(str(key), group=group)
+        count += 1
+        _report(progress, "matcher rows", count)
+    return count
+
+
+# ----------------------------------------------------------------
+#  Queries
+# ----------------------------------------------------------------
+
+def _queue_rows(db: Session):
+    stmt = (
+        select(QueueEntry.appointment_id, Appointment.patient_id,
+               QueueEntry.doctor_id, QueueEntry.branch_id,
+               Appointment.urgency_level, Appointment.appointment_type,
+               QueueEntry.entered_queue_at, QueueEntry.is_emergency, Patient.date_of_birth)
+        .join(Appointment, Appointment.appointment_id == QueueEntry.appointment_id)
+        .outerjoin(Patient, Patient.patient_id == Appointment.patient_id)
+        .where(QueueEntry.status == QueueStatusEnum.waiting,
+               Appointment.status == AppointmentStatusEnum.scheduled)
+    )
+    return db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+
+def _slot_rows(db: Session, today: date):
+    stmt = (
+        select(TimeSlot.slot_id, TimeSlot.doctor_id, TimeSlot.branch_id,
+               TimeSlot.date, TimeSlot.start_time, TimeSlot.end_time)
+        .where(TimeSlot.date >= today)
+    )
+    return db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+
+def _completion_rows(db: Session, since: datetime):
+    ranked = (
+        select(AppointmentLog.doctor_id, AppointmentLog.branch_id,
+               AppointmentLog.consult_duration_mins, AppointmentLog.logged_at,
+               func.row_number().over(
+                   partition_by=(AppointmentLog.doctor_id, AppointmentLog.branch_id),
+                   order_by=AppointmentLog.logged_at.desc(),
+               ).label("rn"))
+        .where(AppointmentLog.consult_duration_mins.isnot(None),
+               AppointmentLog.logged_at >= since)
+        .subquery()
+    )
+    stmt = (
+        select(ranked.c.doctor_id, ranked.c.branch_id, ranked.c.consult_duration_mins, ranked.c.logged_at)
+        .where(ranked.c.rn <= COMPLETIONS_PER_ESTIMATOR)
+        .order_by(ranked.c.logged_at)
+    )
+    return db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+
+def _matcher_rows(db: Session, today: date):
+    unslotted = (Appointment.slot_id.is_(None),
+                 Appointment.status == AppointmentStatusEnum.scheduled)
+    day = cast(Appointment.scheduled_time, Date)
+    slots = (
+        select(literal("slot").label("kind"), TimeSlot.slot_id, TimeSlot.doctor_id,
+               TimeSlot.branch_id, TimeSlot.date)
+        .where(TimeSlot.is_available == True, TimeSlot.date >= today,
+               exists().where(Appointment.doctor_id == TimeSlot.doctor_id,
+                              Appointment.branch_id == TimeSlot.branch_id,
+                              day == TimeSlot.date, *unslotted))
+    )
+    patients = (
+        select(literal("patient").label("kind"), Appointment.appointment_id, Appointment.doctor_id,
+               Appointment.branch_id, day)
+        .where(day >= today, *unslotted)
+    )
+    stmt = union_all(slots, patients).order_by(literal_column("kind").desc())
+    return db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+
+def warm_start(db: Session, progress: Optional[Progress] = None) -> dict:
+    """Rebuild queues, interval trees and estimators. Returns counts + timings."""
+    now   = datetime.utcnow()
+    since = now - timedelta(days=COMPLETION_LOOKBACK_DAYS)
+    stages = (
+        ("queue_entries", lambda: _queue_rows(db),               load_queues),
+        ("time_slots",    lambda: _slot_rows(db, now.date()),    load_trees),
+        ("completions",   lambda: _completion_rows(db, since),   load_estimators),
+        ("walk_ins",      lambda: _matcher_rows(db, now.date()), load_matchers),
+    )
+
+    stats = {}
+    for stage, fetch, load in stages:
+        t0 = time.perf_counter()
+        count = load(fetch(), progress)
+        stats[stage] = {"rows": count, "secs": round(time.perf_counter() - t0, 3)}
+    return stats